@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Арена "Змейки" для сетевой игры: несколько змеек на одном поле
+Правила те же, что в SnakeEngine: стены, столкновение с любым телом (хвост на
+тике еще на месте), +10 очков и рост за еду. Погибшая змейка исчезает с поля
+и через RESPAWN_TICKS появляется заново.
+
+Здесь же двоичный формат сообщений: после полного состояния клиенту идут только
+изменения за тик - новая голова, убранный хвост, еда, гибель и появление змейки
+"""
+
+import random
+import struct
+from array import array
+from collections import Counter, deque
+from typing import Deque, Dict, List, Optional, Sequence, Tuple
+
+from rules import Rules, compile_rules
+from snake_engine import (FOOD_SCORE, GRID_HEIGHT, GRID_WIDTH, Direction, OPPOSITE,
+                          occupy_cell, release_cell)
+
+# Одновременно лежащей еды на поле
+ARENA_FOODS = 3
+# Игроков в комнате (номер игрока - байт в сообщениях)
+MAX_PLAYERS = 8
+# Через сколько тиков погибшая змейка появляется снова
+RESPAWN_TICKS = 20
+
+DIRECTIONS = list(Direction)
+CODES = {direction: code for code, direction in enumerate(DIRECTIONS)}
+
+# Типы сообщений: клиент -> сервер
+MSG_JOIN = 1     # имя комнаты в UTF-8
+MSG_TURN = 2     # код направления
+# Сервер -> клиент
+MSG_WELCOME = 3  # номер игрока
+MSG_FULL = 4     # полное состояние
+MSG_DELTA = 5    # изменения за тик
+
+# Сообщение предваряется длиной (u32)
+FRAME = struct.Struct("<I")
+# Самое длинное сообщение, которое примет получатель
+MAX_MESSAGE = 1 << 24
+WELCOME = struct.Struct("<BB")
+TURN = struct.Struct("<BB")
+# Полное состояние: тип, тик, ширина, высота, число змеек, затем змейки и еда
+FULL_HEADER = struct.Struct("<BIHHB")
+# Змейка: игрок, жива ли, направление, счет, длина; затем клетки от головы к хвосту
+FULL_SNAKE = struct.Struct("<BBBII")
+FULL_FOODS = struct.Struct("<H")
+# Изменения: тип, тик, затем события фиксированной длины
+DELTA_HEADER = struct.Struct("<BI")
+EVENT = struct.Struct("<BBI")
+
+# События тика (игрок, клетка)
+EV_HEAD = 1       # голова змейки перешла в клетку
+EV_TAIL = 2       # хвост змейки убран (клетка не передается)
+EV_FOOD_ADD = 3
+EV_FOOD_DEL = 4
+EV_DEATH = 5      # змейка погибла и убрана с поля
+EV_SPAWN = 6      # змейка длиной 1 появилась в клетке
+EV_LEAVE = 7      # игрок вышел
+
+def frame(payload: bytes) -> bytes:
+    """Сообщение с префиксом длины"""
+    return FRAME.pack(len(payload)) + payload
+
+def encode_turn(direction: Direction) -> bytes:
+    return frame(TURN.pack(MSG_TURN, CODES[direction]))
+
+def encode_join(room: str) -> bytes:
+    return frame(bytes([MSG_JOIN]) + room.encode("utf-8"))
+
+class ArenaSnake:
+    """Змейка арены: тело - клетки y*width+x от головы к хвосту"""
+
+    def __init__(self, player: int):
+        self.player = player
+        self.body: Deque[int] = deque()
+        self.direction = Direction.RIGHT
+        # Поворот, полученный до тика; проверяется на тике, как action в SnakeEngine.step
+        self.pending: Optional[Direction] = None
+        self.score = 0
+        self.alive = False
+        self.respawn_tick = 0
+
+class Arena:
+    """Общее поле комнаты; tick() двигает всех игроков и возвращает изменения"""
+
+    def __init__(self, width: int = GRID_WIDTH, height: int = GRID_HEIGHT,
+                 seed: Optional[int] = None, foods: int = ARENA_FOODS):
+        self.width = width
+        self.height = height
+        self.rng = random.Random(seed)
+        # Занятость и индекс свободных клеток строятся и ведутся так же, как в SnakeEngine:
+        # копия шаблона из таблиц правил, дальше occupy_cell/release_cell
+        self.occupancy, self.free, self.free_pos = compile_rules(Rules(width, height)).fresh()
+        self.snakes: Dict[int, ArenaSnake] = {}
+        self.foods = set()
+        self.ticks = 0
+        self.events = bytearray()
+        for _ in range(foods):
+            self._add_food()
+
+    def _occupy(self, cell: int):
+        occupy_cell(self.occupancy, self.free, self.free_pos, cell)
+
+    def _release(self, cell: int):
+        release_cell(self.occupancy, self.free, self.free_pos, cell)
+
+    def _random_free(self) -> Optional[int]:
+        """Случайная свободная клетка без еды; None, если таких нет"""
+        free = self.free
+        for _ in range(len(free)):
+            cell = free[self.rng.randrange(len(free))]
+            if cell not in self.foods:
+                return cell
+        return None
+
+    def _event(self, kind: int, player: int = 0, cell: int = 0):
+        self.events += EVENT.pack(kind, player, cell)
+
+    def _add_food(self):
+        cell = self._random_free()
+        if cell is not None:
+            self.foods.add(cell)
+            self._event(EV_FOOD_ADD, 0, cell)
+
+    def _spawn(self, snake: ArenaSnake):
+        cell = self._random_free()
+        if cell is None:
+            snake.respawn_tick = self.ticks + RESPAWN_TICKS
+            return
+        snake.body.clear()
+        snake.body.append(cell)
+        self._occupy(cell)
+        # Змейка смотрит в сторону дальней стены
+        snake.direction = Direction.RIGHT if cell % self.width < self.width // 2 else Direction.LEFT
+        snake.pending = None
+        snake.score = 0
+        snake.alive = True
+        self._event(EV_SPAWN, snake.player, cell)
+
+    def _kill(self, snake: ArenaSnake, kind: int = EV_DEATH):
+        for cell in snake.body:
+            self._release(cell)
+        snake.body.clear()
+        snake.alive = False
+        snake.respawn_tick = self.ticks + RESPAWN_TICKS
+        self._event(kind, snake.player)
+
+    def add_player(self) -> int:
+        """Новый игрок появляется на поле сразу; возвращает его номер"""
+        player = next(p for p in range(MAX_PLAYERS + 1) if p not in self.snakes)
+        if player == MAX_PLAYERS:
+            raise ValueError("комната заполнена")
+        snake = ArenaSnake(player)
+        self.snakes[player] = snake
+        self._spawn(snake)
+        return player
+
+    def remove_player(self, player: int):
+        snake = self.snakes.pop(player)
+        if snake.alive:
+            self._kill(snake, EV_LEAVE)
+        else:
+            self._event(EV_LEAVE, player)
+
+    def place_snake(self, player: int, cells: Sequence[Tuple[int, int]], direction: Direction):
+        """
+        Поставить змейку игрока заданной формы (первая клетка - голова)
+        Нужна тестам; клиентам это изменение не рассылается
+        """
+        snake = self.snakes[player]
+        for cell in snake.body:
+            self._release(cell)
+        snake.body.clear()
+        for x, y in cells:
+            cell = y * self.width + x
+            if not (0 <= x < self.width and 0 <= y < self.height) or self.occupancy[cell]:
+                raise ValueError(f"клетка {(x, y)} вне поля или занята")
+            self.foods.discard(cell)
+            self._occupy(cell)
+            snake.body.append(cell)
+        snake.direction = direction
+        snake.pending = None
+        snake.alive = True
+
+    def turn(self, player: int, direction: Direction):
+        """Поворот к следующему тику (действует последний до тика)"""
+        snake = self.snakes.get(player)
+        if snake is not None:
+            snake.pending = direction
+
+    def tick(self) -> bytes:
+        """Один тик всех змеек; возвращает сообщение с изменениями"""
+        self.ticks += 1
+        width, height = self.width, self.height
+        occupancy = self.occupancy
+
+        # Ходы считаются по полю до тика: змейки движутся одновременно
+        moves: Dict[int, int] = {}
+        dead: List[ArenaSnake] = []
+        for snake in self.snakes.values():
+            if not snake.alive:
+                continue
+            # Разворот на 180 градусов игнорируется
+            if snake.pending is not None and snake.pending != OPPOSITE[snake.direction]:
+                snake.direction = snake.pending
+            snake.pending = None
+            head = snake.body[0]
+            dx, dy = snake.direction.value
+            x, y = head % width + dx, head // width + dy
+            if not (0 <= x < width and 0 <= y < height) or occupancy[y * width + x]:
+                dead.append(snake)
+            else:
+                moves[snake.player] = y * width + x
+        # Две головы в одной клетке - гибнут обе
+        crowded = Counter(moves.values())
+        for player, cell in list(moves.items()):
+            if crowded[cell] > 1:
+                dead.append(self.snakes[player])
+                del moves[player]
+        for snake in dead:
+            self._kill(snake)
+
+        eaten = 0
+        for player, cell in moves.items():
+            snake = self.snakes[player]
+            snake.body.appendleft(cell)
+            self._occupy(cell)
+            self._event(EV_HEAD, player, cell)
+            if cell in self.foods:
+                self.foods.discard(cell)
+                self._event(EV_FOOD_DEL, 0, cell)
+                snake.score += FOOD_SCORE
+                eaten += 1
+            else:
+                self._release(snake.body.pop())
+                self._event(EV_TAIL, player)
+        for _ in range(eaten):
+            self._add_food()
+
+        for snake in self.snakes.values():
+            if not snake.alive and snake.respawn_tick <= self.ticks:
+                self._spawn(snake)
+
+        message = frame(DELTA_HEADER.pack(MSG_DELTA, self.ticks) + self.events)
+        self.events = bytearray()
+        return message
+
+    def snapshot(self) -> bytes:
+        """Полное состояние между тиками (для нового клиента)"""
+        parts = [FULL_HEADER.pack(MSG_FULL, self.ticks, self.width, self.height, len(self.snakes))]
+        for snake in self.snakes.values():
+            parts.append(FULL_SNAKE.pack(snake.player, snake.alive, CODES[snake.direction],
+                                         snake.score, len(snake.body)))
+            parts.append(array('I', snake.body).tobytes())
+        parts.append(FULL_FOODS.pack(len(self.foods)))
+        parts.append(array('I', sorted(self.foods)).tobytes())
+        return frame(b"".join(parts))
+
+class ArenaMirror:
+    """Копия арены на клиенте, собираемая из полного состояния и изменений"""
+
+    def __init__(self):
+        self.player: Optional[int] = None
+        self.width = 0
+        self.height = 0
+        self.ticks = 0
+        self.snakes: Dict[int, Deque[int]] = {}
+        self.directions: Dict[int, Direction] = {}
+        self.scores: Dict[int, int] = {}
+        self.foods = set()
+
+    def apply(self, payload: bytes):
+        """Применить одно сообщение сервера (без префикса длины)"""
+        kind = payload[0]
+        if kind == MSG_WELCOME:
+            self.player = payload[1]
+        elif kind == MSG_FULL:
+            self._apply_full(payload)
+        elif kind == MSG_DELTA:
+            self._apply_delta(payload)
+        else:
+            raise ValueError(f"неизвестное сообщение: {kind}")
+
+    def _apply_full(self, payload: bytes):
+        _, self.ticks, self.width, self.height, count = FULL_HEADER.unpack_from(payload)
+        offset = FULL_HEADER.size
+        self.snakes.clear()
+        self.directions.clear()
+        self.scores.clear()
+        for _ in range(count):
+            player, alive, code, score, length = FULL_SNAKE.unpack_from(payload, offset)
+            offset += FULL_SNAKE.size
+            body = array('I')
+            body.frombytes(payload[offset:offset + 4 * length])
+            offset += 4 * length
+            self.snakes[player] = deque(body)
+            self.directions[player] = DIRECTIONS[code]
+            self.scores[player] = score
+        (foods,) = FULL_FOODS.unpack_from(payload, offset)
+        offset += FULL_FOODS.size
+        cells = array('I')
+        cells.frombytes(payload[offset:offset + 4 * foods])
+        self.foods = set(cells)
+
+    def _apply_delta(self, payload: bytes):
+        _, self.ticks = DELTA_HEADER.unpack_from(payload)
+        width = self.width
+        for kind, player, cell in EVENT.iter_unpack(payload[DELTA_HEADER.size:]):
+            if kind == EV_HEAD:
+                body = self.snakes[player]
+                old = body[0]
+                dx, dy = cell % width - old % width, cell // width - old // width
+                self.directions[player] = Direction((dx, dy))
+                body.appendleft(cell)
+                if cell in self.foods:
+                    self.scores[player] += FOOD_SCORE
+            elif kind == EV_TAIL:
+                self.snakes[player].pop()
+            elif kind == EV_FOOD_ADD:
+                self.foods.add(cell)
+            elif kind == EV_FOOD_DEL:
+                self.foods.discard(cell)
+            elif kind == EV_DEATH:
+                self.snakes[player].clear()
+            elif kind == EV_SPAWN:
+                self.snakes[player] = deque([cell])
+                self.directions[player] = (Direction.RIGHT if cell % width < width // 2
+                                           else Direction.LEFT)
+                self.scores[player] = 0
+            elif kind == EV_LEAVE:
+                self.snakes.pop(player, None)
+                self.directions.pop(player, None)
+                self.scores.pop(player, None)
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Клиент сетевой "Змейки": только отрисовка и отправка поворотов
+Состояние собирается из сообщений сервера в ArenaMirror; спрайты те же, что в игре
+"""
+
+import argparse
+import asyncio
+from typing import Dict, Tuple
+
+import pygame
+
+from arena import ArenaMirror, encode_join, encode_turn
+from arena_server import DEFAULT_PORT, read_message
+from snake_engine import Direction
+from snake_game import (BLACK, DARK_GRAY, GRID_SIZE, RENDER_FPS, WHITE, WINDOW_HEIGHT,
+                        WINDOW_WIDTH, make_food_sprite, make_head_sprite, make_segment_sprite,
+                        render_text)
+
+# Оттенки чужих змеек (умножаются на цвета спрайтов)
+RIVAL_TINTS = ((255, 128, 128), (128, 160, 255), (255, 255, 96), (255, 128, 255),
+               (96, 255, 255), (255, 192, 96), (192, 192, 192))
+
+KEYS = {pygame.K_UP: Direction.UP, pygame.K_DOWN: Direction.DOWN,
+        pygame.K_LEFT: Direction.LEFT, pygame.K_RIGHT: Direction.RIGHT}
+
+def tinted(sprite: pygame.Surface, tint: Tuple[int, int, int]) -> pygame.Surface:
+    """Копия спрайта другого цвета"""
+    sprite = sprite.copy()
+    sprite.fill(tint, special_flags=pygame.BLEND_RGB_MULT)
+    return sprite
+
+class ArenaView:
+    """Отрисовка зеркала арены: своя змейка зеленая, чужие - другого оттенка"""
+
+    def __init__(self, mirror: ArenaMirror, screen: pygame.Surface):
+        self.mirror = mirror
+        self.screen = screen
+        self.font = pygame.font.Font(None, 24)
+        self.food_sprite = make_food_sprite()
+        # Спрайты по игроку: (головы по направлениям, сегмент)
+        self._sprites: Dict[int, Tuple[Dict[Direction, pygame.Surface], pygame.Surface]] = {}
+
+    def sprites(self, player: int) -> Tuple[Dict[Direction, pygame.Surface], pygame.Surface]:
+        if player not in self._sprites:
+            heads = {direction: make_head_sprite(direction) for direction in Direction}
+            segment = make_segment_sprite()
+            if player != self.mirror.player:
+                tint = RIVAL_TINTS[player % len(RIVAL_TINTS)]
+                heads = {direction: tinted(sprite, tint) for direction, sprite in heads.items()}
+                segment = tinted(segment, tint)
+            self._sprites[player] = (heads, segment)
+        return self._sprites[player]
+
+    def cell_pos(self, cell: int) -> Tuple[int, int]:
+        return ((cell % self.mirror.width) * GRID_SIZE, (cell // self.mirror.width) * GRID_SIZE)
+
+    def draw(self):
+        mirror = self.mirror
+        self.screen.fill(DARK_GRAY)
+        self.screen.fill(BLACK, pygame.Rect(0, 0, mirror.width * GRID_SIZE,
+                                            mirror.height * GRID_SIZE))
+        for cell in mirror.foods:
+            self.screen.blit(self.food_sprite, self.cell_pos(cell))
+        for player, body in mirror.snakes.items():
+            if not body:
+                continue
+            heads, segment = self.sprites(player)
+            for i in range(1, len(body)):
+                self.screen.blit(segment, self.cell_pos(body[i]))
+            self.screen.blit(heads[mirror.directions[player]], self.cell_pos(body[0]))
+
+        # Счет: свой первым
+        scores = sorted(mirror.scores.items(), key=lambda item: item[0] != mirror.player)
+        for row, (player, score) in enumerate(scores):
+            label = "Вы" if player == mirror.player else f"Игрок {player + 1}"
+            self.screen.blit(render_text(self.font, f"{label}: {score}", WHITE), (10, 10 + row * 22))
+
+async def play(host: str, port: int, room: str):
+    """Подключение к серверу и игровой цикл клиента"""
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(encode_join(room))
+    mirror = ArenaMirror()
+
+    async def receive():
+        try:
+            while True:
+                mirror.apply(await read_message(reader))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass  # Сервер закрыл соединение
+
+    pygame.init()
+    screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+    pygame.display.set_caption("Змейка - сетевая игра")
+    view = ArenaView(mirror, screen)
+    receiver = asyncio.create_task(receive())
+    try:
+        running = True
+        while running and not receiver.done():
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN
+                                                 and event.key == pygame.K_ESCAPE):
+                    running = False
+                elif event.type == pygame.KEYDOWN and event.key in KEYS:
+                    writer.write(encode_turn(KEYS[event.key]))
+            if mirror.width:
+                view.draw()
+                pygame.display.flip()
+            await asyncio.sleep(1.0 / RENDER_FPS)
+    finally:
+        receiver.cancel()
+        writer.close()
+        pygame.quit()
+
+def main():
+    """Запуск клиента из командной строки"""
+    parser = argparse.ArgumentParser(description="Клиент сетевой игры")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--room", default="", help="имя комнаты (по умолчанию - любая со свободным местом)")
+    args = parser.parse_args()
+    try:
+        asyncio.run(play(args.host, args.port, args.room))
+    except ConnectionError as e:
+        print(f"Нет соединения с сервером: {e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Сервер сетевой "Змейки" на asyncio
+Сервер - единственный источник правды: клиенты присылают только повороты,
+а получают полное состояние при входе и изменения за каждый тик.
+Все комнаты тикают из одного планировщика, поэтому на одном ядре
+помещаются сотни комнат
+"""
+
+import argparse
+import asyncio
+from typing import Dict, Optional
+
+from arena import (Arena, DIRECTIONS, FRAME, MAX_MESSAGE, MAX_PLAYERS, MSG_JOIN, MSG_TURN,
+                   MSG_WELCOME, WELCOME, frame)
+from snake_engine import GRID_HEIGHT, GRID_WIDTH, INITIAL_SPEED
+
+DEFAULT_PORT = 8765
+# Клиент, у которого накопилось столько неотправленных байт, отключается
+MAX_BACKLOG = 1 << 20
+
+async def read_message(reader: asyncio.StreamReader) -> bytes:
+    """Одно сообщение без префикса длины"""
+    (length,) = FRAME.unpack(await reader.readexactly(FRAME.size))
+    if not 0 < length <= MAX_MESSAGE:
+        raise ConnectionError(f"недопустимая длина сообщения: {length}")
+    return await reader.readexactly(length)
+
+class Room:
+    """Комната: арена и подключенные к ней игроки"""
+
+    def __init__(self, name: str, width: int, height: int, seed: Optional[int] = None):
+        self.name = name
+        self.arena = Arena(width, height, seed=seed)
+        self.clients: Dict[int, asyncio.StreamWriter] = {}
+        # Вошедшие после прошлого тика получают полное состояние после следующего
+        self.joining: Dict[int, asyncio.StreamWriter] = {}
+
+    @property
+    def full(self) -> bool:
+        return len(self.arena.snakes) >= MAX_PLAYERS
+
+    def join(self, writer: asyncio.StreamWriter) -> int:
+        player = self.arena.add_player()
+        self.joining[player] = writer
+        return player
+
+    def leave(self, player: int):
+        self.clients.pop(player, None)
+        self.joining.pop(player, None)
+        self.arena.remove_player(player)
+
+    def tick(self):
+        """Тик арены и рассылка изменений"""
+        message = self.arena.tick()
+        for player, writer in list(self.clients.items()):
+            # Клиент не успевает читать - отключаем, а не копим ему данные
+            if writer.transport.get_write_buffer_size() > MAX_BACKLOG:
+                writer.close()
+                self.leave(player)
+            else:
+                writer.write(message)
+        if self.joining:
+            snapshot = self.arena.snapshot()
+            for player, writer in self.joining.items():
+                writer.write(frame(WELCOME.pack(MSG_WELCOME, player)) + snapshot)
+                self.clients[player] = writer
+            self.joining.clear()
+
+class ArenaServer:
+    """TCP-сервер комнат; tick_rate - тиков в секунду"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = DEFAULT_PORT,
+                 tick_rate: float = INITIAL_SPEED, width: int = GRID_WIDTH,
+                 height: int = GRID_HEIGHT, seed: Optional[int] = None):
+        self.host = host
+        self.port = port
+        self.tick_rate = tick_rate
+        self.width = width
+        self.height = height
+        self.seed = seed
+        self.rooms: Dict[str, Room] = {}
+        self._created = 0
+        self.late_ticks = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._ticker: Optional[asyncio.Task] = None
+        # Открытые соединения и их обработчики (для остановки)
+        self._connections: Dict[asyncio.StreamWriter, asyncio.Task] = {}
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        # При порте 0 система выбирает свободный
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ticker = asyncio.create_task(self._tick_loop())
+
+    async def close(self):
+        """Остановка: последний тик уже разослан, соединения закрываются"""
+        self._ticker.cancel()
+        self._server.close()
+        # Обработчики завершаются сами, получив конец потока
+        handlers = list(self._connections.values())
+        for writer in list(self._connections):
+            writer.close()
+        await asyncio.gather(*handlers)
+        await self._server.wait_closed()
+
+    async def serve_forever(self):
+        await self.start()
+        await self._server.serve_forever()
+
+    def room(self, name: str) -> Room:
+        """Комната по имени; пустое имя - первая комната со свободным местом"""
+        if not name:
+            for room in self.rooms.values():
+                if not room.full:
+                    return room
+            name = f"room-{self._created + 1}"
+        if name not in self.rooms:
+            self._created += 1
+            seed = None if self.seed is None else self.seed + self._created
+            self.rooms[name] = Room(name, self.width, self.height, seed)
+        return self.rooms[name]
+
+    async def _tick_loop(self):
+        """Один планировщик на все комнаты: тики с фиксированным шагом"""
+        loop = asyncio.get_running_loop()
+        interval = 1.0 / self.tick_rate
+        next_tick = loop.time()
+        while True:
+            for name, room in list(self.rooms.items()):
+                if room.arena.snakes:
+                    room.tick()
+                else:
+                    del self.rooms[name]
+            next_tick += interval
+            delay = next_tick - loop.time()
+            if delay < 0:
+                # Не успели: пропущенные тики не догоняем, чтобы не разгонять игру
+                self.late_ticks += 1
+                next_tick = loop.time()
+                delay = 0
+            await asyncio.sleep(delay)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Соединение игрока: вход в комнату, затем повороты"""
+        room, player = None, None
+        self._connections[writer] = asyncio.current_task()
+        try:
+            message = await read_message(reader)
+            if message[0] != MSG_JOIN:
+                return
+            room = self.room(message[1:].decode("utf-8", errors="replace"))
+            if room.full:
+                return
+            player = room.join(writer)
+            while True:
+                message = await read_message(reader)
+                if message[0] == MSG_TURN and len(message) == 2 and message[1] < len(DIRECTIONS):
+                    room.arena.turn(player, DIRECTIONS[message[1]])
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            # Номер игрока мог уже достаться другому, если этого отключили за отставание
+            if player is not None and writer in (room.clients.get(player), room.joining.get(player)):
+                room.leave(player)
+            del self._connections[writer]
+            writer.close()
+
+def main():
+    """Запуск сервера из командной строки"""
+    parser = argparse.ArgumentParser(description="Сервер сетевой игры")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--tick-rate", type=float, default=INITIAL_SPEED,
+                        help="тиков в секунду")
+    parser.add_argument("--width", type=int, default=GRID_WIDTH,
+                        help=f"ширина поля (до {GRID_WIDTH}: поле целиком видно в окне клиента)")
+    parser.add_argument("--height", type=int, default=GRID_HEIGHT,
+                        help=f"высота поля (до {GRID_HEIGHT})")
+    args = parser.parse_args()
+    if not (1 <= args.width <= GRID_WIDTH and 1 <= args.height <= GRID_HEIGHT):
+        parser.error(f"поле должно помещаться в {GRID_WIDTH}x{GRID_HEIGHT}")
+
+    server = ArenaServer(args.host, args.port, args.tick_rate, args.width, args.height)
+    print(f"Сервер слушает {args.host}:{args.port}")
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Автопилот "Змейки": поиск пути к еде в ширину по плоскому массиву занятости
+Путь кэшируется и пересчитывается только когда становится недействительным
+(новая еда или змейка сошла с пути). Если к еде не пройти безопасно,
+змейка следует за своим хвостом или уходит туда, где больше места
+"""
+
+from array import array
+from collections import deque
+from typing import List, Optional
+
+from snake_engine import Direction, SnakeEngine, step_direction
+
+# Запас клеток сверх длины змейки при выборе, где больше места: дальше
+# поиск не идет, чтобы ход без пути к еде не стоил обхода всего поля
+SPACE_MARGIN = 16
+
+class Autopilot:
+    """Выбор направления для движка на каждом тике"""
+
+    def __init__(self, engine: SnakeEngine):
+        self.engine = engine
+        self.path: deque = deque()
+        self._target = None
+        self._cells = 0
+        self.recomputes = 0
+
+    def _prepare(self):
+        """Рабочие массивы поиска по размеру поля (метки посещения и предки)"""
+        cells = self.engine.width * self.engine.height
+        if cells != self._cells:
+            self._cells = cells
+            self._seen = array('I', bytes(4 * cells))
+            self._parent = array('i', bytes(4 * cells))
+            self._stamp = 0
+            self.path.clear()
+        # Новая метка вместо очистки массива посещений
+        self._stamp += 1
+        if self._stamp == 0xFFFFFFFF:
+            self._seen = array('I', bytes(4 * cells))
+            self._stamp = 1
+        return self._stamp
+
+    def _neighbors(self, cell: int) -> List[int]:
+        """Соседние клетки в пределах поля"""
+        width = self.engine.width
+        x = cell % width
+        result = []
+        if cell >= width:
+            result.append(cell - width)
+        if cell < self._cells - width:
+            result.append(cell + width)
+        if x > 0:
+            result.append(cell - 1)
+        if x < width - 1:
+            result.append(cell + 1)
+        return result
+
+    def _search(self, start: int, goal: int) -> Optional[List[int]]:
+        """Кратчайший путь от головы к цели по свободным клеткам (без start)"""
+        stamp = self._prepare()
+        seen, parent = self._seen, self._parent
+        occupancy = self.engine.occupancy
+        seen[start] = stamp
+        queue = deque([start])
+        while queue:
+            cell = queue.popleft()
+            if cell == goal:
+                path = []
+                while cell != start:
+                    path.append(cell)
+                    cell = parent[cell]
+                path.reverse()
+                return path
+            for nxt in self._neighbors(cell):
+                if seen[nxt] != stamp and (not occupancy[nxt] or nxt == goal):
+                    seen[nxt] = stamp
+                    parent[nxt] = cell
+                    queue.append(nxt)
+        return None
+
+    def _area(self, start: int, limit: int) -> int:
+        """Сколько свободных клеток достижимо из start (счет останавливается на limit)"""
+        stamp = self._prepare()
+        seen = self._seen
+        occupancy = self.engine.occupancy
+        seen[start] = stamp
+        queue = deque([start])
+        count = 0
+        while queue and count < limit:
+            cell = queue.popleft()
+            count += 1
+            for nxt in self._neighbors(cell):
+                if seen[nxt] != stamp and not occupancy[nxt]:
+                    seen[nxt] = stamp
+                    queue.append(nxt)
+        return count
+
+    def _path_valid(self, head: int, food: Optional[int]) -> bool:
+        """Кэш годен, пока цель та же, а следующая клетка пути рядом с головой и свободна"""
+        if not self.path or food != self._target:
+            return False
+        nxt = self.path[0]
+        return nxt in self._neighbors(head) and not self.engine.occupancy[nxt]
+
+    def decide(self) -> Direction:
+        """Направление на следующий тик"""
+        engine = self.engine
+        head_x, head_y = engine.snake[0]
+        head = head_y * engine.width + head_x
+        food = None
+        if engine.food is not None:
+            food = engine.food[1] * engine.width + engine.food[0]
+
+        if not self._path_valid(head, food):
+            self.path.clear()
+            self._target = food
+            if food is not None:
+                self.recomputes += 1
+                path = self._search(head, food)
+                # Путь к еде берется, только если после первого шага хватит места
+                if path and self._area(path[0], engine.length) >= engine.length:
+                    self.path.extend(path)
+
+        if self.path:
+            return step_direction(head, self.path.popleft())
+        return self._survive(head)
+
+    def _survive(self, head: int) -> Direction:
+        """Запасная стратегия: идти за хвостом, иначе - туда, где больше места"""
+        engine = self.engine
+        tail_x, tail_y = engine.snake[-1]
+        tail = tail_y * engine.width + tail_x
+        if engine.length > 1:
+            path = self._search(head, tail)
+            # Шагнуть прямо в хвост нельзя: он освобождается только после хода
+            if path and len(path) > 1:
+                return step_direction(head, path[0])
+
+        best, best_area = None, -1
+        limit = engine.length + SPACE_MARGIN
+        for cell in self._neighbors(head):
+            if not engine.occupancy[cell]:
+                area = self._area(cell, limit)
+                if area > best_area:
+                    best, best_area = cell, area
+        if best is None:
+            return engine.direction  # Ходов нет - партия закончится
+        return step_direction(head, best)
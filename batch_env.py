@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Пакетное окружение "Змейки": N партий шагают одновременно на массивах NumPy
+Правила те же, что в SnakeEngine: стены, столкновение с собой, +10 очков за еду
+и ускорение каждые 50 очков
+"""
+
+import argparse
+import time
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from snake_engine import (Direction, FOOD_SCORE, GRID_HEIGHT, GRID_WIDTH,
+                          INITIAL_SPEED, MAX_SPEED, SPEED_UP_SCORE)
+
+# Содержимое клетки в тензоре поля
+EMPTY = 0
+BODY = 1
+FOOD = 2
+
+# Направления кодируются индексом в списке Direction
+DIRECTIONS = list(Direction)
+DX = np.array([d.value[0] for d in DIRECTIONS], dtype=np.int64)
+DY = np.array([d.value[1] for d in DIRECTIONS], dtype=np.int64)
+OPPOSITE = np.array([DIRECTIONS.index(d) for d in
+                     (Direction.DOWN, Direction.UP, Direction.RIGHT, Direction.LEFT)],
+                    dtype=np.int8)
+RIGHT = DIRECTIONS.index(Direction.RIGHT)
+
+class BatchSnakeEnv:
+    """N независимых полей с автосбросом закончившихся партий"""
+
+    def __init__(self, num_envs: int, width: int = GRID_WIDTH,
+                 height: int = GRID_HEIGHT, seed: Optional[int] = None):
+        self.num_envs = num_envs
+        self.width = width
+        self.height = height
+        self.cells = width * height
+        self.rng = np.random.default_rng(seed)
+
+        # Поле (N, H, W) и его плоское представление без копирования
+        self.grid = np.zeros((num_envs, height, width), dtype=np.int8)
+        self._flat = self.grid.reshape(num_envs, self.cells)
+        # Тело - кольцевой буфер индексов клеток, голова и хвост - позиции в нем
+        self.body = np.zeros((num_envs, self.cells), dtype=np.int32)
+        self.head = np.zeros(num_envs, dtype=np.int64)
+        self.tail = np.zeros(num_envs, dtype=np.int64)
+        self.length = np.zeros(num_envs, dtype=np.int64)
+        self.direction = np.zeros(num_envs, dtype=np.int8)
+        self.score = np.zeros(num_envs, dtype=np.int64)
+        self.speed = np.zeros(num_envs, dtype=np.int64)
+        self.ticks = np.zeros(num_envs, dtype=np.int64)
+        self._all = np.arange(num_envs)
+        self.reset()
+
+    def reset(self) -> np.ndarray:
+        """Сброс всех полей"""
+        self._reset_envs(self._all)
+        return self.grid
+
+    def _reset_envs(self, idx: np.ndarray):
+        """Сброс выбранных полей к начальному состоянию"""
+        if len(idx) == 0:
+            return
+        start = (self.height // 2) * self.width + self.width // 2
+        self._flat[idx] = EMPTY
+        self._flat[idx, start] = BODY
+        self.body[idx, 0] = start
+        self.head[idx] = 0
+        self.tail[idx] = 0
+        self.length[idx] = 1
+        self.direction[idx] = RIGHT
+        self.score[idx] = 0
+        self.speed[idx] = INITIAL_SPEED
+        self.ticks[idx] = 0
+        self._place_food(idx)
+
+    def _place_food(self, idx: np.ndarray) -> np.ndarray:
+        """Еда в случайной пустой клетке; возвращает маску заполненных полей"""
+        full = np.zeros(len(idx), dtype=bool)
+        if len(idx) == 0:
+            return full
+        # Одна попытка наугад, для промахов - выбор среди пустых клеток.
+        # Вместе это дает равномерное распределение по пустым клеткам
+        cand = self.rng.integers(0, self.cells, size=len(idx))
+        hit = self._flat[idx, cand] == EMPTY
+        miss = np.flatnonzero(~hit)
+        if len(miss):
+            rows = self._flat[idx[miss]]
+            noise = self.rng.random(rows.shape)
+            noise[rows != EMPTY] = -1.0
+            cand[miss] = noise.argmax(axis=1)
+            full[miss] = noise.max(axis=1) < 0
+        placed = idx[~full]
+        self._flat[placed, cand[~full]] = FOOD
+        return full
+
+    def step(self, actions: np.ndarray) -> Tuple[np.ndarray, np.ndarray,
+                                                  np.ndarray, Dict[str, np.ndarray]]:
+        """
+        Один тик всех полей
+        actions - индексы в DIRECTIONS, -1 оставляет текущее направление.
+        Возвращает (поле, награды, завершенные, info); поле обновляется на месте
+        """
+        actions = np.asarray(actions)
+        turn = (actions >= 0) & (actions != OPPOSITE[self.direction])
+        self.direction = np.where(turn, actions, self.direction).astype(np.int8)
+        self.ticks += 1
+
+        head_cell = self.body[self._all, self.head]
+        nx = head_cell % self.width + DX[self.direction]
+        ny = head_cell // self.width + DY[self.direction]
+        wall = (nx < 0) | (nx >= self.width) | (ny < 0) | (ny >= self.height)
+        new_cell = np.where(wall, 0, ny * self.width + nx)
+        # Хвост еще на месте, как и в update_game
+        content = self._flat[self._all, new_cell]
+        dead = wall | (content == BODY)
+        ate = ~dead & (content == FOOD)
+
+        alive = np.flatnonzero(~dead)
+        self.head[alive] = (self.head[alive] + 1) % self.cells
+        self.body[alive, self.head[alive]] = new_cell[alive]
+        self._flat[alive, new_cell[alive]] = BODY
+
+        moved = np.flatnonzero(~dead & ~ate)
+        self._flat[moved, self.body[moved, self.tail[moved]]] = EMPTY
+        self.tail[moved] = (self.tail[moved] + 1) % self.cells
+
+        eaters = np.flatnonzero(ate)
+        self.length[eaters] += 1
+        self.score[eaters] += FOOD_SCORE
+        bump = eaters[self.score[eaters] % SPEED_UP_SCORE == 0]
+        self.speed[bump] = np.minimum(self.speed[bump] + 1, MAX_SPEED)
+        won = np.zeros(self.num_envs, dtype=bool)
+        won[eaters] = self._place_food(eaters)
+
+        rewards = ate * FOOD_SCORE
+        dones = dead | won
+        info = {
+            "score": self.score.copy(),
+            "length": self.length.copy(),
+            "won": won,
+        }
+        self._reset_envs(np.flatnonzero(dones))
+        return self.grid, rewards, dones, info
+
+def measure_throughput(num_envs: int = 1024, steps: int = 1000,
+                       width: int = GRID_WIDTH, height: int = GRID_HEIGHT,
+                       seed: Optional[int] = 0) -> float:
+    """Скорость пакетного окружения со случайными действиями, env-steps/sec"""
+    env = BatchSnakeEnv(num_envs, width, height, seed)
+    actions = env.rng.integers(0, len(DIRECTIONS), size=(steps, num_envs))
+    start = time.perf_counter()
+    for i in range(steps):
+        env.step(actions[i])
+    elapsed = time.perf_counter() - start
+    return num_envs * steps / elapsed
+
+def main():
+    """Замер производительности из командной строки"""
+    parser = argparse.ArgumentParser(description="Замер BatchSnakeEnv")
+    parser.add_argument("--envs", type=int, default=1024)
+    parser.add_argument("--steps", type=int, default=1000)
+    args = parser.parse_args()
+    rate = measure_throughput(args.envs, args.steps)
+    print(f"{args.envs} полей x {args.steps} шагов: {rate:,.0f} env-steps/sec")
+
+if __name__ == "__main__":
+    main()
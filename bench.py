@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Замеры производительности "Змейки": движок, размещение еды, отрисовка,
+решатель по гамильтонову циклу, журнал отката, комнаты сетевой игры и запуск игры
+Результаты пишутся в JSON, чтобы сравнивать версии между собой
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Tuple
+
+from snake_engine import Direction, SnakeEngine
+
+# Поле для замеров движка: змейка длиной до 10000 укладывается змейкой по строкам
+BENCH_BOARD = 128
+SNAKE_LENGTHS = (1, 100, 1000, 10000)
+FILL_RATIOS = (0.1, 0.25, 0.5, 0.75, 0.9, 0.99)
+DRAW_LENGTHS = (1, 100, 1000)
+# Поля для замера решателя: партия идет до полного заполнения
+SOLVER_BOARDS = ((20, 15), (40, 30))
+# Поля для замера журнала отката: стоимость тика не должна зависеть от размера
+REWIND_BOARDS = (100, 2048)
+# Змейка ходит по квадрату со стороной REWIND_LOOP клеток вокруг центра поля
+REWIND_LOOP = 10
+
+# Комнаты сетевой игры: сколько комнат и игроков в каждой
+ARENA_ROOMS = 200
+ARENA_PLAYERS = 4
+
+# Замер запуска в отдельном интерпретаторе: импорт, создание игры и первый кадр меню
+STARTUP_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import snake_game
+imported = time.perf_counter()
+pygame_loaded = 'pygame.base' in sys.modules
+screen = snake_game.pygame.Surface((snake_game.WINDOW_WIDTH, snake_game.WINDOW_HEIGHT))
+game = snake_game.SnakeGame(screen=screen)
+constructed = time.perf_counter()
+game.draw()
+drawn = time.perf_counter()
+print(json.dumps({"import_ms": (imported - start) * 1e3,
+                  "construct_ms": (constructed - imported) * 1e3,
+                  "first_frame_ms": (drawn - constructed) * 1e3,
+                  "pygame_loaded_on_import": float(pygame_loaded)}))
+"""
+
+STEPS = {(1, 0): Direction.RIGHT, (-1, 0): Direction.LEFT,
+         (0, 1): Direction.DOWN, (0, -1): Direction.UP}
+
+def serpentine(width: int, height: int) -> List[Tuple[int, int]]:
+    """Обход поля по строкам туда и обратно: соседние клетки пути смежны"""
+    path = []
+    for y in range(height):
+        xs = range(width) if y % 2 == 0 else range(width - 1, -1, -1)
+        path.extend((x, y) for x in xs)
+    return path
+
+def snake_on_path(engine: SnakeEngine, path: List[Tuple[int, int]], length: int) -> List[Direction]:
+    """Уложить змейку на начало пути; возвращает направления для движения дальше по нему"""
+    head = path[length - 1]
+    after = path[length - 1:]
+    moves = [STEPS[(b[0] - a[0], b[1] - a[1])] for a, b in zip(after, after[1:])]
+    first = moves[0] if moves else Direction.RIGHT
+    engine.place_snake(path[length - 1::-1], first)
+    assert engine.snake[0] == head
+    return moves
+
+def bench_engine(quick: bool) -> Dict[str, Dict[str, float]]:
+    """Тики движка в секунду при разной длине змейки"""
+    path = serpentine(BENCH_BOARD, BENCH_BOARD)
+    results = {}
+    for length in SNAKE_LENGTHS:
+        engine = SnakeEngine(BENCH_BOARD, BENCH_BOARD, seed=0)
+        moves = snake_on_path(engine, path, length)
+        moves = moves[:500 if quick else 5000]
+        start = time.perf_counter()
+        for direction in moves:
+            engine.step(direction)
+        elapsed = time.perf_counter() - start
+        assert not engine.done
+        results[f"length_{length}"] = {
+            "ticks": len(moves),
+            "ticks_per_sec": len(moves) / elapsed,
+        }
+    return results
+
+def bench_food(quick: bool) -> Dict[str, Dict[str, float]]:
+    """Задержка generate_food при разной заполненности поля"""
+    path = serpentine(BENCH_BOARD, BENCH_BOARD)
+    calls = 1000 if quick else 20000
+    results = {}
+    for ratio in FILL_RATIOS:
+        engine = SnakeEngine(BENCH_BOARD, BENCH_BOARD, seed=0)
+        snake_on_path(engine, path, int(len(path) * ratio))
+        generate_food = engine.generate_food
+        start = time.perf_counter()
+        for _ in range(calls):
+            generate_food()
+        elapsed = time.perf_counter() - start
+        results[f"fill_{int(ratio * 100)}"] = {
+            "calls": calls,
+            "latency_us": elapsed / calls * 1e6,
+        }
+    return results
+
+def bench_draw(quick: bool) -> Dict[str, Dict[str, float]]:
+    """Время кадра на поверхности в памяти (драйвер SDL dummy)"""
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    import pygame
+    from snake_game import GRID_HEIGHT, GRID_WIDTH, WINDOW_HEIGHT, WINDOW_WIDTH, GameState, SnakeGame
+
+    game = SnakeGame(screen=pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT)))
+    game.state = GameState.PLAYING
+    path = serpentine(GRID_WIDTH, GRID_HEIGHT)
+    frames = 50 if quick else 500
+    results = {}
+    for length in DRAW_LENGTHS:
+        game.reset_game()
+        moves = snake_on_path(game.engine, path, length)
+        start = time.perf_counter()
+        for _ in range(frames):
+            game.draw()
+        full = (time.perf_counter() - start) / frames
+
+        # Инкрементальный кадр: один тик и перерисовка изменившихся клеток
+        game.render()
+        ticks = min(frames, len(moves))
+        start = time.perf_counter()
+        for direction in moves[:ticks]:
+            game.engine.step(direction)
+            game.render()
+        incremental = (time.perf_counter() - start) / max(ticks, 1)
+        results[f"length_{length}"] = {
+            "full_frame_ms": full * 1e3,
+            "incremental_frame_ms": incremental * 1e3,
+        }
+    pygame.quit()
+    return results
+
+def bench_hamiltonian(quick: bool) -> Dict[str, Dict[str, float]]:
+    """Решатель по гамильтонову циклу: ходы в секунду и тики до заполнения поля"""
+    from hamiltonian import HamiltonianSolver
+
+    boards = SOLVER_BOARDS[:1] if quick else SOLVER_BOARDS
+    results = {}
+    for width, height in boards:
+        engine = SnakeEngine(width, height, seed=0)
+        solver = HamiltonianSolver(engine)
+        start = time.perf_counter()
+        while not engine.done:
+            engine.step(solver.decide())
+        elapsed = time.perf_counter() - start
+        assert engine.won
+        results[f"board_{width}x{height}"] = {
+            "ticks_to_clear": engine.ticks,
+            "moves_per_sec": engine.ticks / elapsed,
+        }
+    return results
+
+def bench_rewind(quick: bool) -> Dict[str, Dict[str, float]]:
+    """Тик с записью в журнал отката, откат тика и снимок партии на полях разного размера"""
+    loop = [direction for direction in (Direction.RIGHT, Direction.DOWN,
+                                        Direction.LEFT, Direction.UP)
+            for _ in range(REWIND_LOOP)]
+    ticks = 2000 if quick else 20000
+    results = {}
+    for size in REWIND_BOARDS:
+        engine = SnakeEngine(size, size, seed=0)
+        history = []
+        step_with_undo = engine.step_with_undo
+        start = time.perf_counter()
+        for tick in range(ticks):
+            history.append(step_with_undo(loop[tick % len(loop)])[1])
+        stepped = time.perf_counter() - start
+        assert not engine.done
+
+        undo = engine.undo
+        start = time.perf_counter()
+        while history:
+            undo(history.pop())
+        undone = time.perf_counter() - start
+        assert engine.ticks == 0
+
+        snapshot, restore = engine.snapshot, engine.restore
+        start = time.perf_counter()
+        for _ in range(ticks):
+            restore(snapshot())
+        snapped = time.perf_counter() - start
+        results[f"board_{size}x{size}"] = {
+            "step_with_undo_us": stepped / ticks * 1e6,
+            "undo_us": undone / ticks * 1e6,
+            "snapshot_restore_us": snapped / ticks * 1e6,
+        }
+    return results
+
+def bench_arena(quick: bool) -> Dict[str, Dict[str, float]]:
+    """Тики комнат сетевой игры со сборкой изменений (без сети): сколько комнат тянет ядро"""
+    import random
+    from arena import DIRECTIONS, Arena
+    from snake_engine import INITIAL_SPEED
+
+    rooms = ARENA_ROOMS // 4 if quick else ARENA_ROOMS
+    ticks = 20 if quick else 200
+    rng = random.Random(0)
+    arenas = [Arena(seed=i) for i in range(rooms)]
+    for arena in arenas:
+        for _ in range(ARENA_PLAYERS):
+            arena.add_player()
+        arena.tick()
+    sent = 0
+    start = time.perf_counter()
+    for _ in range(ticks):
+        for arena in arenas:
+            for player in arena.snakes:
+                if rng.random() < 0.2:
+                    arena.turn(player, rng.choice(DIRECTIONS))
+            sent += len(arena.tick())
+    elapsed = time.perf_counter() - start
+    room_ticks = rooms * ticks
+    return {f"rooms_{rooms}x{ARENA_PLAYERS}": {
+        "room_ticks_per_sec": room_ticks / elapsed,
+        "rooms_per_core": room_ticks / elapsed / INITIAL_SPEED,
+        "bytes_per_tick": sent / room_ticks,
+    }}
+
+def bench_startup(quick: bool) -> Dict[str, Dict[str, float]]:
+    """Время запуска игры: импорт (без загрузки pygame), создание и первый кадр (медианы)"""
+    env = dict(os.environ, SDL_VIDEODRIVER="dummy", PYGAME_HIDE_SUPPORT_PROMPT="1")
+    root = os.path.dirname(os.path.abspath(__file__))
+    samples = []
+    for _ in range(3 if quick else 10):
+        output = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT], env=env, cwd=root,
+                                capture_output=True, text=True, check=True).stdout
+        samples.append(json.loads(output.splitlines()[-1]))
+    return {"snake_game": {key: statistics.median(sample[key] for sample in samples)
+                           for key in samples[0]}}
+
+# Набор замеров: имя -> функция(quick) -> результаты
+BENCHMARKS: Dict[str, Callable[[bool], Dict[str, Dict[str, float]]]] = {
+    "engine": bench_engine,
+    "food": bench_food,
+    "draw": bench_draw,
+    "hamiltonian": bench_hamiltonian,
+    "rewind": bench_rewind,
+    "arena": bench_arena,
+    "startup": bench_startup,
+}
+
+def run_benchmarks(names: List[str], quick: bool = False) -> Dict:
+    """Прогон выбранных замеров; результат готов к сохранению в JSON"""
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "quick": quick,
+        "results": {},
+    }
+    for name in names:
+        report["results"][name] = BENCHMARKS[name](quick)
+    return report
+
+def main():
+    """Запуск замеров из командной строки"""
+    parser = argparse.ArgumentParser(description="Замеры производительности")
+    parser.add_argument("cases", nargs="*",
+                        help=f"какие замеры запускать: {', '.join(BENCHMARKS)} (по умолчанию все)")
+    parser.add_argument("--output", default="bench_results.json",
+                        help="файл для результатов в JSON")
+    parser.add_argument("--quick", action="store_true", help="короткий прогон")
+    args = parser.parse_args()
+    unknown = [name for name in args.cases if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"неизвестные замеры: {', '.join(unknown)}")
+
+    report = run_benchmarks(args.cases or list(BENCHMARKS), args.quick)
+    for name, cases in report["results"].items():
+        print(f"{name}:")
+        for case, values in cases.items():
+            line = ", ".join(f"{key}={value:,.2f}" for key, value in values.items())
+            print(f"   {case}: {line}")
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Результаты сохранены в {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Запись кадров "Змейки" в видео: последовательность PNG, GIF или MP4
+Игровой цикл только копирует буфер пикселей кадра в ограниченную очередь,
+кодирует фоновый поток. Если кодировщик не успевает, лишние кадры
+отбрасываются, а игра не ждет. GIF и MP4 пишет ffmpeg (если установлен),
+PNG - сам pygame. Повторы можно отрендерить без окна с максимальной скоростью
+"""
+
+import argparse
+import os
+import queue
+import shutil
+import subprocess
+import sys
+import threading
+from typing import Optional, Tuple
+
+# Частота кадров записи по умолчанию
+CAPTURE_FPS = 30
+# Сколько кадров может ждать кодирования (кадр 800x600 - около 2 МБ)
+QUEUE_FRAMES = 64
+# Сколько секунд держать последний кадр повтора в ролике
+HOLD_SECONDS = 1.0
+FFMPEG_FORMATS = (".gif", ".mp4", ".webm", ".mkv", ".avi", ".mov")
+
+class PngSequence:
+    """Кадры в отдельных PNG-файлах каталога: frame_000000.png, ..."""
+
+    def __init__(self, directory: str, size: Tuple[int, int]):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.size = size
+        self.index = 0
+
+    def write(self, rgb: bytes):
+        import pygame
+        surface = pygame.image.frombuffer(rgb, self.size, "RGB")
+        pygame.image.save(surface, os.path.join(self.directory, f"frame_{self.index:06d}.png"))
+        self.index += 1
+
+    def close(self):
+        pass
+
+class FfmpegEncoder:
+    """Кадры в сырой RGB-поток на вход ffmpeg; формат ролика - по расширению файла"""
+
+    def __init__(self, path: str, size: Tuple[int, int], fps: float):
+        ffmpeg = shutil.which("ffmpeg")
+        if ffmpeg is None:
+            raise ValueError("для GIF и видео нужен ffmpeg; без него можно записать "
+                             "последовательность PNG (укажите каталог)")
+        command = [ffmpeg, "-y", "-loglevel", "error", "-f", "rawvideo", "-pix_fmt", "rgb24",
+                   "-s", f"{size[0]}x{size[1]}", "-r", str(fps), "-i", "-"]
+        if path.lower().endswith(".gif"):
+            # Палитра по всему ролику: без нее GIF получается пятнистым
+            command += ["-vf", "split[a][b];[a]palettegen[p];[b][p]paletteuse"]
+        else:
+            command += ["-pix_fmt", "yuv420p"]
+        self.process = subprocess.Popen(command + [path], stdin=subprocess.PIPE)
+
+    def write(self, rgb: bytes):
+        self.process.stdin.write(rgb)
+
+    def close(self):
+        self.process.stdin.close()
+        if self.process.wait() != 0:
+            raise OSError(f"ffmpeg завершился с кодом {self.process.returncode}")
+
+def open_encoder(path: str, size: Tuple[int, int], fps: float):
+    """Кодировщик по пути: известное расширение видео - ffmpeg, иначе каталог PNG"""
+    if os.path.splitext(path)[1].lower() in FFMPEG_FORMATS:
+        return FfmpegEncoder(path, size, fps)
+    return PngSequence(path, size)
+
+class FrameCapture:
+    """
+    Запись кадров с кодированием в фоновом потоке
+    capture() копирует буфер поверхности и сразу возвращается; при полной
+    очереди кадр отбрасывается (block=True - ждать места, для записи без окна)
+    """
+
+    def __init__(self, path: str, size: Tuple[int, int], fps: float = CAPTURE_FPS,
+                 queue_frames: int = QUEUE_FRAMES):
+        self.path = path
+        self.size = size
+        self.fps = fps
+        self.interval = 1.0 / fps
+        # Кодировщик создается сразу: нет ffmpeg - ошибка до начала игры
+        self.encoder = open_encoder(path, size, fps)
+        self.captured = 0
+        self.dropped = 0
+        self.encoded = 0
+        self.error: Optional[Exception] = None
+        self._closed = False
+        self._layout = None
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_frames)
+        self._thread = threading.Thread(target=self._worker, name="capture", daemon=True)
+        self._thread.start()
+
+    def __enter__(self) -> "FrameCapture":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def capture(self, surface, block: bool = False) -> bool:
+        """Поставить кадр в очередь; False - кадр отброшен"""
+        if self.error is not None:
+            return False
+        if not block and self._queue.full():
+            self.dropped += 1  # Не копируем кадр, который все равно некуда положить
+            return False
+        if self._layout is None:
+            self._layout = self._surface_layout(surface)
+        elif surface.get_size() != self.size:
+            raise ValueError("размер кадра изменился во время записи")
+        # Одно копирование буфера пикселей как есть; перевод в RGB - в потоке кодирования
+        view = surface.get_view("1")
+        data = view.raw
+        del view  # Поверхность заблокирована, пока живет представление
+        if block:
+            queued = self._put(data)
+        else:
+            try:
+                self._queue.put_nowait(data)
+                queued = True
+            except queue.Full:
+                queued = False
+        if not queued:
+            self.dropped += 1
+            return False
+        self.captured += 1
+        return True
+
+    def _put(self, item) -> bool:
+        """Положить в очередь с ожиданием места, пока жив поток кодирования"""
+        while self._thread.is_alive():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _surface_layout(self, surface) -> Tuple[int, int, Tuple[int, int, int]]:
+        """Шаг строки, байт на пиксель и байты каналов R, G, B в пикселе"""
+        if surface.get_size() != self.size:
+            raise ValueError(f"размер кадра {surface.get_size()} не совпадает с {self.size}")
+        bytesize = surface.get_bytesize()
+        if bytesize not in (3, 4):
+            raise ValueError("записываются только поверхности с 24 или 32 битами на пиксель")
+        shifts = surface.get_shifts()[:3]
+        if sys.byteorder == "little":
+            channels = tuple(shift // 8 for shift in shifts)
+        else:
+            channels = tuple(bytesize - 1 - shift // 8 for shift in shifts)
+        return surface.get_pitch(), bytesize, channels
+
+    def _to_rgb(self, data: bytes) -> bytes:
+        import numpy as np
+        pitch, bytesize, channels = self._layout
+        width, height = self.size
+        pixels = np.frombuffer(data, np.uint8).reshape(height, pitch)[:, :width * bytesize]
+        return pixels.reshape(height, width, bytesize)[:, :, channels].tobytes()
+
+    def _worker(self):
+        """Поток кодирования: после ошибки кадры только вынимаются, чтобы игра не ждала"""
+        while True:
+            data = self._queue.get()
+            if data is None:
+                break
+            if self.error is not None:
+                continue
+            try:
+                self.encoder.write(self._to_rgb(data))
+                self.encoded += 1
+            except Exception as e:  # Любая ошибка кодировщика (в т.ч. pygame.error)
+                self.error = e
+                print(f"Запись кадров остановлена: {e}", file=sys.stderr)
+
+    def close(self):
+        """Дописать очередь и закрыть файл; не ждет, если поток кодирования уже остановлен"""
+        if self._closed:
+            return
+        self._closed = True
+        self._put(None)
+        self._thread.join()
+        try:
+            self.encoder.close()
+        except Exception as e:
+            self.error = self.error or e
+
+    def summary(self) -> str:
+        text = f"{self.path}: записано {self.encoded} кадров, отброшено {self.dropped}"
+        if self.error is not None:
+            text += f", ошибка: {self.error}"
+        return text
+
+def render_replay(replay_path: str, out_path: str, fps: float = CAPTURE_FPS,
+                  speedup: float = 1.0) -> FrameCapture:
+    """
+    Ролик из повтора без окна и без ожидания: время игры идет по кадрам ролика
+    (speedup - во сколько раз быстрее настоящей игры), кадры не отбрасываются
+    """
+    import pygame
+    from replay import Replay
+    from snake_game import WINDOW_HEIGHT, WINDOW_WIDTH, GameState, SnakeGame
+
+    with Replay(replay_path) as replay:
+        screen = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
+        game = SnakeGame(replay, screen=screen)
+        with FrameCapture(out_path, screen.get_size(), fps) as capture:
+            # Тот же фиксированный шаг, что в SnakeGame.run, но по времени ролика
+            step = speedup / fps
+            accumulator = 0.0
+            while game.state == GameState.PLAYING and capture.error is None:
+                accumulator += step
+                while accumulator * game.speed >= 1.0 and game.state == GameState.PLAYING:
+                    accumulator -= 1.0 / game.speed
+                    game.update_game()
+                game.alpha = min(accumulator * game.speed, 1.0)
+                game.compose()
+                capture.capture(screen, block=True)
+            # Экран конца игры
+            game.compose()
+            for _ in range(max(1, int(HOLD_SECONDS * fps))):
+                capture.capture(screen, block=True)
+    return capture
+
+def main():
+    """Рендер повтора в ролик из командной строки"""
+    parser = argparse.ArgumentParser(description="Рендер повтора в PNG, GIF или видео")
+    parser.add_argument("replay", help="файл повтора .snkr")
+    parser.add_argument("output", help="каталог для PNG или файл .gif/.mp4 (нужен ffmpeg)")
+    parser.add_argument("--fps", type=float, default=CAPTURE_FPS)
+    parser.add_argument("--speedup", type=float, default=1.0,
+                        help="во сколько раз быстрее настоящей игры")
+    args = parser.parse_args()
+    try:
+        capture = render_replay(args.replay, args.output, args.fps, args.speedup)
+    except (OSError, ValueError) as e:
+        raise SystemExit(f"Не удалось отрендерить повтор: {e}")
+    print(capture.summary())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Сравнение агентов "Змейки" на тысячах партий
+Каждый агент играет одни и те же партии (одинаковые seed), поэтому разницу
+между агентами можно считать попарно. Партии идут на пуле процессов пачками,
+результат каждой партии дописывается в CSV по мере готовности пачки, так что
+прерванный прогон не пропадает. В отчете - среднее с 95% доверительным
+интервалом и перцентили счета, длины, числа тиков и скорости решений
+"""
+
+import abc
+import argparse
+import csv
+import importlib
+import math
+import os
+import random
+import statistics
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+from rollout import episode_seed
+from rules import Rules, load_rules
+from snake_engine import OPPOSITE, Direction, SnakeEngine
+
+# Поля результата партии (столбцы CSV)
+FIELDS = ("agent", "episode", "seed", "score", "length", "ticks", "won",
+          "decisions", "decide_time")
+# Показатели отчета
+METRICS = ("score", "length", "ticks", "decisions_per_sec")
+# Больше тиков партия не длится (бот может ходить по кругу без еды)
+MAX_TICKS = 100_000
+# Партий в одной задаче пула: реже - меньше накладных расходов, чаще - чаще запись
+CHUNK_EPISODES = 32
+# Множитель 95% доверительного интервала (нормальное приближение)
+Z_95 = 1.959964
+
+class EpisodeResult(NamedTuple):
+    """Результат одной партии; decide_time - суммарное время observe + decide, с"""
+    agent: str
+    episode: int
+    seed: int
+    score: int
+    length: int
+    ticks: int
+    won: bool
+    decisions: int
+    decide_time: float
+
+    @property
+    def decisions_per_sec(self) -> float:
+        return self.decisions / self.decide_time if self.decide_time > 0 else 0.0
+
+class Agent(abc.ABC):
+    """
+    Агент для оценки: observe() -> decide(наблюдение) -> направление
+    reset() вызывается перед каждой партией; по умолчанию наблюдение -
+    Observation движка. Ботам, которые работают с движком напрямую, стоит
+    переопределить observe(), чтобы не строить ненужное наблюдение
+    """
+
+    def reset(self, engine: SnakeEngine):
+        self.engine = engine
+
+    def observe(self) -> Any:
+        return self.engine.observe()
+
+    @abc.abstractmethod
+    def decide(self, observation: Any) -> Optional[Direction]:
+        """Направление на следующий тик; None - продолжать движение"""
+
+class RandomAgent(Agent):
+    """Случайное направление; генератор зависит только от seed партии"""
+
+    def reset(self, engine: SnakeEngine):
+        super().reset(engine)
+        self.rng = random.Random(engine.seed)
+        self.directions = list(Direction)
+
+    def observe(self) -> None:
+        return None
+
+    def decide(self, observation: None) -> Direction:
+        return self.rng.choice(self.directions)
+
+class GreedyAgent(Agent):
+    """Эвристика: шаг, сокращающий расстояние до еды, не в стену и не в себя"""
+
+    def observe(self) -> None:
+        return None
+
+    def decide(self, observation: None) -> Direction:
+        engine = self.engine
+        head_x, head_y = engine.snake[0]
+        food = engine.food or (head_x, head_y)
+        best, best_distance = engine.direction, None
+        for direction in Direction:
+            if direction == OPPOSITE[engine.direction]:
+                continue
+            dx, dy = direction.value
+            x, y = head_x + dx, head_y + dy
+            if not (0 <= x < engine.width and 0 <= y < engine.height) \
+                    or engine.occupancy[y * engine.width + x]:
+                continue
+            distance = abs(food[0] - x) + abs(food[1] - y)
+            if best_distance is None or distance < best_distance:
+                best, best_distance = direction, distance
+        return best
+
+class SolverAgent(Agent):
+    """Обертка над ботами автопилота: решатель создается на движок партии"""
+    solver: Callable[[SnakeEngine], Any]
+
+    def reset(self, engine: SnakeEngine):
+        super().reset(engine)
+        self.bot = self.solver(engine)
+
+    def observe(self) -> None:
+        return None
+
+    def decide(self, observation: None) -> Direction:
+        return self.bot.decide()
+
+class AutopilotAgent(SolverAgent):
+    """Поиск пути к еде (autopilot.py)"""
+
+    @staticmethod
+    def solver(engine: SnakeEngine):
+        from autopilot import Autopilot
+        return Autopilot(engine)
+
+class HamiltonianAgent(SolverAgent):
+    """Обход по гамильтонову циклу (hamiltonian.py); где цикла нет - поиск пути"""
+
+    @staticmethod
+    def solver(engine: SnakeEngine):
+        from hamiltonian import HamiltonianSolver, cycle_supported
+        if not cycle_supported(engine):
+            return AutopilotAgent.solver(engine)
+        return HamiltonianSolver(engine)
+
+AGENTS: Dict[str, Callable[[], Agent]] = {
+    "random": RandomAgent,
+    "greedy": GreedyAgent,
+    "bfs": AutopilotAgent,
+    "hamiltonian": HamiltonianAgent,
+}
+
+def load_agent(spec: str) -> Agent:
+    """Агент по имени из AGENTS или по пути "модуль:Класс" (импортируется в каждом процессе)"""
+    if spec in AGENTS:
+        return AGENTS[spec]()
+    module, _, name = spec.partition(":")
+    if not name:
+        raise ValueError(f"неизвестный агент {spec!r}: укажите одно из {', '.join(AGENTS)} "
+                         f"или модуль:Класс")
+    return getattr(importlib.import_module(module), name)()
+
+def play_episode(engine: SnakeEngine, agent: Agent, name: str, episode: int, seed: int,
+                 max_ticks: int = MAX_TICKS) -> EpisodeResult:
+    """Одна партия; время считается только на observe + decide"""
+    engine.reset(seed)
+    agent.reset(engine)
+    clock = time.perf_counter
+    observe, decide, step = agent.observe, agent.decide, engine.step
+    decide_time = 0.0
+    while not engine.done and engine.ticks < max_ticks:
+        start = clock()
+        action = decide(observe())
+        decide_time += clock() - start
+        step(action)
+    return EpisodeResult(name, episode, seed, engine.score, engine.length, engine.ticks,
+                         engine.won, engine.ticks, decide_time)
+
+def _run_chunk(spec: str, episodes: Sequence[int], seed: int, rules: Rules,
+               max_ticks: int) -> List[EpisodeResult]:
+    """Задача пула: пачка партий одного агента"""
+    engine = SnakeEngine(rules=rules)
+    agent = load_agent(spec)
+    return [play_episode(engine, agent, spec, episode, episode_seed(seed, episode), max_ticks)
+            for episode in episodes]
+
+def evaluate(agents: Sequence[str], episodes: int, workers: Optional[int] = None,
+             seed: int = 0, rules: Rules = Rules(), max_ticks: int = MAX_TICKS,
+             out_path: Optional[str] = None,
+             progress: Optional[Callable[[int, int], None]] = None) -> List[EpisodeResult]:
+    """
+    episodes партий на каждого агента с одинаковыми seed на workers процессах
+    Результаты дописываются в out_path (CSV) по мере готовности пачек;
+    возвращаются отсортированными по агенту и номеру партии
+    """
+    for spec in agents:
+        load_agent(spec)  # Ошибку в имени агента лучше увидеть до запуска пула
+    workers = workers or os.cpu_count() or 1
+    chunk = max(1, min(CHUNK_EPISODES, episodes // (workers * 4) or 1))
+    tasks = [(spec, range(first, min(first + chunk, episodes)))
+             for first in range(0, episodes, chunk) for spec in agents]
+    total = len(agents) * episodes
+    results: List[EpisodeResult] = []
+
+    out = open(out_path, 'w', newline='') if out_path else None
+    try:
+        writer = csv.writer(out) if out else None
+        if writer:
+            writer.writerow(FIELDS)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = {pool.submit(_run_chunk, spec, list(block), seed, rules, max_ticks)
+                       for spec, block in tasks}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    batch = future.result()
+                    results.extend(batch)
+                    if writer:
+                        writer.writerows(batch)
+                        out.flush()
+                if progress:
+                    progress(len(results), total)
+    finally:
+        if out:
+            out.close()
+    order = {spec: i for i, spec in enumerate(agents)}
+    results.sort(key=lambda r: (order[r.agent], r.episode))
+    return results
+
+def read_results(path: str) -> List[EpisodeResult]:
+    """Результаты из CSV (в том числе недописанного прогона)"""
+    with open(path, newline='') as f:
+        rows = list(csv.DictReader(f))
+    return [EpisodeResult(row["agent"], int(row["episode"]), int(row["seed"]), int(row["score"]),
+                          int(row["length"]), int(row["ticks"]), row["won"] == "True",
+                          int(row["decisions"]), float(row["decide_time"]))
+            for row in rows]
+
+class Stat(NamedTuple):
+    """Среднее с 95% доверительным интервалом и перцентили"""
+    n: int
+    mean: float
+    ci: float
+    p5: float
+    p50: float
+    p95: float
+
+def describe(values: Sequence[float]) -> Stat:
+    """Сводка по выборке; интервал - mean +- ci"""
+    n = len(values)
+    if n == 0:
+        return Stat(0, math.nan, math.nan, math.nan, math.nan, math.nan)
+    mean = statistics.fmean(values)
+    if n == 1:
+        return Stat(1, mean, math.nan, mean, mean, mean)
+    ci = Z_95 * statistics.stdev(values) / math.sqrt(n)
+    cuts = statistics.quantiles(values, n=20, method='inclusive')
+    return Stat(n, mean, ci, cuts[0], cuts[9], cuts[18])
+
+def summarize(results: Iterable[EpisodeResult]) -> Dict[str, Dict[str, Stat]]:
+    """Сводка по каждому агенту и показателю (METRICS), плюс доля побед"""
+    by_agent: Dict[str, List[EpisodeResult]] = {}
+    for result in results:
+        by_agent.setdefault(result.agent, []).append(result)
+    return {agent: {**{metric: describe([getattr(r, metric) for r in rows]) for metric in METRICS},
+                    "won": describe([float(r.won) for r in rows])}
+            for agent, rows in by_agent.items()}
+
+def paired_difference(results: Iterable[EpisodeResult], agent: str, baseline: str,
+                      metric: str = "score") -> Stat:
+    """Разница agent - baseline по партиям с одинаковым seed"""
+    values: Dict[str, Dict[int, float]] = {agent: {}, baseline: {}}
+    for result in results:
+        if result.agent in values:
+            values[result.agent][result.seed] = getattr(result, metric)
+    seeds = values[agent].keys() & values[baseline].keys()
+    return describe([values[agent][s] - values[baseline][s] for s in sorted(seeds)])
+
+def _interval(stat: Stat, spec: str) -> str:
+    """Среднее ± полуширина 95% доверительного интервала"""
+    return f"{stat.mean:{spec}} ± {stat.ci:{spec}}"
+
+def format_report(results: Sequence[EpisodeResult]) -> str:
+    """Таблица сводки (среднее ± 95% ДИ) и попарные разницы счета с первым агентом"""
+    summary = summarize(results)
+    lines = [f"{'агент':<14}{'партий':>7}  {'счет (95% ДИ)':>20}  {'p5/p50/p95':>16}"
+             f"{'длина':>16}{'тики':>18}{'победы':>8}{'решений/с':>22}"]
+    for agent, stats in summary.items():
+        score = stats["score"]
+        lines.append(f"{agent:<14}{score.n:>7}  {score.mean:>10.1f} ± {score.ci:<7.1f}"
+                     f"  {score.p5:>4.0f}/{score.p50:>4.0f}/{score.p95:>6.0f}"
+                     f"{_interval(stats['length'], '.1f'):>16}"
+                     f"{_interval(stats['ticks'], '.0f'):>18}"
+                     f"{stats['won'].mean:>8.1%}"
+                     f"{_interval(stats['decisions_per_sec'], ',.0f'):>22}")
+    agents = list(summary)
+    for agent in agents[1:]:
+        diff = paired_difference(results, agent, agents[0])
+        lines.append(f"{agent} - {agents[0]}: счет {diff.mean:+.1f} ± {diff.ci:.1f} "
+                     f"(попарно по {diff.n} партиям)")
+    return "\n".join(lines)
+
+def main():
+    """Сравнение агентов из командной строки"""
+    parser = argparse.ArgumentParser(description="Сравнение агентов на одинаковых партиях")
+    parser.add_argument("agents", nargs="*",
+                        help=f"агенты: {', '.join(AGENTS)} или модуль:Класс")
+    parser.add_argument("--episodes", type=int, default=1000, help="партий на агента")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-ticks", type=int, default=MAX_TICKS)
+    parser.add_argument("--rules", metavar="FILE", help="правила игры (.toml или .json)")
+    parser.add_argument("--out", default="evaluation.csv",
+                        help="CSV с результатами партий (дописывается по ходу прогона)")
+    parser.add_argument("--report", metavar="CSV",
+                        help="только построить отчет по готовому CSV")
+    args = parser.parse_args()
+
+    if args.report:
+        print(format_report(read_results(args.report)))
+        return
+    if not args.agents:
+        parser.error("укажите хотя бы одного агента или --report")
+    if args.episodes < 1:
+        parser.error("--episodes должно быть не меньше 1")
+    rules = load_rules(args.rules) if args.rules else Rules()
+
+    def progress(done: int, total: int):
+        print(f"\r{done}/{total} партий", end="", flush=True)
+
+    start = time.perf_counter()
+    try:
+        results = evaluate(args.agents, args.episodes, args.workers, args.seed, rules,
+                           args.max_ticks, args.out, progress)
+    except (ImportError, AttributeError, TypeError, ValueError) as e:
+        parser.error(str(e))
+    print(f"\r{len(results)} партий за {time.perf_counter() - start:.1f} с, "
+          f"результаты в {args.out}")
+    print(format_report(results))
+
+if __name__ == "__main__":
+    main()
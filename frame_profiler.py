@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Профилировщик кадра: время каждой фазы игрового цикла в кольцевом буфере
+Хранит последние N кадров и считает по ним p50/p95/p99
+"""
+
+import csv
+import json
+from array import array
+from typing import Dict, Sequence, Tuple
+
+# Фазы цикла run() в порядке выполнения
+PHASES = ("events", "update", "draw", "flip")
+# Сколько последних кадров хранится
+HISTORY_SIZE = 600
+
+class FrameProfiler:
+    """Кольцевой буфер длительностей фаз (в секундах)"""
+
+    def __init__(self, size: int = HISTORY_SIZE):
+        self.size = size
+        self.samples = {phase: array('d', bytes(8 * size)) for phase in PHASES}
+        self._columns = [self.samples[phase] for phase in PHASES]
+        self.index = 0
+        self.count = 0
+        self.frames = 0
+
+    def record(self, timings: Sequence[float]):
+        """Записать длительности фаз одного кадра в порядке PHASES"""
+        index = self.index
+        for column, value in zip(self._columns, timings):
+            column[index] = value
+        self.index = (index + 1) % self.size
+        self.count = min(self.count + 1, self.size)
+        self.frames += 1
+
+    def percentiles(self, phase: str) -> Tuple[float, float, float]:
+        """p50, p95 и p99 фазы по накопленным кадрам, в миллисекундах"""
+        if self.count == 0:
+            return (0.0, 0.0, 0.0)
+        values = sorted(self.samples[phase][:self.count])
+        last = self.count - 1
+        return tuple(values[round(last * q)] * 1e3 for q in (0.5, 0.95, 0.99))
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Перцентили всех фаз"""
+        result = {}
+        for phase in PHASES:
+            p50, p95, p99 = self.percentiles(phase)
+            result[phase] = {"p50_ms": p50, "p95_ms": p95, "p99_ms": p99}
+        return result
+
+    def dump(self, path: str):
+        """Сохранение в CSV (кадр на строку) или JSON (сводка и кадры) по расширению файла"""
+        # Кадры от самого старого к новому
+        start = self.index if self.count == self.size else 0
+        order = [(start + i) % self.size for i in range(self.count)]
+        if path.endswith('.csv'):
+            with open(path, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(("frame",) + tuple(f"{phase}_ms" for phase in PHASES))
+                first = self.frames - self.count
+                for n, i in enumerate(order):
+                    writer.writerow([first + n] + [f"{column[i] * 1e3:.4f}" for column in self._columns])
+        else:
+            data = {
+                "frames": self.frames,
+                "summary": self.summary(),
+                "samples_ms": {phase: [self.samples[phase][i] * 1e3 for i in order]
+                               for phase in PHASES},
+            }
+            with open(path, 'w') as f:
+                json.dump(data, f, indent=2)
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Решатель "Змейки" по гамильтонову циклу: гарантированно заполняет всё поле
+Цикл строится один раз на размер поля и хранится таблицами поиска.
+Пока змейка короткая, решатель срезает путь к еде, не обгоняя собственный хвост
+"""
+
+from array import array
+from functools import lru_cache
+from typing import List, Tuple
+
+from snake_engine import Direction, SnakeEngine, step_direction
+
+# Срезы разрешены, пока змейка занимает меньше этой доли поля
+SHORTCUT_LIMIT = 0.5
+# Запас клеток между головой и хвостом при срезе
+TAIL_BUFFER = 3
+
+def has_cycle(width: int, height: int) -> bool:
+    """Есть ли у поля гамильтонов цикл: хотя бы одна сторона четная и обе не меньше 2"""
+    return width >= 2 and height >= 2 and not (width % 2 and height % 2)
+
+def cycle_supported(engine: SnakeEngine) -> bool:
+    """Подходит ли партия решателю: поле без стен, препятствий и порталов и с циклом"""
+    return not engine.tables.blocked and has_cycle(engine.width, engine.height)
+
+@lru_cache(maxsize=8)
+def hamiltonian_cycle(width: int, height: int) -> Tuple[array, array]:
+    """Гамильтонов цикл поля: (номер клетки в цикле, следующая клетка цикла)"""
+    if not has_cycle(width, height):
+        raise ValueError(f"на поле {width}x{height} нет гамильтонова цикла")
+
+    # Змейка по строкам со столбцом 0 как обратным путем; при нечетной высоте
+    # то же самое по столбцам (клетка (c, r) транспонирована)
+    transpose = height % 2 == 1
+    rows, cols = (width, height) if transpose else (height, width)
+    path: List[int] = []
+    for r in range(rows):
+        cs = range(1, cols) if r % 2 == 0 else range(cols - 1, 0, -1)
+        path.extend(c * width + r if transpose else r * width + c for c in cs)
+    path.extend(r if transpose else r * width for r in range(rows - 1, -1, -1))
+
+    cells = width * height
+    order = array('i', bytes(4 * cells))
+    following = array('i', bytes(4 * cells))
+    for i, cell in enumerate(path):
+        order[cell] = i
+        following[cell] = path[(i + 1) % cells]
+    return order, following
+
+class HamiltonianSolver:
+    """Выбор направления по циклу со срезами к еде"""
+
+    def __init__(self, engine: SnakeEngine):
+        # Цикл проходит через каждую клетку поля: стены, препятствия и порталы его рвут
+        if engine.tables.blocked:
+            raise ValueError("решатель по циклу работает только на поле без стен, "
+                             "препятствий и порталов")
+        self.engine = engine
+        self.order, self.following = hamiltonian_cycle(engine.width, engine.height)
+
+    def decide(self) -> Direction:
+        """Направление на следующий тик"""
+        engine = self.engine
+        width = engine.width
+        cells = width * engine.height
+        order = self.order
+        head_x, head_y = engine.snake[0]
+        head = head_y * width + head_x
+        head_pos = order[head]
+        best, best_dist = self.following[head], 1
+
+        # Разворот движок игнорирует: у змейки длины 1 следующая клетка цикла
+        # может оказаться позади, тогда подойдет любой сосед - цикл подхватится
+        # со следующего тика
+        behind = head - engine.direction.value[0] - engine.direction.value[1] * width
+        if best == behind:
+            best, best_dist = -1, 0
+
+        limit = 0
+        if engine.food is not None and engine.length < cells * SHORTCUT_LIMIT:
+            # Расстояния вперед по циклу от головы
+            food_x, food_y = engine.food
+            to_food = (order[food_y * width + food_x] - head_pos) % cells
+            if engine.length > 1:
+                tail_x, tail_y = engine.snake[-1]
+                to_tail = (order[tail_y * width + tail_x] - head_pos) % cells
+            else:
+                to_tail = cells
+            limit = min(to_food, to_tail - TAIL_BUFFER)
+
+        # Срез: самый дальний по циклу сосед, не дальше еды и не за хвостом.
+        # Тело лежит на цикле от хвоста до головы, поэтому клетки впереди свободны
+        occupancy = engine.occupancy
+        for cell in (head - width if head >= width else -1,
+                     head + width if head < cells - width else -1,
+                     head - 1 if head_x > 0 else -1,
+                     head + 1 if head_x < width - 1 else -1):
+            if cell < 0 or cell == behind or occupancy[cell]:
+                continue
+            dist = (order[cell] - head_pos) % cells
+            if best < 0 or best_dist < dist <= limit:
+                best, best_dist = cell, dist
+        if best < 0:
+            return engine.direction  # Ходов нет - партия закончится
+        return step_direction(head, best)
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Таблица рекордов "Змейки" в SQLite
+Запись идет в фоновом потоке: игра только ставит результат в очередь и не ждет
+диска. Накопившиеся результаты пишутся пачкой в одной транзакции, поэтому
+сбой посреди записи не портит таблицу, а прогоны на тысячи партий не
+упираются в число коммитов. Хранятся лучшие capacity результатов
+"""
+
+import argparse
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from bisect import insort
+from datetime import datetime
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+from replay import ReplayRecorder
+
+LEADERBOARD_FILE = 'leaderboard.db'
+# Рекорд из прошлых версий игры переносится в таблицу при первом запуске
+LEGACY_FILE = 'high_score.txt'
+# Повторы партий из таблицы (рядом с файлом базы)
+REPLAY_DIR = 'replays'
+# Сколько лучших результатов хранится
+TOP_N = 100
+# Сколько результатов из очереди пишется одной транзакцией
+BATCH_SIZE = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scores (
+    id INTEGER PRIMARY KEY,
+    score INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    ticks INTEGER NOT NULL,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    seed TEXT,
+    replay TEXT,
+    created REAL NOT NULL,
+    source TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scores_rank ON scores (score DESC, created);
+"""
+COLUMNS = "score, length, ticks, width, height, seed, replay, created, source"
+
+class Entry(NamedTuple):
+    """Результат партии; seed хранится текстом - он может не поместиться в INTEGER"""
+    score: int
+    length: int = 0
+    ticks: int = 0
+    width: int = 0
+    height: int = 0
+    seed: Optional[int] = None
+    replay: Optional[str] = None
+    created: float = 0.0
+    source: str = "game"
+
+    def row(self) -> Tuple:
+        return (self.score, self.length, self.ticks, self.width, self.height,
+                None if self.seed is None else str(self.seed), self.replay,
+                self.created, self.source)
+
+    @classmethod
+    def from_row(cls, row: Tuple) -> "Entry":
+        values = list(row)
+        if values[5] is not None:
+            values[5] = int(values[5])
+        return cls(*values)
+
+class Leaderboard:
+    """Таблица рекордов с фоновой записью; закрывать через close() или with"""
+
+    def __init__(self, path: str = LEADERBOARD_FILE, capacity: int = TOP_N,
+                 legacy_path: Optional[str] = LEGACY_FILE):
+        self.path = path
+        self.capacity = capacity
+        self.replay_dir = os.path.join(os.path.dirname(path), REPLAY_DIR)
+        self.last_error: Optional[Exception] = None
+
+        # Схема, перенос старого рекорда и чтение лучших результатов - один раз при старте
+        conn = sqlite3.connect(path)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                conn.executescript(SCHEMA)
+                if legacy_path and not conn.execute("SELECT 1 FROM scores LIMIT 1").fetchone():
+                    legacy = self._read_legacy(legacy_path)
+                    if legacy:
+                        conn.execute(f"INSERT INTO scores ({COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                     Entry(legacy, created=time.time(), source="legacy").row())
+            # Лучшие счета по возрастанию: по ним без диска решается, попадает ли партия в таблицу
+            self._scores = sorted(score for (score,) in conn.execute(
+                "SELECT score FROM scores ORDER BY score DESC LIMIT ?", (capacity,)))
+        finally:
+            conn.close()
+
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._writer, name="leaderboard", daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def _read_legacy(path: str) -> int:
+        try:
+            with open(path, 'r') as f:
+                return max(int(f.read().strip()), 0)
+        except (OSError, ValueError):
+            return 0
+
+    def __enter__(self) -> "Leaderboard":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def best(self) -> int:
+        """Лучший счет (с учетом еще не записанных результатов)"""
+        return self._scores[-1] if self._scores else 0
+
+    def qualifies(self, score: int) -> bool:
+        """Попадет ли счет в таблицу"""
+        return len(self._scores) < self.capacity or score > self._scores[0]
+
+    def _remember(self, score: int):
+        insort(self._scores, score)
+        if len(self._scores) > self.capacity:
+            del self._scores[0]
+
+    def submit(self, entry: Entry, replay: Optional[ReplayRecorder] = None) -> Entry:
+        """
+        Поставить результат в очередь на запись; не блокирует
+        replay - запись партии: сохраняется, только если результат попадает в таблицу
+        """
+        created = entry.created or time.time()
+        path = None
+        if replay is not None and self.qualifies(entry.score):
+            name = f"{int(created * 1000)}-{(entry.seed or 0) & (2 ** 64 - 1):016x}.snkr"
+            path = os.path.join(self.replay_dir, name)
+        entry = entry._replace(created=created, replay=path)
+        self._remember(entry.score)
+        self._queue.put([(entry, replay if path else None)])
+        return entry
+
+    def submit_many(self, entries: Iterable[Entry]):
+        """Пачка результатов без повторов (например, из прогона партий)"""
+        now = time.time()
+        jobs = []
+        for entry in entries:
+            entry = entry._replace(created=entry.created or now)
+            self._remember(entry.score)
+            jobs.append((entry, None))
+        self._queue.put(jobs)
+
+    def flush(self):
+        """Дождаться записи всего, что уже в очереди"""
+        self._queue.join()
+
+    def close(self):
+        """Записать очередь и остановить поток записи"""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def top(self, n: Optional[int] = None) -> List[Entry]:
+        """Лучшие результаты из базы (без еще не записанных - для точности сначала flush)"""
+        conn = sqlite3.connect(self.path)
+        try:
+            rows = conn.execute(f"SELECT {COLUMNS} FROM scores ORDER BY score DESC, created LIMIT ?",
+                                (n or self.capacity,)).fetchall()
+        finally:
+            conn.close()
+        return [Entry.from_row(row) for row in rows]
+
+    def _writer(self):
+        """Поток записи: забирает из очереди все, что накопилось, и пишет одной транзакцией"""
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        running = True
+        while running:
+            batches = [self._queue.get()]
+            while len(batches) < BATCH_SIZE:
+                try:
+                    batches.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            running = None not in batches
+            jobs = [job for batch in batches if batch for job in batch]
+            try:
+                self._write(conn, jobs)
+            except Exception as e:
+                # Ошибку не глотаем молча, но и игру из-за нее не останавливаем:
+                # поток продолжает работать, flush() и close() не зависают
+                self.last_error = e
+                print(f"Таблица рекордов: не удалось записать результаты "
+                      f"({len(jobs)} шт.): {e}", file=sys.stderr)
+            finally:
+                for _ in batches:
+                    self._queue.task_done()
+        conn.close()
+
+    def _write(self, conn: sqlite3.Connection, jobs: List[Tuple[Entry, Optional[ReplayRecorder]]]):
+        if not jobs:
+            return
+        # Повтор пишется до строки, которая на него ссылается; не сохранился -
+        # результат записывается без повтора
+        entries = []
+        for entry, replay in jobs:
+            if replay is not None:
+                try:
+                    os.makedirs(self.replay_dir, exist_ok=True)
+                    replay.save(entry.replay)
+                except Exception as e:
+                    self.last_error = e
+                    print(f"Таблица рекордов: не удалось сохранить повтор результата "
+                          f"{entry.score} (seed={entry.seed}): {e}", file=sys.stderr)
+                    entry = entry._replace(replay=None)
+            entries.append(entry)
+        with conn:
+            conn.executemany(f"INSERT INTO scores ({COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                             [entry.row() for entry in entries])
+            pruned = conn.execute("SELECT id, replay FROM scores ORDER BY score DESC, created "
+                                  "LIMIT -1 OFFSET ?", (self.capacity,)).fetchall()
+            conn.executemany("DELETE FROM scores WHERE id = ?", [(row_id,) for row_id, _ in pruned])
+        for _, path in pruned:
+            if path:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+def main():
+    """Вывод таблицы рекордов"""
+    parser = argparse.ArgumentParser(description="Таблица рекордов")
+    parser.add_argument("path", nargs="?", default=LEADERBOARD_FILE)
+    parser.add_argument("-n", type=int, default=10, help="сколько результатов показать")
+    args = parser.parse_args()
+    with Leaderboard(args.path, legacy_path=None) as board:
+        entries = board.top(args.n)
+    if not entries:
+        print("Рекордов пока нет")
+    for place, entry in enumerate(entries, 1):
+        when = datetime.fromtimestamp(entry.created).strftime("%Y-%m-%d %H:%M")
+        replay = f"  {entry.replay}" if entry.replay else ""
+        print(f"{place:3}. {entry.score:6}  {when}  seed={entry.seed}{replay}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Уровни "Змейки": стены, порталы и точки старта из ASCII- или PNG-карты
+Карта один раз компилируется в двоичный файл рядом с исходником: маска
+столкновений (байт на клетку), индекс свободных клеток для еды, порталы и
+старты. Дальше уровень открывается через mmap - без разбора карты и без
+Python-объектов на каждую клетку, поэтому большие лабиринты грузятся мгновенно
+
+ASCII-карта - строки одинаковой ширины (короткие дополняются пустыми клетками):
+    #           стена
+    . и пробел  пустая клетка
+    @ > < ^ v   старт змейки (@ - вправо, стрелки - по направлению)
+    A-Z         порталы: каждая буква ровно на двух клетках
+PNG-карта: черный пиксель - стена, светлые серые - пусто, зеленый (0, 255, 0) -
+старт вправо, любой другой цвет - портал (каждый цвет ровно на двух пикселях)
+"""
+
+import argparse
+import mmap
+import os
+import re
+import struct
+from array import array
+from functools import lru_cache
+from itertools import accumulate, compress, repeat
+from operator import mul, sub
+from typing import Dict, List, Tuple
+
+# Значения клеток в маске и в занятости движка (тело змейки - 1)
+OBSTACLE = 2
+PORTAL = 3
+
+# Заголовок скомпилированного уровня: сигнатура, версия, размер поля,
+# время изменения и размер исходника, число пар порталов, стартов и свободных клеток.
+# Файл привязан к машине: массивы хранятся в ее порядке байтов
+HEADER = struct.Struct("=4sBIIqqIII")
+MAGIC = b"SNKL"
+VERSION = 1
+CACHE_SUFFIX = ".lvlc"
+
+SPAWN_STEPS = {ord('@'): (1, 0), ord('>'): (1, 0), ord('<'): (-1, 0),
+               ord('^'): (0, -1), ord('v'): (0, 1)}
+SPAWN_COLOR = (0, 255, 0)
+
+# Байт ASCII-карты -> значение маски
+ASCII_MASK = bytes(OBSTACLE if c == ord('#') else PORTAL if ord('A') <= c <= ord('Z') else 0
+                   for c in range(256))
+ASCII_SPECIAL = re.compile(rb"[A-Z@<>^v]")
+# Значение маски -> 1 для свободной клетки
+FREE_FLAGS = bytes([1]) + bytes(255)
+
+def free_index(mask: bytes) -> Tuple[array, array]:
+    """
+    Индекс свободных клеток по маске: клетки с нулевым значением и позиция
+    каждой клетки в массиве (-1 для занятых). Считается итераторами из
+    itertools целиком на стороне C, без цикла Python по клеткам
+    """
+    flags = bytes(mask).translate(FREE_FLAGS)
+    free = array('i', compress(range(len(flags)), flags))
+    # Позиция свободной клетки - число свободных до нее включительно минус 1
+    free_pos = array('i', map(sub, map(mul, flags, accumulate(flags)), repeat(1)))
+    return free, free_pos
+
+class Level:
+    """
+    Скомпилированный уровень; mask, free и free_pos - представления буфера
+    (обычно mmap файла), движок копирует их при сбросе партии
+    portals - пары клеток, spawns - (клетка, (dx, dy))
+    """
+
+    def __init__(self, buffer, path: str = ""):
+        self.path = path
+        view = memoryview(buffer)
+        (magic, version, self.width, self.height, _, _,
+         portal_count, spawn_count, free_count) = HEADER.unpack_from(view)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("файл не является скомпилированным уровнем этой версии")
+        cells = self.width * self.height
+        offset = _aligned(HEADER.size)
+        pairs = view[offset:offset + portal_count * 8].cast('i')
+        self.portals = tuple((pairs[i], pairs[i + 1]) for i in range(0, len(pairs), 2))
+        offset += portal_count * 8
+        spawns = view[offset:offset + spawn_count * 12].cast('i')
+        self.spawns = tuple((spawns[i], (spawns[i + 1], spawns[i + 2]))
+                            for i in range(0, len(spawns), 3))
+        offset += spawn_count * 12
+        self.mask = view[offset:offset + cells]
+        offset += _aligned(cells)
+        self.free = view[offset:offset + free_count * 4].cast('i')
+        offset += free_count * 4
+        self.free_pos = view[offset:offset + cells * 4].cast('i')
+
+def _aligned(size: int) -> int:
+    return (size + 3) & ~3
+
+def pack_level(width: int, height: int, mask: bytes, portals: List[Tuple[int, int]],
+               spawns: List[Tuple[int, Tuple[int, int]]], source: Tuple[int, int] = (0, 0)) -> bytes:
+    """Двоичное представление уровня; source - время изменения и размер исходника"""
+    if len(mask) != width * height:
+        raise ValueError("размер маски не совпадает с размером поля")
+    free, free_pos = free_index(bytes(mask))
+    parts = [HEADER.pack(MAGIC, VERSION, width, height, source[0], source[1],
+                         len(portals), len(spawns), len(free)),
+             bytes(_aligned(HEADER.size) - HEADER.size),
+             array('i', [cell for pair in portals for cell in pair]).tobytes(),
+             array('i', [value for cell, (dx, dy) in spawns for value in (cell, dx, dy)]).tobytes(),
+             bytes(mask), bytes(_aligned(len(mask)) - len(mask)),
+             free.tobytes(), free_pos.tobytes()]
+    return b"".join(parts)
+
+def parse_ascii(data: bytes) -> Tuple[int, int, bytearray, List[Tuple[int, int]],
+                                      List[Tuple[int, Tuple[int, int]]]]:
+    """Разбор ASCII-карты: (ширина, высота, маска, порталы, старты)"""
+    lines = data.replace(b"\t", b" ").splitlines()
+    while lines and not lines[-1].strip():
+        lines.pop()
+    if not lines:
+        raise ValueError("карта пуста")
+    height = len(lines)
+    width = max(len(line) for line in lines)
+    board = b"".join(line.ljust(width, b".") for line in lines)
+    mask = bytearray(board.translate(ASCII_MASK))
+
+    letters: Dict[int, List[int]] = {}
+    spawns = []
+    for match in ASCII_SPECIAL.finditer(board):
+        char, cell = board[match.start()], match.start()
+        if char in SPAWN_STEPS:
+            spawns.append((cell, SPAWN_STEPS[char]))
+        else:
+            letters.setdefault(char, []).append(cell)
+    portals = []
+    for char, cells in sorted(letters.items()):
+        if len(cells) != 2:
+            raise ValueError(f"портал {chr(char)} должен стоять ровно на двух клетках, "
+                             f"а стоит на {len(cells)}")
+        portals.append((cells[0], cells[1]))
+    return width, height, mask, portals, spawns
+
+def parse_png(path: str) -> Tuple[int, int, bytearray, List[Tuple[int, int]],
+                                  List[Tuple[int, Tuple[int, int]]]]:
+    """Разбор PNG-карты; нужны pygame (чтение картинки) и NumPy"""
+    import numpy as np
+    import pygame
+
+    pixels = pygame.surfarray.array3d(pygame.image.load(path)).transpose(1, 0, 2).astype(np.int32)
+    height, width = pixels.shape[:2]
+    r, g, b = pixels[..., 0], pixels[..., 1], pixels[..., 2]
+    gray = (r == g) & (g == b)
+    spawn = (r == SPAWN_COLOR[0]) & (g == SPAWN_COLOR[1]) & (b == SPAWN_COLOR[2])
+    portal = ~gray & ~spawn
+    mask = np.where(gray & (r < 128), OBSTACLE, 0).astype(np.uint8)
+    mask[portal] = PORTAL
+
+    spawns = [(int(cell), (1, 0)) for cell in np.flatnonzero(spawn)]
+    colors = (r << 16 | g << 8 | b).ravel()
+    portals = []
+    for color in np.unique(colors[portal.ravel()]):
+        cells = np.flatnonzero((colors == color) & portal.ravel())
+        if len(cells) != 2:
+            raise ValueError(f"портал цвета #{int(color):06x} должен занимать ровно два "
+                             f"пикселя, а занимает {len(cells)}")
+        portals.append((int(cells[0]), int(cells[1])))
+    return width, height, bytearray(mask.tobytes()), portals, spawns
+
+def compile_level(path: str) -> bytes:
+    """Компиляция карты (.png или ASCII) в двоичный уровень"""
+    stat = os.stat(path)
+    if os.path.splitext(path)[1].lower() == ".png":
+        width, height, mask, portals, spawns = parse_png(path)
+    else:
+        with open(path, 'rb') as f:
+            width, height, mask, portals, spawns = parse_ascii(f.read())
+    if not spawns:
+        # Без отмеченного старта змейка появляется в центре, как на пустом поле
+        spawns = [((height // 2) * width + width // 2, (1, 0))]
+    for cell, _ in spawns:
+        if mask[cell]:
+            raise ValueError(f"старт {(cell % width, cell // width)} на стене или портале")
+    return pack_level(width, height, mask, portals, spawns, (stat.st_mtime_ns, stat.st_size))
+
+def cache_path(path: str) -> str:
+    return path + CACHE_SUFFIX
+
+def _fresh_cache(path: str, cache: str) -> bool:
+    """Скомпилированный файл соответствует текущему исходнику"""
+    try:
+        stat = os.stat(path)
+        with open(cache, 'rb') as f:
+            header = f.read(HEADER.size)
+    except OSError:
+        return False
+    if len(header) < HEADER.size:
+        return False
+    magic, version, _, _, mtime, size, _, _, _ = HEADER.unpack(header)
+    return (magic, version, mtime, size) == (MAGIC, VERSION, stat.st_mtime_ns, stat.st_size)
+
+def load_level(path: str) -> Level:
+    """Уровень по пути к карте (или к скомпилированному файлу); компилируется при изменении карты"""
+    stat = os.stat(path)
+    return _load_level(os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+@lru_cache(maxsize=8)
+def _load_level(path: str, mtime: int, size: int) -> Level:
+    if path.endswith(CACHE_SUFFIX):
+        cache = path
+    else:
+        cache = cache_path(path)
+        if not _fresh_cache(path, cache):
+            data = compile_level(path)
+            try:
+                tmp = cache + ".tmp"
+                with open(tmp, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp, cache)
+            except OSError:
+                # Каталог только для чтения: уровень работает из памяти
+                return Level(data, path)
+    with open(cache, 'rb') as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return Level(buffer, path)
+
+def main():
+    """Компиляция карты и краткая сводка по уровню"""
+    parser = argparse.ArgumentParser(description="Компиляция уровня")
+    parser.add_argument("path", help="карта уровня (.txt или .png)")
+    args = parser.parse_args()
+    try:
+        level = load_level(args.path)
+    except (OSError, ValueError) as e:
+        raise SystemExit(f"Ошибка в уровне: {e}")
+    cells = level.width * level.height
+    walls = cells - len(level.free) - 2 * len(level.portals)
+    print(f"Уровень {level.width}x{level.height}: стен {walls}, пар порталов {len(level.portals)}, "
+          f"стартов {len(level.spawns)}, свободно {len(level.free)} клеток")
+
+if __name__ == "__main__":
+    main()
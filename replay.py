@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Запись и воспроизведение партий "Змейки"
+Файл повтора содержит только seed партии и направления по тикам, по 2 бита на тик:
+миллион тиков занимает около 250 КБ. Партия пересчитывается движком бит в бит
+"""
+
+import argparse
+import mmap
+import os
+import struct
+from typing import Iterator
+
+from snake_engine import Direction, SnakeEngine
+
+MAGIC = b"SNKR"
+VERSION = 1
+# Заголовок: сигнатура, версия, ширина, высота, seed, число тиков
+HEADER = struct.Struct("<4sBHHQQ")
+
+DIRECTIONS = list(Direction)
+CODES = {direction: code for code, direction in enumerate(DIRECTIONS)}
+
+class ReplayRecorder:
+    """Накопление направлений партии в упакованном виде"""
+
+    def __init__(self):
+        self.width = 0
+        self.height = 0
+        self.seed = 0
+        self.ticks = 0
+        self.data = bytearray()
+
+    def start(self, engine: SnakeEngine):
+        """Начать запись партии, только что сброшенной в engine"""
+        self.width = engine.width
+        self.height = engine.height
+        self.seed = engine.seed
+        self.ticks = 0
+        self.data = bytearray()
+
+    def record(self, direction: Direction):
+        """Записать направление, с которым был сделан очередной тик"""
+        shift = (self.ticks & 3) * 2
+        if shift == 0:
+            self.data.append(0)
+        self.data[-1] |= CODES[direction] << shift
+        self.ticks += 1
+
+    def truncate(self, ticks: int):
+        """Оставить первые ticks тиков (после перемотки партии назад)"""
+        if ticks >= self.ticks:
+            return
+        del self.data[(ticks + 3) // 4:]
+        if ticks & 3:
+            self.data[-1] &= (1 << ((ticks & 3) * 2)) - 1
+        self.ticks = ticks
+
+    def copy(self) -> "ReplayRecorder":
+        """Независимая копия записи (например, для сохранения в другом потоке)"""
+        other = ReplayRecorder()
+        other.width, other.height = self.width, self.height
+        other.seed, other.ticks = self.seed, self.ticks
+        other.data = bytearray(self.data)
+        return other
+
+    def save(self, path: str):
+        """Сохранение повтора; файл заменяется целиком, недописанным он не останется"""
+        if not 0 <= self.seed < 2 ** 64:
+            raise ValueError("seed повтора должен помещаться в 64 бита без знака")
+        header = HEADER.pack(MAGIC, VERSION, self.width, self.height,
+                             self.seed, self.ticks)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(header)
+            f.write(self.data)
+        os.replace(tmp_path, path)
+
+class Replay:
+    """Повтор, открытый через mmap; направления читаются по мере надобности"""
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.width, self.height, self.seed, self.ticks = \
+            HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or version != VERSION:
+            self._mmap.close()
+            raise ValueError(f"{path}: не файл повтора")
+        if len(self._mmap) < HEADER.size + (self.ticks + 3) // 4:
+            self._mmap.close()
+            raise ValueError(f"{path}: файл повтора обрезан")
+
+    def __enter__(self) -> "Replay":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._mmap.close()
+
+    def __len__(self) -> int:
+        return self.ticks
+
+    def direction(self, tick: int) -> Direction:
+        """Направление на тике tick"""
+        byte = self._mmap[HEADER.size + (tick >> 2)]
+        return DIRECTIONS[(byte >> ((tick & 3) * 2)) & 3]
+
+    def __iter__(self) -> Iterator[Direction]:
+        data = self._mmap
+        offset = HEADER.size
+        for tick in range(self.ticks):
+            yield DIRECTIONS[(data[offset + (tick >> 2)] >> ((tick & 3) * 2)) & 3]
+
+    def new_engine(self) -> SnakeEngine:
+        """Движок в начальном состоянии записанной партии"""
+        return SnakeEngine(self.width, self.height, seed=self.seed)
+
+    def simulate(self) -> SnakeEngine:
+        """Пересчет партии без графики на максимальной скорости"""
+        engine = self.new_engine()
+        for direction in self:
+            engine.step(direction)
+        return engine
+
+def main():
+    """Пересчет повтора из командной строки"""
+    parser = argparse.ArgumentParser(description="Воспроизведение повтора без графики")
+    parser.add_argument("path")
+    args = parser.parse_args()
+    with Replay(args.path) as replay:
+        engine = replay.simulate()
+    result = "победа" if engine.won else "конец игры" if engine.done else "не закончена"
+    print(f"{args.path}: {engine.ticks} тиков, счет {engine.score}, {result}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Параллельный прогон партий "Змейки" на пуле процессов
+Результаты партий пишутся рабочими процессами прямо в общую память,
+по сети процессов передаются только номера шардов
+"""
+
+import argparse
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Callable, List, NamedTuple, Optional
+
+from snake_engine import Direction, GRID_HEIGHT, GRID_WIDTH, SnakeEngine
+
+# Поля результата одной партии, по одному double на поле
+FIELDS = ("score", "length", "ticks", "duration")
+
+# Политика: по движку и генератору случайных чисел выбирает направление
+Policy = Callable[[SnakeEngine, random.Random], Optional[Direction]]
+
+DIRECTIONS = list(Direction)
+
+class RolloutResults(NamedTuple):
+    """Результаты прогона по столбцам, индекс - номер партии"""
+    score: List[float]
+    length: List[float]
+    ticks: List[float]
+    duration: List[float]
+    elapsed: float
+
+    def summary(self) -> str:
+        """Короткая сводка для вывода в консоль"""
+        episodes = len(self.score)
+        if not episodes:
+            return "0 партий"
+        ticks = sum(self.ticks)
+        return (f"{episodes} партий, средний счет {sum(self.score) / episodes:.1f}, "
+                f"макс. {max(self.score):.0f}, {ticks / self.elapsed:,.0f} тиков/сек")
+
+def random_policy(engine: SnakeEngine, rng: random.Random) -> Direction:
+    """Случайное направление (разворот движок отбросит сам)"""
+    return rng.choice(DIRECTIONS)
+
+def episode_seed(seed: int, episode: int) -> int:
+    """Seed партии зависит только от общего seed и номера партии"""
+    return seed * 1_000_003 + episode
+
+def shard_seed(seed: int, shard: int) -> int:
+    """Seed генератора политики для отдельного шарда"""
+    return (seed << 20) ^ (shard * 0x9E3779B1)
+
+def _run_shard(shm_name: str, shard: int, first: int, count: int, seed: int,
+               width: int, height: int, max_ticks: int, policy: Policy) -> int:
+    """Прогон партий first..first+count-1 с записью результатов в общую память"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        results = shm.buf.cast('d')
+        rng = random.Random(shard_seed(seed, shard))
+        engine = SnakeEngine(width, height)
+        for episode in range(first, first + count):
+            engine.reset(episode_seed(seed, episode))
+            start = time.perf_counter()
+            while not engine.done and engine.ticks < max_ticks:
+                engine.step(policy(engine, rng))
+            row = episode * len(FIELDS)
+            results[row] = engine.score
+            results[row + 1] = len(engine.snake)
+            results[row + 2] = engine.ticks
+            results[row + 3] = time.perf_counter() - start
+        results.release()
+    finally:
+        shm.close()
+    return count
+
+def run_rollouts(episodes: int, workers: Optional[int] = None, seed: int = 0,
+                 policy: Policy = random_policy, width: int = GRID_WIDTH,
+                 height: int = GRID_HEIGHT, max_ticks: int = 100_000) -> RolloutResults:
+    """
+    Прогон episodes партий на workers процессах (по умолчанию - все ядра)
+    При одинаковых seed и workers результаты совпадают; policy должна быть
+    функцией верхнего уровня модуля, чтобы ее можно было передать в процесс
+    """
+    workers = workers or os.cpu_count() or 1
+    shards = min(workers, episodes)
+    shm = shared_memory.SharedMemory(create=True, size=max(episodes, 1) * len(FIELDS) * 8)
+    try:
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = []
+            first = 0
+            for shard in range(shards):
+                count = episodes // shards + (shard < episodes % shards)
+                futures.append(pool.submit(_run_shard, shm.name, shard, first, count,
+                                           seed, width, height, max_ticks, policy))
+                first += count
+            for future in futures:
+                future.result()
+        elapsed = time.perf_counter() - start
+
+        results = shm.buf.cast('d')
+        values = results[:episodes * len(FIELDS)].tolist()
+        results.release()
+    finally:
+        shm.close()
+        shm.unlink()
+
+    columns = [values[i::len(FIELDS)] for i in range(len(FIELDS))]
+    return RolloutResults(*columns, elapsed=elapsed)
+
+def main():
+    """Запуск прогона из командной строки"""
+    parser = argparse.ArgumentParser(description="Параллельный прогон партий")
+    parser.add_argument("--episodes", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--leaderboard", metavar="FILE",
+                        help="записать результаты партий в таблицу рекордов (одной пачкой)")
+    args = parser.parse_args()
+    if args.episodes < 1:
+        parser.error("--episodes должно быть не меньше 1")
+    results = run_rollouts(args.episodes, args.workers, args.seed)
+    print(results.summary())
+    if args.leaderboard:
+        from leaderboard import Entry, Leaderboard
+        with Leaderboard(args.leaderboard, legacy_path=None) as board:
+            board.submit_many(
+                Entry(int(score), int(length), int(ticks), GRID_WIDTH, GRID_HEIGHT,
+                      episode_seed(args.seed, ep), source="rollout")
+                for ep, (score, length, ticks) in enumerate(zip(results.score, results.length,
+                                                                results.ticks)))
+        print(f"Результаты записаны в {args.leaderboard}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Правила "Змейки": размер поля, очки, кривая скорости, заворачивание краев,
+число яблок, препятствия и уровень (карта со стенами и порталами, levels.py)
+Правила читаются из JSON или TOML и один раз компилируются в таблицы:
+соседние клетки по каждой оси, выходы порталов, скорость по числу съеденных
+яблок, шаблон занятости с препятствиями. На тике движок только читает эти таблицы
+"""
+
+import argparse
+import json
+import os
+import sys
+from array import array
+from functools import lru_cache
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from levels import OBSTACLE, PORTAL, free_index, load_level
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    tomllib = None
+
+# Размер поля по умолчанию (в клетках)
+GRID_WIDTH = 40
+GRID_HEIGHT = 30
+# Наибольшая сторона поля
+MAX_BOARD_SIZE = 4096
+
+# Правила по умолчанию
+INITIAL_SPEED = 10
+MAX_SPEED = 20
+FOOD_SCORE = 10
+SPEED_UP_SCORE = 50
+
+# Направления движения (dx, dy); движок сопоставляет их своему Direction
+STEPS = ((0, -1), (0, 1), (-1, 0), (1, 0))
+
+class Rules(NamedTuple):
+    """
+    Правила партии
+    speed_curve - пары (счет, скорость): с этого счета действует эта скорость;
+    если не задана, скорость растет на 1 каждые speed_up_score очков до max_speed
+    level - путь к карте уровня; размер поля должен совпадать с ее размером
+    (rules_from_dict подставляет его сам, если размер не задан)
+    """
+    width: int = GRID_WIDTH
+    height: int = GRID_HEIGHT
+    wrap: bool = False
+    foods: int = 1
+    food_score: int = FOOD_SCORE
+    initial_speed: int = INITIAL_SPEED
+    max_speed: int = MAX_SPEED
+    speed_up_score: int = SPEED_UP_SCORE
+    speed_curve: Tuple[Tuple[int, int], ...] = ()
+    obstacles: Tuple[Tuple[int, int], ...] = ()
+    level: str = ""
+
+    @property
+    def standard(self) -> bool:
+        """Правила по умолчанию (размер поля может быть любым)"""
+        return self._replace(width=GRID_WIDTH, height=GRID_HEIGHT) == Rules()
+
+    def speed_at(self, score: int) -> int:
+        """Скорость при данном счете; на тике не вызывается - для этого есть таблица"""
+        if self.speed_curve:
+            speed = self.initial_speed
+            for threshold, value in self.speed_curve:
+                if score >= threshold:
+                    speed = value
+            return speed
+        return min(self.initial_speed + score // self.speed_up_score, self.max_speed)
+
+def rules_from_dict(config: Dict[str, Any]) -> Rules:
+    """Правила из словаря конфигурации; неизвестные ключи - ошибка (скорее всего, опечатка)"""
+    unknown = set(config) - set(Rules._fields)
+    if unknown:
+        raise ValueError(f"неизвестные параметры правил: {', '.join(sorted(unknown))}")
+    values = dict(config)
+    for key in ("speed_curve", "obstacles"):
+        if key in values:
+            values[key] = tuple(tuple(int(v) for v in pair) for pair in values[key])
+    for key in ("width", "height", "foods", "food_score", "initial_speed", "max_speed",
+                "speed_up_score"):
+        if key in values:
+            values[key] = int(values[key])
+    if "wrap" in values:
+        values["wrap"] = bool(values["wrap"])
+    if values.get("level"):
+        # Размер поля с уровнем определяется здесь и только здесь: по умолчанию
+        # он берется из карты, явно заданный должен с ней совпадать
+        values["level"] = str(values["level"])
+        level = load_level(values["level"])
+        values.setdefault("width", level.width)
+        values.setdefault("height", level.height)
+    rules = Rules(**values)
+    validate(rules)
+    return rules
+
+def load_rules(path: str) -> Rules:
+    """Правила из файла .toml или .json"""
+    if os.path.splitext(path)[1].lower() == ".toml":
+        if tomllib is None:
+            raise ValueError("правила в TOML читаются начиная с Python 3.11, используйте JSON")
+        with open(path, 'rb') as f:
+            config = tomllib.load(f)
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+    if not isinstance(config, dict):
+        raise ValueError("файл правил должен содержать таблицу параметров")
+    # Путь к уровню - относительно файла правил
+    if config.get("level"):
+        config["level"] = os.path.join(os.path.dirname(path), str(config["level"]))
+    return rules_from_dict(config)
+
+def validate(rules: Rules):
+    """Проверка правил; ValueError с описанием первой ошибки"""
+    if not (1 <= rules.width <= MAX_BOARD_SIZE and 1 <= rules.height <= MAX_BOARD_SIZE):
+        raise ValueError(f"размер поля должен быть от 1 до {MAX_BOARD_SIZE} клеток")
+    if rules.foods < 1:
+        raise ValueError("на поле должно быть хотя бы одно яблоко")
+    if rules.food_score < 0:
+        raise ValueError("очки за яблоко не могут быть отрицательными")
+    if not 1 <= rules.initial_speed <= rules.max_speed:
+        raise ValueError("начальная скорость должна быть от 1 до max_speed")
+    if rules.speed_up_score < 1:
+        raise ValueError("speed_up_score должен быть положительным")
+    if any(len(point) != 2 or point[1] < 1 for point in rules.speed_curve):
+        raise ValueError("кривая скорости - пары (счет, скорость) со скоростью от 1")
+    if list(rules.speed_curve) != sorted(rules.speed_curve):
+        raise ValueError("точки кривой скорости должны идти по возрастанию счета")
+    if rules.level:
+        level = load_level(rules.level)
+        if (rules.width, rules.height) != (level.width, level.height):
+            raise ValueError(f"размер поля {rules.width}x{rules.height} не совпадает "
+                             f"с размером уровня {level.width}x{level.height}")
+    for obstacle in rules.obstacles:
+        if len(obstacle) != 2 or not (0 <= obstacle[0] < rules.width
+                                      and 0 <= obstacle[1] < rules.height):
+            raise ValueError(f"препятствие {obstacle} вне поля")
+
+@lru_cache(maxsize=4)
+def _identity(cells: int) -> array:
+    """
+    Массив 0..cells-1; строится один раз на размер поля, дальше копируется.
+    Заполняется по 16-битным половинам срезами с шагом, без цикла Python по
+    клеткам: младшие половины - блок 0..65535, старшие - номер блока
+    """
+    block = 1 << 16
+    low = array('H', range(block))
+    lo, hi = (0, 1) if sys.byteorder == "little" else (1, 0)
+    identity = array('i', bytes(4 * cells))
+    with memoryview(identity) as view, view.cast('B') as raw, raw.cast('H') as halves:
+        for value, first in enumerate(range(0, cells, block)):
+            count = min(block, cells - first)
+            halves[2 * first + lo:2 * (first + count):2] = low[:count]
+            halves[2 * first + hi:2 * (first + count):2] = array('H', [value]) * count
+    return identity
+
+def _axis(size: int, delta: int, wrap: bool) -> array:
+    """Следующая координата по оси для каждой текущей; -1 - стена"""
+    if wrap:
+        return array('i', [(i + delta) % size for i in range(size)])
+    return array('i', [i + delta if 0 <= i + delta < size else -1 for i in range(size)])
+
+class RuleTables:
+    """Правила, скомпилированные в таблицы; общие для всех движков с этими правилами"""
+
+    def __init__(self, rules: Rules):
+        self.rules = rules
+        validate(rules)
+        level = load_level(rules.level) if rules.level else None
+        width, height = rules.width, rules.height
+        self.width, self.height = width, height
+        cells = width * height
+
+        # Соседи по осям для каждого направления: (следующий x по x, следующий y по y)
+        self.moves = {(dx, dy): (_axis(width, dx, rules.wrap), _axis(height, dy, rules.wrap))
+                      for dx, dy in STEPS}
+
+        # Скорость по числу съеденных яблок: до точки насыщения кривой, дальше последнее значение
+        if rules.speed_curve:
+            saturation = rules.speed_curve[-1][0]
+        else:
+            saturation = (rules.max_speed - rules.initial_speed) * rules.speed_up_score
+        if rules.food_score:
+            count = min(-(-saturation // rules.food_score), cells) + 1
+        else:
+            count = 1
+        self.speeds = array('i', [rules.speed_at(eaten * rules.food_score)
+                                  for eaten in range(max(count, 1))])
+
+        # Шаблоны занятости и индекса свободных клеток: копируются при сбросе партии.
+        # Уровень без дополнительных препятствий используется прямо из своего файла
+        if level is not None:
+            self.occupancy, self.free, self.free_pos = level.mask, level.free, level.free_pos
+            self.portals, self.spawns = level.portals, level.spawns
+        else:
+            self.occupancy = bytearray(cells)
+            self.free = self.free_pos = _identity(cells)
+            self.portals = ()
+            self.spawns = (((height // 2) * width + width // 2, (1, 0)),)
+        if rules.obstacles:
+            occupancy = bytearray(self.occupancy)
+            for x, y in rules.obstacles:
+                occupancy[y * width + x] = OBSTACLE
+            self.occupancy = occupancy
+            self.free, self.free_pos = free_index(bytes(occupancy))
+        for cell, _ in self.spawns:
+            if self.occupancy[cell]:
+                raise ValueError(f"старт змейки {(cell % width, cell // width)} занят препятствием")
+        # Есть ли на поле стены и порталы (рендереру - рисовать ли их)
+        self.blocked = len(self.free) < cells
+
+        # Номер пары для каждой клетки портала (рендереру - цвет пары)
+        self.portal_pair = {cell: i for i, pair in enumerate(self.portals) for cell in pair}
+
+        # Выходы порталов по направлению: вход в клетку портала - появление
+        # на клетке за парным порталом по ходу движения; -1 - выхода нет
+        # (за парным порталом край поля или другой портал)
+        self.portal_exits: Dict[Tuple[int, int], Dict[int, int]] = {step: {} for step in STEPS}
+        for a, b in self.portals:
+            for step, (next_x, next_y) in self.moves.items():
+                for entry, partner in ((a, b), (b, a)):
+                    y, x = divmod(partner, width)
+                    x, y = next_x[x], next_y[y]
+                    exit_cell = y * width + x if x >= 0 and y >= 0 else -1
+                    if exit_cell >= 0 and self.occupancy[exit_cell] == PORTAL:
+                        exit_cell = -1
+                    self.portal_exits[step][entry] = exit_cell
+
+    def fresh(self, reuse: Optional[Tuple[bytearray, array, array]] = None
+              ) -> Tuple[bytearray, array, array]:
+        """
+        Копии занятости и индекса свободных клеток для новой партии;
+        reuse - буферы прошлой партии: они перезаписываются на месте, без
+        выделения памяти под новые (на большом поле это основная часть сброса)
+        """
+        if reuse is not None:
+            occupancy, free, free_pos = reuse
+            occupancy[:] = self.occupancy
+            _copy_into(free, self.free)
+            _copy_into(free_pos, self.free_pos)
+            return reuse
+        free = array('i')
+        free.frombytes(memoryview(self.free).cast('B'))
+        free_pos = array('i')
+        free_pos.frombytes(memoryview(self.free_pos).cast('B'))
+        return bytearray(self.occupancy), free, free_pos
+
+def _copy_into(target: array, source):
+    """Содержимое source (массив или представление 'i') в target того же типа"""
+    size = len(source)
+    if len(target) > size:
+        del target[size:]
+    elif len(target) < size:
+        target.frombytes(bytes(4 * (size - len(target))))
+    memoryview(target)[:] = memoryview(source)
+
+@lru_cache(maxsize=16)
+def compile_rules(rules: Rules) -> RuleTables:
+    """Таблицы для правил; одинаковые правила компилируются один раз"""
+    return RuleTables(rules)
+
+def main():
+    """Проверка файла правил и вывод получившихся таблиц"""
+    parser = argparse.ArgumentParser(description="Проверка файла правил")
+    parser.add_argument("path", help="файл правил (.toml или .json)")
+    args = parser.parse_args()
+    try:
+        rules = load_rules(args.path)
+    except (OSError, ValueError) as e:
+        raise SystemExit(f"Ошибка в правилах: {e}")
+    tables = compile_rules(rules)
+    print(f"Поле {tables.width}x{tables.height}, края {'заворачиваются' if rules.wrap else '- стены'}, "
+          f"яблок {rules.foods}, препятствий {len(rules.obstacles)}, "
+          f"пар порталов {len(tables.portals)}")
+    print(f"Скорость по съеденным яблокам: {list(tables.speeds)}")
+
+if __name__ == "__main__":
+    main()
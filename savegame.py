@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Сохранение партии "Змейки" на диск и продолжение с того же места
+Файл содержит снимок движка целиком: тело, занятость поля, индекс свободных
+клеток в том же порядке и состояние генератора случайных чисел, поэтому
+продолжение идет бит в бит как без сохранения. Вместе с партией сохраняется
+запись повтора. Массивы хранятся в порядке байтов little-endian и сжаты zlib
+"""
+
+import argparse
+import json
+import os
+import struct
+import sys
+import zlib
+from array import array
+from typing import Optional, Tuple
+
+from replay import ReplayRecorder
+from rules import rules_from_dict
+from snake_engine import BODY_CAPACITY, Direction, EngineState, SnakeEngine
+
+MAGIC = b"SNKS"
+VERSION = 1
+# Заголовок: сигнатура, версия, длина описания партии (JSON)
+HEADER = struct.Struct("<4sBI")
+
+# Быстрое сохранение из игры (S на паузе) и продолжение (--resume без файла)
+SAVE_DIR = "saves"
+QUICKSAVE = os.path.join(SAVE_DIR, "quicksave.snks")
+
+def _pack(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = values[:]
+        values.byteswap()
+    return values.tobytes()
+
+def _unpack(typecode: str, data: bytes) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+def save_game(path: str, engine: SnakeEngine, recorder: Optional[ReplayRecorder] = None):
+    """Сохранение партии; файл заменяется целиком, недописанным он не останется"""
+    state = engine.snapshot()
+    capacity = len(state.body)
+    body = array('i', (state.body[(state.head - state.length + 1 + i) % capacity]
+                       for i in range(state.length)))
+    version, words, gauss = state.rng.getstate()
+    if recorder is not None and recorder.ticks != state.ticks:
+        recorder = None  # Запись не с начала партии - повтор из нее не собрать
+    # Размер поля - фактический, путь к уровню - абсолютный: сохранение
+    # открывается из любого каталога
+    rules = state.rules._asdict()
+    rules["width"], rules["height"] = engine.width, engine.height
+    if rules["level"]:
+        rules["level"] = os.path.abspath(rules["level"])
+    info = {
+        "rules": rules,
+        "seed": state.seed,
+        "foods": state.foods,
+        "direction": state.direction.name,
+        "score": state.score,
+        "eaten": state.eaten,
+        "speed": state.speed,
+        "ticks": state.ticks,
+        "done": state.done,
+        "won": state.won,
+        "length": state.length,
+        "free": len(state.free),
+        "rng": [version, len(words), gauss],
+        "replay": len(recorder.data) if recorder is not None else None,
+    }
+    parts = [_pack(body), bytes(state.occupancy), _pack(state.free), _pack(state.free_pos),
+             _pack(array('I', words))]
+    if recorder is not None:
+        parts.append(bytes(recorder.data))
+    meta = json.dumps(info).encode("utf-8")
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(meta)))
+        f.write(meta)
+        f.write(zlib.compress(b"".join(parts)))
+    os.replace(tmp_path, path)
+
+def load_game(path: str) -> Tuple[SnakeEngine, Optional[ReplayRecorder]]:
+    """Партия из файла сохранения и запись ее повтора (None, если записи нет)"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < HEADER.size:
+        raise ValueError(f"{path}: не файл сохранения")
+    magic, version, meta_size = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path}: не файл сохранения")
+    try:
+        info = json.loads(data[HEADER.size:HEADER.size + meta_size])
+        payload = zlib.decompress(data[HEADER.size + meta_size:])
+    except (ValueError, zlib.error) as e:
+        raise ValueError(f"{path}: файл сохранения поврежден ({e})")
+
+    engine = SnakeEngine(rules=rules_from_dict(info["rules"]), seed=info["seed"])
+    cells = engine.width * engine.height
+    length, free_count = info["length"], info["free"]
+    rng_version, rng_words, gauss = info["rng"]
+    sizes = [4 * length, cells, 4 * free_count, 4 * cells, 4 * rng_words]
+    if info["replay"] is not None:
+        sizes.append(info["replay"])
+    if sum(sizes) != len(payload) or not 1 <= length <= cells:
+        raise ValueError(f"{path}: файл сохранения поврежден")
+    chunks = []
+    offset = 0
+    for size in sizes:
+        chunks.append(payload[offset:offset + size])
+        offset += size
+
+    # Тело раскладывается от хвоста к голове с запасом под рост, как в place_snake
+    body = _unpack('i', chunks[0])
+    body.extend(bytes(min(max(BODY_CAPACITY, length), cells) - length))
+    rng = engine.rng
+    rng.setstate((rng_version, tuple(_unpack('I', chunks[4])), gauss))
+    engine.restore(EngineState(
+        engine.rules, info["seed"], rng, body, length - 1, length, bytearray(chunks[1]),
+        _unpack('i', chunks[2]), _unpack('i', chunks[3]),
+        tuple(tuple(food) for food in info["foods"]), Direction[info["direction"]],
+        info["score"], info["eaten"], info["speed"], info["ticks"], info["done"], info["won"],
+        None))
+
+    recorder = None
+    if info["replay"] is not None:
+        recorder = ReplayRecorder()
+        recorder.start(engine)
+        recorder.data = bytearray(chunks[5])
+        recorder.ticks = engine.ticks
+    return engine, recorder
+
+def main():
+    """Сводка по файлу сохранения из командной строки"""
+    parser = argparse.ArgumentParser(description="Просмотр сохраненной партии")
+    parser.add_argument("path", nargs="?", default=QUICKSAVE)
+    args = parser.parse_args()
+    try:
+        engine, recorder = load_game(args.path)
+    except (OSError, ValueError) as e:
+        raise SystemExit(f"Не удалось открыть сохранение: {e}")
+    result = "победа" if engine.won else "конец игры" if engine.done else "можно продолжить"
+    print(f"{args.path}: поле {engine.width}x{engine.height}, {engine.ticks} тиков, "
+          f"счет {engine.score}, длина {engine.length}, {result}"
+          f"{', с повтором' if recorder is not None else ''}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,478 @@
+#!/usr/bin/env python3
+"""
+Игровая логика "Змейки" без графики
+Движок не импортирует pygame и работает на машинах без дисплея и SDL
+Состояние партии снимается и восстанавливается за O(1): снимок ссылается на
+буферы движка, а движок копирует их только перед следующим изменением
+(копирование при записи), генератор случайных чисел - перед следующей едой.
+Для поиска и перемотки есть журнал отмены: step_with_undo() возвращает запись
+об изменениях тика (новая голова, освобожденный хвост, перестановка в индексе
+свободных клеток, еда), undo() откатывает тик за O(1) на поле любого размера
+"""
+
+import random
+from array import array
+from enum import Enum
+from typing import Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+# Константы правил по умолчанию по-прежнему доступны из движка
+from rules import (FOOD_SCORE, GRID_HEIGHT, GRID_WIDTH, INITIAL_SPEED, MAX_BOARD_SIZE,
+                   MAX_SPEED, OBSTACLE, PORTAL, SPEED_UP_SCORE, Rules, compile_rules)
+
+# Начальная емкость кольцевого буфера тела, дальше он удваивается
+BODY_CAPACITY = 64
+
+class Direction(Enum):
+    UP = (0, -1)
+    DOWN = (0, 1)
+    LEFT = (-1, 0)
+    RIGHT = (1, 0)
+
+OPPOSITE = {
+    Direction.UP: Direction.DOWN,
+    Direction.DOWN: Direction.UP,
+    Direction.LEFT: Direction.RIGHT,
+    Direction.RIGHT: Direction.LEFT,
+}
+
+def step_direction(head: int, cell: int) -> Direction:
+    """Направление шага из клетки head в соседнюю клетку cell (индексы y*width+x)"""
+    diff = cell - head
+    if diff == 1:
+        return Direction.RIGHT
+    if diff == -1:
+        return Direction.LEFT
+    return Direction.DOWN if diff > 0 else Direction.UP
+
+def occupy_cell(occupancy: bytearray, free: array, free_pos: array, cell: int):
+    """
+    Пометить клетку занятой и убрать ее из индекса свободных клеток
+    free - список свободных клеток, free_pos - позиция клетки в нем (-1 для занятых);
+    удаление перестановкой с последней клеткой за O(1)
+    """
+    occupancy[cell] = 1
+    pos = free_pos[cell]
+    last = free.pop()
+    if last != cell:
+        free[pos] = last
+        free_pos[last] = pos
+    free_pos[cell] = -1
+
+def release_cell(occupancy: bytearray, free: array, free_pos: array, cell: int):
+    """Пометить клетку свободной и вернуть ее в конец индекса свободных клеток"""
+    occupancy[cell] = 0
+    free_pos[cell] = len(free)
+    free.append(cell)
+
+class StepResult(NamedTuple):
+    """Результат одного тика: награда и признак окончания игры"""
+    reward: int
+    done: bool
+
+class Observation(NamedTuple):
+    """Снимок состояния игры для рендерера или агента"""
+    snake: Tuple[Tuple[int, int], ...]
+    direction: Direction
+    food: Optional[Tuple[int, int]]
+    score: int
+    speed: int
+    done: bool
+    won: bool
+
+class EngineState(NamedTuple):
+    """
+    Снимок партии; буферы общие с движком и другими снимками и не меняются
+    (движок копирует их перед записью), поэтому снимок можно восстанавливать много раз
+    """
+    rules: Rules
+    seed: int
+    rng: random.Random
+    body: array
+    head: int
+    length: int
+    occupancy: bytearray
+    free: array
+    free_pos: array
+    foods: Tuple[Tuple[int, int], ...]
+    direction: Direction
+    score: int
+    eaten: int
+    speed: int
+    ticks: int
+    done: bool
+    won: bool
+    last_tail: Optional[Tuple[int, int]]
+
+class Undo(NamedTuple):
+    """
+    Запись для отката одного тика: состояние до тика, значение перезаписанного
+    слота тела, последняя клетка индекса свободных клеток и генератор случайных
+    чисел до тика (общий с движком до следующей еды, поэтому не копируется)
+    """
+    direction: Direction
+    ticks: int
+    done: bool
+    won: bool
+    last_tail: Optional[Tuple[int, int]]
+    body: array
+    head: int
+    length: int
+    slot: int
+    last_free: int
+    foods: Tuple[Tuple[int, int], ...]
+    score: int
+    eaten: int
+    speed: int
+    rng: random.Random
+
+class SnakeBody:
+    """Тело змейки в виде последовательности клеток (x, y) от головы к хвосту"""
+
+    def __init__(self, engine: "SnakeEngine"):
+        self._engine = engine
+
+    def __len__(self) -> int:
+        return self._engine.length
+
+    def __getitem__(self, index: int) -> Tuple[int, int]:
+        engine = self._engine
+        if index < 0:
+            index += engine.length
+        if not 0 <= index < engine.length:
+            raise IndexError("индекс сегмента вне тела змейки")
+        body = engine.body
+        cell = body[(engine.head - index) % len(body)]
+        return (cell % engine.width, cell // engine.width)
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        engine = self._engine
+        body, width = engine.body, engine.width
+        capacity = len(body)
+        for i in range(engine.length):
+            cell = body[(engine.head - i) % capacity]
+            yield (cell % width, cell // width)
+
+    def __repr__(self) -> str:
+        return f"SnakeBody({list(self)})"
+
+class SnakeEngine:
+    """Логика одной партии: движение, еда, столкновения и счет"""
+
+    def __init__(self, width: int = GRID_WIDTH, height: int = GRID_HEIGHT,
+                 seed: Optional[int] = None, rules: Optional[Rules] = None):
+        # Правила задают и размер поля; без них - стандартные правила на поле width x height
+        if rules is None:
+            rules = Rules(width, height)
+        self.rules = rules
+        self.tables = compile_rules(rules)
+        self.width = self.tables.width
+        self.height = self.tables.height
+        # Таблицы по направлениям: соседи по осям и выходы порталов; скорость по числу яблок
+        self._moves = {direction: self.tables.moves[direction.value]
+                                  + (self.tables.portal_exits[direction.value],)
+                       for direction in Direction}
+        self._speeds = self.tables.speeds
+        self._food_score = rules.food_score
+        self.snake = SnakeBody(self)
+        self.occupancy = None
+        self._shared = False
+        self.reset(seed)
+
+    def reset(self, seed: Optional[int] = None) -> Observation:
+        """Сброс партии; без seed выбирается случайный, чтобы партию можно было повторить"""
+        if seed is None:
+            seed = random.getrandbits(64)
+        self.seed = seed
+        self.rng = random.Random(seed)
+        # Тело - кольцевой буфер индексов клеток y*width+x (head - позиция головы),
+        # занятые клетки - в bytearray (змейка - 1, стены - OBSTACLE, порталы - PORTAL),
+        # поэтому движение и проверка столкновения не зависят от длины змейки.
+        # Индекс свободных клеток: массив клеток и позиция каждой клетки в нем
+        # (-1 для занятых), удаление - перестановкой с последним элементом
+        cells = self.width * self.height
+        # Буферы прошлой партии перезаписываются на месте, если их не держит снимок
+        reuse = None
+        if self.occupancy is not None and not self._shared:
+            reuse = (self.occupancy, self.free, self.free_pos)
+        self.occupancy, self.free, self.free_pos = self.tables.fresh(reuse)
+        # Буферы и генератор не делятся ни с одним снимком
+        self._shared = False
+        self._rng_shared = False
+        # Старт - случайный из точек уровня (если их несколько)
+        spawns = self.tables.spawns
+        start, step = spawns[self.rng.randrange(len(spawns))] if len(spawns) > 1 else spawns[0]
+        self.body = array('i', bytes(4 * min(BODY_CAPACITY, cells)))
+        self.body[0] = start
+        self.head = 0
+        self.length = 1
+        self._occupy(start)
+        self.direction = Direction(step)
+        self.foods: List[Tuple[int, int]] = []
+        self._spawn_foods()
+        self.score = 0
+        self.eaten = 0
+        self.speed = self._speeds[0]
+        self.ticks = 0
+        self.done = False
+        self.won = False
+        # Клетка, освобожденная хвостом на последнем тике (для рендерера)
+        self.last_tail = None
+        return self.observe()
+
+    def place_snake(self, cells: Sequence[Tuple[int, int]], direction: Direction):
+        """
+        Поставить змейку заданной формы (первая клетка - голова) на поле без змейки
+        Нужна тестам и замерам; еда выбирается заново, счет и тики не меняются
+        """
+        count = self.width * self.height
+        if not 1 <= len(cells) <= len(self.tables.free):
+            raise ValueError("змейка должна занимать от одной клетки до всего свободного поля")
+        self.occupancy, self.free, self.free_pos = self.tables.fresh()
+        self._shared = False
+        self.body = array('i', bytes(4 * min(max(BODY_CAPACITY, len(cells)), count)))
+        for i, (x, y) in enumerate(reversed(cells)):
+            cell = y * self.width + x
+            if not (0 <= x < self.width and 0 <= y < self.height) or self.occupancy[cell]:
+                raise ValueError(f"клетка {(x, y)} вне поля или занята")
+            self.body[i] = cell
+            self._occupy(cell)
+        self.head = len(cells) - 1
+        self.length = len(cells)
+        self.direction = direction
+        self.foods = []
+        self._spawn_foods()
+        self.last_tail = None
+
+    # Первое яблоко - для агентов и рендереров, которым хватает одного
+    @property
+    def food(self) -> Optional[Tuple[int, int]]:
+        return self.foods[0] if self.foods else None
+
+    @food.setter
+    def food(self, value: Optional[Tuple[int, int]]):
+        if value is None:
+            del self.foods[:1]
+        elif self.foods:
+            self.foods[0] = value
+        else:
+            self.foods.append(value)
+
+    def _spawn_foods(self):
+        """Разложить яблоки по правилам (меньше, если не хватает свободных клеток)"""
+        for _ in range(self.rules.foods):
+            food = self.generate_food()
+            if food is None:
+                break
+            self.foods.append(food)
+
+    def _occupy(self, cell: int):
+        """Пометить клетку занятой и убрать ее из индекса свободных"""
+        occupy_cell(self.occupancy, self.free, self.free_pos, cell)
+
+    def _release(self, cell: int):
+        """Пометить клетку свободной и вернуть ее в индекс"""
+        release_cell(self.occupancy, self.free, self.free_pos, cell)
+
+    def generate_food(self) -> Optional[Tuple[int, int]]:
+        """Генерация еды в случайной свободной клетке без еды; None если таких нет"""
+        free, foods, width = self.free, self.foods, self.width
+        if self._rng_shared:
+            self._unshare_rng()
+        if len(free) <= len(foods):
+            # Свободных клеток не больше, чем яблок: ищем клетку без яблока перебором
+            for cell in free:
+                if (cell % width, cell // width) not in foods:
+                    return (cell % width, cell // width)
+            return None
+        while True:
+            cell = free[self.rng.randrange(len(free))]
+            food = (cell % width, cell // width)
+            if food not in foods:
+                return food
+
+    def step(self, action: Optional[Direction] = None) -> StepResult:
+        """Один тик игры; разворот на 180 градусов игнорируется"""
+        if self.done:
+            return StepResult(0, True)
+
+        if action is not None and action != OPPOSITE[self.direction]:
+            self.direction = action
+        self.ticks += 1
+        self.last_tail = None
+
+        # Движение змейки: следующая клетка по таблицам соседей
+        width = self.width
+        body = self.body
+        head_y, head_x = divmod(body[self.head], width)
+        next_x, next_y, portals = self._moves[self.direction]
+        x = next_x[head_x]
+        y = next_y[head_y]
+
+        # Проверка столкновения со стенами: за краем поля в таблице -1
+        # (если края заворачиваются, таких клеток нет)
+        if x < 0 or y < 0:
+            self.done = True
+            return StepResult(0, True)
+
+        # Вход в портал - выход за парным порталом (-1 - выхода нет)
+        cell = y * width + x
+        cell = portals.get(cell, cell)
+        if cell < 0:
+            self.done = True
+            return StepResult(0, True)
+
+        # Проверка столкновения с собой и стенами (хвост еще на месте, как и раньше)
+        if self.occupancy[cell]:
+            self.done = True
+            return StepResult(0, True)
+
+        # Буферы общие со снимком - копируем перед первой записью
+        if self._shared:
+            self._unshare()
+            body = self.body
+
+        new_head = (cell % width, cell // width)
+        ate = new_head in self.foods
+        if ate and self.length == len(body):
+            body = self._grow()
+        tail_slot = (self.head - self.length + 1) % len(body)
+        tail_cell = body[tail_slot]
+        self.head = (self.head + 1) % len(body)
+        body[self.head] = cell
+        self._occupy(cell)
+
+        # Проверка поедания еды
+        if ate:
+            self.foods.remove(new_head)
+            self.length += 1
+            self.eaten += 1
+            self.score += self._food_score
+            food = self.generate_food()
+            if food is not None:
+                self.foods.append(food)
+            # Скорость - из таблицы по числу яблок (после насыщения - последнее значение)
+            speeds = self._speeds
+            self.speed = speeds[min(self.eaten, len(speeds) - 1)]
+            # Поле заполнено целиком - победа
+            if not self.free:
+                self.done = True
+                self.won = True
+            return StepResult(self._food_score, self.done)
+
+        # Убираем хвост если еда не съедена
+        self.last_tail = (tail_cell % width, tail_cell // width)
+        self._release(tail_cell)
+        return StepResult(0, False)
+
+    def _grow(self) -> array:
+        """Удвоение кольцевого буфера тела; сегменты раскладываются от хвоста к голове"""
+        old = self.body
+        capacity = min(len(old) * 2, self.width * self.height)
+        body = array('i', bytes(4 * capacity))
+        for i in range(self.length):
+            body[i] = old[(self.head - self.length + 1 + i) % len(old)]
+        self.head = self.length - 1
+        self.body = body
+        return body
+
+    def step_with_undo(self, action: Optional[Direction] = None) -> Tuple[StepResult, Undo]:
+        """
+        Тик с записью для отката; undo() принимает записи строго в обратном порядке.
+        Сам тик не копирует буферы движка (кроме первого тика после снимка)
+        """
+        if self._shared:
+            self._unshare()
+        self._rng_shared = True
+        body, free = self.body, self.free
+        undo = Undo(self.direction, self.ticks, self.done, self.won, self.last_tail, body,
+                    self.head, self.length, body[(self.head + 1) % len(body)],
+                    free[-1] if free else -1, tuple(self.foods), self.score, self.eaten,
+                    self.speed, self.rng)
+        return self.step(action), undo
+
+    def undo(self, undo: Undo):
+        """Откат тика, сделанного step_with_undo"""
+        if undo.done:
+            return  # Тик после конца игры ничего не менял
+        if self.ticks != undo.ticks + 1:
+            raise ValueError("записи отката нужно применять в обратном порядке")
+        if not self.done or self.won:
+            # Змейка сдвинулась: вернуть хвост, затем убрать голову из занятых
+            if self._shared:
+                self._unshare()
+            occupancy, free, free_pos = self.occupancy, self.free, self.free_pos
+            cell = self.body[self.head]
+            if self.length == undo.length:
+                tail = free.pop()
+                occupancy[tail] = 1
+                free_pos[tail] = -1
+            occupancy[cell] = 0
+            last = undo.last_free
+            if last != cell:
+                # Клетка головы стояла на месте, куда переставлена последняя клетка индекса
+                pos = free_pos[last]
+                free[pos] = cell
+                free_pos[cell] = pos
+            free_pos[last] = len(free)
+            free.append(last)
+            # Буфер тела до тика (при росте движок перешел на новый). Прежний буфер
+            # мог попасть в снимок - тогда он копируется, а не перезаписывается
+            body = undo.body
+            if body is not self.body:
+                body = body[:]
+            body[(undo.head + 1) % len(body)] = undo.slot
+            self.body = body
+        (self.direction, self.ticks, self.done, self.won, self.last_tail, _, self.head,
+         self.length, _, _, foods, self.score, self.eaten, self.speed, self.rng) = undo
+        self.foods = list(foods)
+        self._rng_shared = True
+
+    def snapshot(self) -> EngineState:
+        """Снимок партии за O(1): буферы не копируются, пока движок их не изменит"""
+        self._shared = True
+        self._rng_shared = True
+        return EngineState(self.rules, self.seed, self.rng, self.body, self.head, self.length,
+                           self.occupancy, self.free, self.free_pos, tuple(self.foods),
+                           self.direction, self.score, self.eaten, self.speed, self.ticks,
+                           self.done, self.won, self.last_tail)
+
+    def restore(self, state: EngineState):
+        """Возврат к снимку за O(1); снимок остается годным для следующих возвратов"""
+        if state.rules is not self.rules and state.rules != self.rules:
+            raise ValueError("снимок сделан при других правилах")
+        (_, self.seed, self.rng, self.body, self.head, self.length, self.occupancy,
+         self.free, self.free_pos, foods, self.direction, self.score, self.eaten, self.speed,
+         self.ticks, self.done, self.won, self.last_tail) = state
+        self.foods = list(foods)
+        self._shared = True
+        self._rng_shared = True
+
+    def clone(self) -> "SnakeEngine":
+        """Независимая копия партии (таблицы правил общие, буферы - до первой записи)"""
+        other = object.__new__(SnakeEngine)
+        other.rules, other.tables = self.rules, self.tables
+        other.width, other.height = self.width, self.height
+        other._moves, other._speeds, other._food_score = self._moves, self._speeds, self._food_score
+        other.snake = SnakeBody(other)
+        other.restore(self.snapshot())
+        return other
+
+    def _unshare(self):
+        """Собственные копии буферов вместо общих со снимками (копирование памяти целиком)"""
+        self.body = self.body[:]
+        self.occupancy = self.occupancy[:]
+        self.free = self.free[:]
+        self.free_pos = self.free_pos[:]
+        self._shared = False
+
+    def _unshare_rng(self):
+        """Собственный генератор с тем же состоянием вместо общего со снимками"""
+        rng = random.Random()
+        rng.setstate(self.rng.getstate())
+        self.rng = rng
+        self._rng_shared = False
+
+    def observe(self) -> Observation:
+        """Текущее состояние игры"""
+        return Observation(tuple(self.snake), self.direction, self.food,
+                           self.score, self.speed, self.done, self.won)
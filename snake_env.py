@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Окружение Gymnasium для "Змейки" поверх SnakeEngine
+Наблюдения пишутся в заранее выделенные массивы NumPy (поле grid - одним
+np.copyto из занятости движка) и возвращаются без копирования: на каждом шаге
+это тот же объект, поэтому сохранять наблюдение между шагами нужно через .copy()
+"""
+
+import os
+from typing import Any, Dict, Optional, Tuple
+
+import gymnasium as gym
+import numpy as np
+from gymnasium import spaces
+
+from snake_engine import Direction, GRID_HEIGHT, GRID_WIDTH, INITIAL_SPEED, SnakeEngine
+
+# Содержимое клетки в наблюдениях grid и local
+EMPTY = 0
+BODY = 1
+FOOD = 2
+HEAD = 3
+WALL = 4
+
+# Действие - индекс направления в списке Direction
+DIRECTIONS = list(Direction)
+# Поворот окна local, чтобы змейка всегда смотрела вверх (np.rot90 против часовой)
+ROTATIONS = {Direction.UP: 0, Direction.RIGHT: 1, Direction.DOWN: 2, Direction.LEFT: 3}
+# Налево и направо от текущего направления
+LEFT_OF = {Direction.UP: Direction.LEFT, Direction.LEFT: Direction.DOWN,
+           Direction.DOWN: Direction.RIGHT, Direction.RIGHT: Direction.UP}
+RIGHT_OF = {turn: direction for direction, turn in LEFT_OF.items()}
+
+OBS_MODES = ("grid", "local", "features")
+# Признаки: опасность впереди/слева/справа, направление (4), еда слева/справа/выше/ниже
+FEATURES = 11
+
+class SnakeEnv(gym.Env):
+    """
+    Партия "Змейки" как gymnasium.Env
+    obs_mode: grid - поле целиком (H, W), local - окно (2r+1, 2r+1) вокруг головы,
+    повернутое по направлению движения, features - вектор из 11 признаков
+    """
+
+    metadata = {"render_modes": ["rgb_array"], "render_fps": INITIAL_SPEED}
+
+    def __init__(self, width: int = GRID_WIDTH, height: int = GRID_HEIGHT,
+                 obs_mode: str = "grid", view_radius: int = 5,
+                 max_ticks: Optional[int] = None, render_mode: Optional[str] = None):
+        if obs_mode not in OBS_MODES:
+            raise ValueError(f"неизвестный режим наблюдений: {obs_mode}")
+        if render_mode is not None and render_mode not in self.metadata["render_modes"]:
+            raise ValueError(f"неизвестный режим отрисовки: {render_mode}")
+        self.obs_mode = obs_mode
+        self.view_radius = view_radius
+        self.max_ticks = max_ticks
+        self.render_mode = render_mode
+        self.engine = SnakeEngine(width, height, seed=0)
+        self.action_space = spaces.Discrete(len(DIRECTIONS))
+
+        if obs_mode == "grid":
+            self._obs = np.zeros((height, width), dtype=np.uint8)
+            self.observation_space = spaces.Box(EMPTY, HEAD, self._obs.shape, dtype=np.uint8)
+        elif obs_mode == "local":
+            side = 2 * view_radius + 1
+            self._obs = np.zeros((side, side), dtype=np.uint8)
+            self._window = np.zeros((side, side), dtype=np.uint8)
+            self.observation_space = spaces.Box(EMPTY, WALL, self._obs.shape, dtype=np.uint8)
+        else:
+            self._obs = np.zeros(FEATURES, dtype=np.float32)
+            self.observation_space = spaces.Box(0.0, 1.0, self._obs.shape, dtype=np.float32)
+
+        self._occupancy: Optional[bytearray] = None
+        self._board: Optional[np.ndarray] = None
+        self._game = None
+        self._frame: Optional[np.ndarray] = None
+
+    def reset(self, *, seed: Optional[int] = None,
+              options: Optional[Dict[str, Any]] = None) -> Tuple[np.ndarray, Dict[str, Any]]:
+        """Новая партия; seed движка берется из генератора окружения"""
+        super().reset(seed=seed)
+        self.engine.reset(int(self.np_random.integers(0, 2 ** 63)))
+        return self._observe(), self._info()
+
+    def step(self, action: int) -> Tuple[np.ndarray, float, bool, bool, Dict[str, Any]]:
+        """Один тик; разворот на 180 градусов движок игнорирует"""
+        result = self.engine.step(DIRECTIONS[action])
+        truncated = (not result.done and self.max_ticks is not None
+                     and self.engine.ticks >= self.max_ticks)
+        return self._observe(), float(result.reward), result.done, truncated, self._info()
+
+    def _info(self) -> Dict[str, Any]:
+        engine = self.engine
+        return {"score": engine.score, "length": engine.length,
+                "won": engine.won, "seed": engine.seed}
+
+    def _observe(self) -> np.ndarray:
+        engine = self.engine
+        # Вид на массив занятости движка без копирования; движок пересоздает
+        # массив при сбросе, тогда пересоздается и вид
+        if self._occupancy is not engine.occupancy:
+            self._occupancy = engine.occupancy
+            self._board = np.frombuffer(engine.occupancy, dtype=np.uint8).reshape(
+                engine.height, engine.width)
+        if self.obs_mode == "grid":
+            self._observe_grid()
+        elif self.obs_mode == "local":
+            self._observe_local()
+        else:
+            self._observe_features()
+        return self._obs
+
+    def _observe_grid(self):
+        obs = self._obs
+        # Поле копируется в готовый массив (без выделения памяти): поверх него
+        # отмечаются голова и еда, а занятость движка менять нельзя
+        np.copyto(obs, self._board)
+        head_x, head_y = self.engine.snake[0]
+        obs[head_y, head_x] = HEAD
+        if self.engine.food is not None:
+            obs[self.engine.food[1], self.engine.food[0]] = FOOD
+
+    def _observe_local(self):
+        engine = self.engine
+        r = self.view_radius
+        window = self._window
+        head_x, head_y = engine.snake[0]
+        # Часть окна внутри поля берется срезом, остальное - стена
+        window.fill(WALL)
+        x0, y0 = max(head_x - r, 0), max(head_y - r, 0)
+        x1, y1 = min(head_x + r + 1, engine.width), min(head_y + r + 1, engine.height)
+        window[y0 - head_y + r:y1 - head_y + r, x0 - head_x + r:x1 - head_x + r] = \
+            self._board[y0:y1, x0:x1]
+        if engine.food is not None:
+            fx, fy = engine.food[0] - head_x + r, engine.food[1] - head_y + r
+            if 0 <= fx < window.shape[1] and 0 <= fy < window.shape[0]:
+                window[fy, fx] = FOOD
+        window[r, r] = HEAD
+        np.copyto(self._obs, np.rot90(window, ROTATIONS[engine.direction]))
+
+    def _blocked(self, x: int, y: int, direction: Direction) -> bool:
+        """Смерть при шаге из (x, y) в направлении direction"""
+        dx, dy = direction.value
+        x, y = x + dx, y + dy
+        engine = self.engine
+        if not (0 <= x < engine.width and 0 <= y < engine.height):
+            return True
+        return bool(engine.occupancy[y * engine.width + x])
+
+    def _observe_features(self):
+        engine = self.engine
+        obs = self._obs
+        head_x, head_y = engine.snake[0]
+        direction = engine.direction
+        obs[0] = self._blocked(head_x, head_y, direction)
+        obs[1] = self._blocked(head_x, head_y, LEFT_OF[direction])
+        obs[2] = self._blocked(head_x, head_y, RIGHT_OF[direction])
+        for i, d in enumerate(DIRECTIONS):
+            obs[3 + i] = d == direction
+        food_x, food_y = engine.food if engine.food is not None else (head_x, head_y)
+        obs[7] = food_x < head_x
+        obs[8] = food_x > head_x
+        obs[9] = food_y < head_y
+        obs[10] = food_y > head_y
+
+    def render(self) -> Optional[np.ndarray]:
+        """Кадр игры в массив (H, W, 3); окно не создается, поверхность одна на все кадры"""
+        if self.render_mode != "rgb_array":
+            return None
+        # Окно не нужно: на серверах без дисплея SDL работает с драйвером dummy
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+        import pygame
+        from snake_game import WINDOW_HEIGHT, WINDOW_WIDTH, GameState, SnakeGame
+        if self._game is None:
+            # Игра рисует движок окружения: второй движок на все поле не создается
+            self._game = SnakeGame(screen=pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT)),
+                                   engine=self.engine)
+            self._game.state = GameState.PLAYING
+            self._frame = np.empty((WINDOW_HEIGHT, WINDOW_WIDTH, 3), dtype=np.uint8)
+        self._game.draw()
+        # pixels3d - вид на пиксели поверхности (W, H, 3); копия в готовый массив
+        pixels = pygame.surfarray.pixels3d(self._game.screen)
+        np.copyto(self._frame, pixels.transpose(1, 0, 2))
+        del pixels  # Снять блокировку поверхности
+        return self._frame
+
+    def close(self):
+        """Освободить поверхность отрисовки; pygame остается в том же состоянии
+        для остального процесса (окно окружение не открывает)"""
+        self._game = None
+        self._frame = None
+
+# Проверка окружения в gym.make отключена: она требует новый массив на каждый шаг
+gym.register(id="Snake-v0", entry_point="snake_env:SnakeEnv", disable_env_checker=True)
@@ -4,18 +4,75 @@
 Создано с использованием pygame для плавной игровой механики
 """
 
-import pygame
-import random
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import os
 import sys
+import time
+from collections import deque
+from functools import cached_property, lru_cache
 from enum import Enum
-from typing import List, Tuple
+from typing import Deque, List, Optional, Tuple
+
+from autopilot import Autopilot
+from capture import FrameCapture
+from frame_profiler import PHASES, FrameProfiler
+from hamiltonian import HamiltonianSolver, cycle_supported
+from leaderboard import Entry, Leaderboard
+from replay import Replay, ReplayRecorder
+from rules import Rules, load_rules, rules_from_dict
+from savegame import QUICKSAVE, load_game, save_game
+from snake_engine import (MAX_BOARD_SIZE, OBSTACLE, OPPOSITE, PORTAL, Direction, SnakeBody,
+                          SnakeEngine, Undo)
+
+def _lazy_import(name: str):
+    """Модуль загружается при первом обращении к его атрибутам"""
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+# pygame (и SDL) загружается только при первом обращении: импорт модуля ради
+# констант или логики игры его не трогает. Аннотации с типами pygame не
+# вычисляются благодаря from __future__ import annotations
+pygame = _lazy_import("pygame")
 
 # Константы игры
 WINDOW_WIDTH = 800
 WINDOW_HEIGHT = 600
 GRID_SIZE = 20
+# Видимая область в клетках; это же размер поля по умолчанию
 GRID_WIDTH = WINDOW_WIDTH // GRID_SIZE
 GRID_HEIGHT = WINDOW_HEIGHT // GRID_SIZE
+# Камера сдвигается, когда голова подходит к краю экрана ближе этого числа клеток
+CAMERA_MARGIN = 5
+
+# Частота кадров не зависит от скорости змейки
+RENDER_FPS = 60
+# Сколько тиков можно догнать за один кадр, если игра отстала
+MAX_TICKS_PER_FRAME = 5
+# Сколько нажатий стрелок запоминается между тиками
+INPUT_QUEUE_SIZE = 3
+
+# Перемотка назад: запись отката на каждом тике (O(1) и около сотни байт на
+# любом поле), хранятся последние REWIND_TICKS тиков
+REWIND_TICKS = 600
+# На сколько тиков перематывает одно нажатие BACKSPACE
+REWIND_STEP = 20
+
+# Оверлей профилировщика обновляет цифры раз в столько кадров
+PROFILER_REFRESH = 15
+
+# Автопилоты по имени; клавиша A включает выбранный (по умолчанию - поиск пути)
+AUTOPILOTS = {"bfs": Autopilot, "hamiltonian": HamiltonianSolver}
+DEFAULT_AUTOPILOT = "bfs"
 
 # Цвета (RGB)
 BLACK = (0, 0, 0)
@@ -26,12 +83,83 @@ RED = (255, 0, 0)
 BLUE = (0, 0, 255)
 YELLOW = (255, 255, 0)
 GRAY = (128, 128, 128)
+DARK_GRAY = (40, 40, 40)
+# Цвета пар порталов (по кругу)
+PORTAL_COLORS = ((0, 160, 255), (255, 140, 0), (200, 80, 255), (255, 220, 0), (0, 220, 160))
+
+def make_autopilot(kind: str, engine: SnakeEngine):
+    """
+    Автопилот по имени; решателю по циклу нужно поле без стен, препятствий
+    и порталов с гамильтоновым циклом, на остальных полях вместо него ведет поиск пути
+    """
+    if kind == "hamiltonian" and not cycle_supported(engine):
+        kind = "bfs"
+    return AUTOPILOTS[kind](engine)
+
+@lru_cache(maxsize=128)
+def render_text(font: pygame.font.Font, text: str, color: Tuple[int, int, int]) -> pygame.Surface:
+    """Отрисовка текста с кэшем: одна и та же строка рендерится один раз"""
+    return font.render(text, True, color)
+
+def load_font(size: int) -> pygame.font.Font:
+    """Шрифт по умолчанию; подсистема шрифтов поднимается при первом шрифте"""
+    if not pygame.font.get_init():
+        pygame.font.init()
+    return pygame.font.Font(None, size)
+
+def make_head_sprite(direction: Direction) -> pygame.Surface:
+    """Голова змейки с глазами, смотрящими по направлению движения"""
+    sprite = pygame.Surface((GRID_SIZE, GRID_SIZE))
+    rect = sprite.get_rect()
+    pygame.draw.rect(sprite, DARK_GREEN, rect)
+    pygame.draw.rect(sprite, GREEN, rect, 2)
+    # Глаза
+    eye_size = 3
+    eye_offset = 5
+    near, far = eye_offset, GRID_SIZE - eye_offset
+    if direction == Direction.UP:
+        eyes = [(near, near), (far, near)]
+    elif direction == Direction.DOWN:
+        eyes = [(near, far), (far, far)]
+    elif direction == Direction.LEFT:
+        eyes = [(near, near), (near, far)]
+    else:  # RIGHT
+        eyes = [(far, near), (far, far)]
+    for eye in eyes:
+        pygame.draw.circle(sprite, WHITE, eye, eye_size)
+    return sprite
+
+def make_segment_sprite() -> pygame.Surface:
+    """Сегмент тела змейки"""
+    sprite = pygame.Surface((GRID_SIZE, GRID_SIZE))
+    rect = sprite.get_rect()
+    pygame.draw.rect(sprite, GREEN, rect)
+    pygame.draw.rect(sprite, DARK_GREEN, rect, 1)
+    return sprite
+
+def make_food_sprite() -> pygame.Surface:
+    """Еда - красный кружок на прозрачном фоне"""
+    sprite = pygame.Surface((GRID_SIZE, GRID_SIZE), pygame.SRCALPHA)
+    center = (GRID_SIZE // 2, GRID_SIZE // 2)
+    pygame.draw.circle(sprite, RED, center, GRID_SIZE // 2 - 2)
+    pygame.draw.circle(sprite, WHITE, center, GRID_SIZE // 2 - 2, 2)
+    return sprite
+
+def make_obstacle_sprite() -> pygame.Surface:
+    """Препятствие - серый блок"""
+    sprite = pygame.Surface((GRID_SIZE, GRID_SIZE))
+    rect = sprite.get_rect()
+    pygame.draw.rect(sprite, GRAY, rect)
+    pygame.draw.rect(sprite, DARK_GRAY, rect, 2)
+    return sprite
 
-class Direction(Enum):
-    UP = (0, -1)
-    DOWN = (0, 1)
-    LEFT = (-1, 0)
-    RIGHT = (1, 0)
+def make_portal_sprite(color: Tuple[int, int, int]) -> pygame.Surface:
+    """Портал - цветное кольцо; у парных порталов цвет одинаковый"""
+    sprite = pygame.Surface((GRID_SIZE, GRID_SIZE), pygame.SRCALPHA)
+    center = (GRID_SIZE // 2, GRID_SIZE // 2)
+    pygame.draw.circle(sprite, color, center, GRID_SIZE // 2 - 1, 4)
+    pygame.draw.circle(sprite, WHITE, center, GRID_SIZE // 4 - 1)
+    return sprite
 
 class GameState(Enum):
     MENU = 1
@@ -40,37 +168,190 @@ class GameState(Enum):
     GAME_OVER = 4
 
 class SnakeGame:
-    def __init__(self):
-        pygame.init()
-        self.screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
-        pygame.display.set_caption("Змейка - Snake Game")
+    def __init__(self, replay: Optional[Replay] = None, incremental: bool = True,
+                 uncapped: bool = False, width: int = GRID_WIDTH, height: int = GRID_HEIGHT,
+                 screen: Optional[pygame.Surface] = None, profile_path: Optional[str] = None,
+                 autopilot: Optional[str] = None, leaderboard: Optional[Leaderboard] = None,
+                 rules: Optional[Rules] = None, capture: Optional[FrameCapture] = None,
+                 engine: Optional[SnakeEngine] = None):
+        # С готовой поверхностью (например, для замеров) окно не создается.
+        # Из подсистем SDL нужны только дисплей (окно и события) и шрифты,
+        # звук, джойстики и прочее, что поднимает pygame.init(), не используются
+        self.windowed = screen is None
+        if screen is None:
+            pygame.display.init()
+            self.screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+            pygame.display.set_caption("Змейка - Snake Game")
+        else:
+            self.screen = screen
         self.clock = pygame.time.Clock()
         
-        # Шрифты
-        self.font_large = pygame.font.Font(None, 48)
-        self.font_medium = pygame.font.Font(None, 36)
-        self.font_small = pygame.font.Font(None, 24)
+        # Спрайты рисуются один раз, дальше только копируются на экран
+        self.head_sprites = {direction: make_head_sprite(direction) for direction in Direction}
+        self.segment_sprite = make_segment_sprite()
+        self.food_sprite = make_food_sprite()
+        self.obstacle_sprite = make_obstacle_sprite()
+        self.portal_sprites = [make_portal_sprite(color) for color in PORTAL_COLORS]
+        
+        # Затемнение для паузы и конца игры создается один раз; кадр этих экранов
+        # собирается при входе в состояние и дальше выводится одним blit
+        self.overlay = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
+        self.overlay.set_alpha(128)
+        self.overlay.fill(BLACK)
+        self._static_frame = None
+        self._static_key = None
+        
+        # Инкрементальная отрисовка: полный кадр только при смене состояния,
+        # между тиками перерисовываются лишь изменившиеся клетки
+        self.incremental = incremental
+        self._drawn_state = None
+        self._drawn_tick = -1
+        self._drawn_food = None
+        self._drawn_hud = None
+        self._drawn_alpha = 1.0
+        self._dirty_cells = set()
+        self._hud_rect = pygame.Rect(0, 0, 0, 0)
+        
+        # Симуляция идет с фиксированным шагом 1/speed, кадры - с частотой RENDER_FPS;
+        # alpha - доля пути от прошлого тика к текущему для плавного движения.
+        # uncapped - тики без ограничения скорости (для замеров)
+        self.uncapped = uncapped
+        self.alpha = 1.0
+        
+        # Профилировщик включается явно; F3 показывает оверлей, при выходе
+        # замеры сохраняются в profile_path
+        self.profiler = FrameProfiler() if profile_path else None
+        self.profile_path = profile_path
+        self.show_profiler = False
+        self._profiler_lines: List[pygame.Surface] = []
+        self._profiler_rect = pygame.Rect(0, 0, 0, 0)
+        
+        # Запись кадров: цикл только копирует кадр в очередь записи с частотой
+        # capture.fps, кодирование идет в ее потоке
+        self.capture = capture
         
         # Игровые переменные
-        self.reset_game()
+        # Поле может быть больше окна: видна область GRID_WIDTH x GRID_HEIGHT
+        # с левым верхним углом в клетке камеры. Правила (если заданы) задают и размер поля.
+        # С готовым движком (например, окружения snake_env) игра рисует его партию
+        self.engine = engine if engine is not None else SnakeEngine(width, height, rules=rules)
+        self.camera_x = 0
+        self.camera_y = 0
+        self.input_queue: Deque[Direction] = deque(maxlen=INPUT_QUEUE_SIZE)
+        self.recorder = ReplayRecorder()
+        self.replay = replay
+        # Журнал отката для перемотки (без тиков без ограничения скорости не ведется).
+        # Перемотанная или продолженная из сохранения партия в таблицу рекордов не идет
+        self.history: Deque[Undo] = deque(maxlen=0 if uncapped else REWIND_TICKS)
+        self.ranked = True
+        # Сообщение на экране паузы (например, о сохранении)
+        self.notice = ""
+        # Автопилот ведет змейку через ту же очередь поворотов, что и клавиши
+        self.autopilot_kind = autopilot or DEFAULT_AUTOPILOT
+        self.autopilot = make_autopilot(autopilot, self.engine) if autopilot else None
         self.state = GameState.MENU
-        self.high_score = self.load_high_score()
+        # Таблица рекордов только у игры в окне; на поверхности в памяти
+        # (замеры, окружения) рекорд живет до конца процесса
+        if leaderboard is None and self.windowed:
+            leaderboard = Leaderboard()
+        self.leaderboard = leaderboard
+        self.high_score = leaderboard.best() if leaderboard is not None else 0
         
+        # Повтор проигрывается сразу, без меню
+        if self.replay is not None:
+            self.reset_game()
+            self.state = GameState.PLAYING
+
+    # Шрифты создаются при первой отрисовке текста
+    @cached_property
+    def font_large(self) -> pygame.font.Font:
+        return load_font(48)
+
+    @cached_property
+    def font_medium(self) -> pygame.font.Font:
+        return load_font(36)
+
+    @cached_property
+    def font_small(self) -> pygame.font.Font:
+        return load_font(24)
+
+    # Состояние партии хранится в движке, рендерер только читает его
+    @property
+    def snake(self) -> SnakeBody:
+        return self.engine.snake
+
+    @property
+    def direction(self) -> Direction:
+        return self.engine.direction
+
+    @property
+    def food(self) -> Optional[Tuple[int, int]]:
+        return self.engine.food
+
+    @property
+    def score(self) -> int:
+        return self.engine.score
+
+    @property
+    def speed(self) -> int:
+        return self.engine.speed
+
     def reset_game(self):
         """Сброс игры к начальному состоянию"""
-        self.snake = [(GRID_WIDTH // 2, GRID_HEIGHT // 2)]
-        self.direction = Direction.RIGHT
-        self.food = self.generate_food()
-        self.score = 0
-        self.speed = 10  # Начальная скорость
-        
-    def generate_food(self) -> Tuple[int, int]:
-        """Генерация еды в случайном месте"""
-        while True:
-            food = (random.randint(0, GRID_WIDTH - 1), 
-                   random.randint(0, GRID_HEIGHT - 1))
-            if food not in self.snake:
-                return food
+        if self.replay is not None:
+            self.engine = self.replay.new_engine()
+        else:
+            self.engine.reset()
+        self.input_queue.clear()
+        self.alpha = 1.0
+        self.recorder.start(self.engine)
+        self.history.clear()
+        if self.autopilot is not None:  # Путь прошлой партии в новой недействителен
+            self.autopilot = make_autopilot(self.autopilot_kind, self.engine)
+        self.ranked = True
+        self._drawn_state = None
+    
+    def rewind(self, ticks: int = REWIND_STEP):
+        """Перемотка партии на ticks тиков назад (сколько есть в истории) и пауза"""
+        if not self.history:
+            return
+        for _ in range(min(ticks, len(self.history))):
+            self.engine.undo(self.history.pop())
+        self.recorder.truncate(self.engine.ticks)
+        self.input_queue.clear()
+        if self.autopilot is not None:  # Путь автопилота построен для будущего, которого нет
+            self.autopilot = make_autopilot(self.autopilot_kind, self.engine)
+        self.ranked = False
+        self.alpha = 1.0
+        self.notice = ""
+        self.state = GameState.PAUSED
+        self._drawn_state = None
+    
+    def save_game(self, path: str = QUICKSAVE):
+        """Сохранение партии вместе с записью повтора"""
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            save_game(path, self.engine, self.recorder)
+            self.notice = f"Сохранено: {path}"
+        except OSError as e:
+            self.notice = f"Не удалось сохранить: {e.strerror or e}"
+        self._drawn_state = None
+    
+    def resume_game(self, path: str = QUICKSAVE):
+        """Продолжение сохраненной партии; игра начинается с паузы"""
+        engine, recorder = load_game(path)
+        self.engine = engine
+        self.replay = None
+        self.recorder = recorder if recorder is not None else ReplayRecorder()
+        if self.autopilot is not None:
+            self.autopilot = make_autopilot(self.autopilot_kind, self.engine)
+        self.input_queue.clear()
+        self.alpha = 1.0
+        self.history.clear()
+        self.ranked = False
+        self.notice = f"Загружено: {path}"
+        self.state = GameState.GAME_OVER if engine.done else GameState.PAUSED
+        self._drawn_state = None
     
     def handle_events(self):
         """Обработка событий"""
@@ -78,6 +359,16 @@ class SnakeGame:
             if event.type == pygame.QUIT:
                 return False
             
+            # Окно перекрыли или развернули - нужен полный кадр
+            if event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                self._drawn_state = None
+            
+            if (event.type == pygame.KEYDOWN and event.key == pygame.K_F3
+                    and self.profiler is not None):
+                self.show_profiler = not self.show_profiler
+                self._drawn_state = None
+                continue
+            
             if event.type == pygame.KEYDOWN:
                 if self.state == GameState.MENU:
                     if event.key == pygame.K_SPACE:
@@ -87,15 +378,20 @@ class SnakeGame:
                         return False
                         
                 elif self.state == GameState.PLAYING:
-                    if event.key == pygame.K_UP and self.direction != Direction.DOWN:
-                        self.direction = Direction.UP
-                    elif event.key == pygame.K_DOWN and self.direction != Direction.UP:
-                        self.direction = Direction.DOWN
-                    elif event.key == pygame.K_LEFT and self.direction != Direction.RIGHT:
-                        self.direction = Direction.LEFT
-                    elif event.key == pygame.K_RIGHT and self.direction != Direction.LEFT:
-                        self.direction = Direction.RIGHT
+                    if event.key == pygame.K_UP:
+                        self.queue_direction(Direction.UP)
+                    elif event.key == pygame.K_DOWN:
+                        self.queue_direction(Direction.DOWN)
+                    elif event.key == pygame.K_LEFT:
+                        self.queue_direction(Direction.LEFT)
+                    elif event.key == pygame.K_RIGHT:
+                        self.queue_direction(Direction.RIGHT)
+                    elif event.key == pygame.K_a:
+                        self.toggle_autopilot()
+                    elif event.key == pygame.K_BACKSPACE:
+                        self.rewind()
                     elif event.key == pygame.K_SPACE:
+                        self.notice = ""
                         self.state = GameState.PAUSED
                     elif event.key == pygame.K_ESCAPE:
                         self.state = GameState.MENU
@@ -103,6 +399,10 @@ class SnakeGame:
                 elif self.state == GameState.PAUSED:
                     if event.key == pygame.K_SPACE:
                         self.state = GameState.PLAYING
+                    elif event.key == pygame.K_BACKSPACE:
+                        self.rewind()
+                    elif event.key == pygame.K_s:
+                        self.save_game()
                     elif event.key == pygame.K_ESCAPE:
                         self.state = GameState.MENU
                         
@@ -110,110 +410,200 @@ class SnakeGame:
                     if event.key == pygame.K_SPACE:
                         self.reset_game()
                         self.state = GameState.PLAYING
+                    elif event.key == pygame.K_BACKSPACE:
+                        self.rewind()
                     elif event.key == pygame.K_ESCAPE:
                         self.state = GameState.MENU
         
         return True
     
+    def toggle_autopilot(self):
+        """Включение и выключение автопилота"""
+        if self.autopilot is None:
+            self.autopilot = make_autopilot(self.autopilot_kind, self.engine)
+        else:
+            self.autopilot = None
+    
+    def queue_direction(self, direction: Direction):
+        """Поворот в очередь: два быстрых нажатия за один тик не теряются"""
+        last = self.input_queue[-1] if self.input_queue else self.direction
+        # Повтор направления и разворот на 180 градусов бесполезны
+        if direction != last and direction != OPPOSITE[last]:
+            self.input_queue.append(direction)
+    
     def update_game(self):
         """Обновление логики игры"""
         if self.state != GameState.PLAYING:
             return
-            
-        # Движение змейки
-        head_x, head_y = self.snake[0]
-        dx, dy = self.direction.value
-        new_head = (head_x + dx, head_y + dy)
-        
-        # Проверка столкновения со стенами
-        if (new_head[0] < 0 or new_head[0] >= GRID_WIDTH or
-            new_head[1] < 0 or new_head[1] >= GRID_HEIGHT):
-            self.game_over()
-            return
-        
-        # Проверка столкновения с собой
-        if new_head in self.snake:
-            self.game_over()
-            return
         
-        self.snake.insert(0, new_head)
+        if self.replay is not None:
+            if self.engine.ticks >= len(self.replay):
+                self.game_over()
+                return
+            action = self.replay.direction(self.engine.ticks)
+        else:
+            if self.autopilot is not None:
+                self.input_queue.clear()
+                self.queue_direction(self.autopilot.decide())
+            action = self.input_queue.popleft() if self.input_queue else None
         
-        # Проверка поедания еды
-        if new_head == self.food:
-            self.score += 10
-            self.food = self.generate_food()
-            # Увеличение скорости каждые 50 очков
-            if self.score % 50 == 0:
-                self.speed = min(self.speed + 1, 20)
+        # Разворот на 180 градусов движок отбрасывает сам
+        if self.history.maxlen:
+            result, undo = self.engine.step_with_undo(action)
+            self.history.append(undo)
         else:
-            self.snake.pop()  # Убираем хвост если еда не съедена
+            result = self.engine.step(action)
+        self.recorder.record(self.engine.direction)
+        if result.done:
+            self.game_over()
     
     def game_over(self):
         """Обработка окончания игры"""
         self.state = GameState.GAME_OVER
-        if self.score > self.high_score:
-            self.high_score = self.score
-            self.save_high_score()
+        if self.replay is not None:  # Повтор не влияет на рекорд
+            return
+        self.high_score = max(self.high_score, self.score)
+        # Повтор хранит только seed и повороты, а счета сравнимы лишь
+        # при одинаковых правилах: в таблицу идут только стандартные партии,
+        # сыгранные от начала до конца без перемотки
+        if self.leaderboard is None or not self.engine.rules.standard or not self.ranked:
+            return
+        # Запись на диск - в потоке таблицы рекордов; повтор сохранится,
+        # если партия попадет в таблицу
+        entry = Entry(self.score, self.engine.length, self.engine.ticks,
+                      self.engine.width, self.engine.height, self.engine.seed)
+        self.leaderboard.submit(entry, self.recorder.copy())
     
-    def load_high_score(self) -> int:
-        """Загрузка рекорда из файла"""
-        try:
-            with open('high_score.txt', 'r') as f:
-                return int(f.read().strip())
-        except (FileNotFoundError, ValueError):
+    def draw_snake(self):
+        """Отрисовка змейки (только видимой части: змейка может быть очень длинной)"""
+        width, occupancy = self.engine.width, self.engine.occupancy
+        x_start = self.camera_x
+        x_end = min(x_start + GRID_WIDTH, width)
+        head = self.snake[0]
+        for y in range(self.camera_y, min(self.camera_y + GRID_HEIGHT, self.engine.height)):
+            row = occupancy[y * width + x_start:y * width + x_end]
+            x = row.find(1)
+            while x != -1:
+                if (x_start + x, y) != head:
+                    self.draw_segment(x_start + x, y)
+                x = row.find(1, x + 1)
+        # Голова змейки отличается от тела
+        self.draw_moving_parts()
+    
+    def draw_obstacles(self):
+        """Отрисовка видимых стен и порталов"""
+        width, occupancy = self.engine.width, self.engine.occupancy
+        x_start = self.camera_x
+        x_end = min(x_start + GRID_WIDTH, width)
+        for y in range(self.camera_y, min(self.camera_y + GRID_HEIGHT, self.engine.height)):
+            row = occupancy[y * width + x_start:y * width + x_end]
+            for value in (OBSTACLE, PORTAL):
+                x = row.find(value)
+                while x != -1:
+                    self.draw_cell(x_start + x, y)
+                    x = row.find(value, x + 1)
+    
+    def interpolation(self) -> float:
+        """Доля пути от прошлого тика к текущему; 1 - рисовать без интерполяции"""
+        if self.state != GameState.PLAYING or self.engine.ticks == 0:
+            return 1.0
+        return self.alpha
+    
+    def draw_moving_parts(self):
+        """Голова и кончик хвоста между прошлой и текущей клеткой"""
+        alpha = self.interpolation()
+        head_x, head_y = self.snake[0]
+        if alpha >= 1.0:
+            self.draw_head(head_x, head_y)
+            return
+        
+        # Через заворачивающийся край голова и хвост перескакивают без интерполяции
+        if self.engine.last_tail is not None:
+            from_x, from_y = self.engine.last_tail
+            to_x, to_y = self.snake[-1]
+            if abs(to_x - from_x) + abs(to_y - from_y) > 1:
+                from_x, from_y = to_x, to_y
+            self.screen.blit(self.segment_sprite,
+                             self.cell_pos(from_x + (to_x - from_x) * alpha,
+                                           from_y + (to_y - from_y) * alpha))
+        dx, dy = self.direction.value
+        if not (0 <= head_x - dx < self.engine.width and 0 <= head_y - dy < self.engine.height):
+            alpha = 1.0
+        self.screen.blit(self.head_sprites[self.direction],
+                         self.cell_pos(head_x - dx * (1.0 - alpha), head_y - dy * (1.0 - alpha)))
+    
+    def moving_cells(self) -> List[Tuple[int, int]]:
+        """Клетки, которые задевают движущиеся голова и хвост"""
+        head_x, head_y = self.snake[0]
+        dx, dy = self.direction.value
+        cells = [(head_x, head_y), (head_x - dx, head_y - dy), self.snake[-1]]
+        if self.engine.last_tail is not None:
+            cells.append(self.engine.last_tail)
+        return cells
+    
+    def cell_pos(self, x: float, y: float) -> Tuple[int, int]:
+        """Экранные координаты клетки с учетом камеры"""
+        return (round((x - self.camera_x) * GRID_SIZE), round((y - self.camera_y) * GRID_SIZE))
+    
+    def is_visible(self, x: int, y: int) -> bool:
+        """Попадает ли клетка в видимую область"""
+        return (0 <= x - self.camera_x < GRID_WIDTH and
+                0 <= y - self.camera_y < GRID_HEIGHT)
+    
+    def update_camera(self) -> bool:
+        """Сдвиг камеры за головой; True, если вид изменился"""
+        head_x, head_y = self.snake[0]
+        camera = (self._follow(self.camera_x, head_x, GRID_WIDTH, self.engine.width),
+                  self._follow(self.camera_y, head_y, GRID_HEIGHT, self.engine.height))
+        if camera == (self.camera_x, self.camera_y):
+            return False
+        self.camera_x, self.camera_y = camera
+        return True
+    
+    @staticmethod
+    def _follow(camera: int, head: int, view: int, board: int) -> int:
+        """Новая координата камеры по одной оси"""
+        if board <= view:
             return 0
+        # Камера стоит, пока голова не подойдет к краю, затем центрируется на ней
+        if head < camera + CAMERA_MARGIN or head >= camera + view - CAMERA_MARGIN:
+            camera = head - view // 2
+        return max(0, min(camera, board - view))
     
-    def save_high_score(self):
-        """Сохранение рекорда в файл"""
-        try:
-            with open('high_score.txt', 'w') as f:
-                f.write(str(self.high_score))
-        except IOError:
-            pass  # Игнорируем ошибки записи
+    def draw_head(self, x: int, y: int):
+        """Отрисовка головы змейки"""
+        self.screen.blit(self.head_sprites[self.direction], self.cell_pos(x, y))
     
-    def draw_snake(self):
-        """Отрисовка змейки"""
-        for i, segment in enumerate(self.snake):
-            x, y = segment
-            rect = pygame.Rect(x * GRID_SIZE, y * GRID_SIZE, GRID_SIZE, GRID_SIZE)
-            
-            # Голова змейки отличается от тела
-            if i == 0:
-                pygame.draw.rect(self.screen, DARK_GREEN, rect)
-                pygame.draw.rect(self.screen, GREEN, rect, 2)
-                # Глаза
-                eye_size = 3
-                eye_offset = 5
-                if self.direction == Direction.UP:
-                    pygame.draw.circle(self.screen, WHITE, 
-                                     (x * GRID_SIZE + eye_offset, y * GRID_SIZE + eye_offset), eye_size)
-                    pygame.draw.circle(self.screen, WHITE, 
-                                     (x * GRID_SIZE + GRID_SIZE - eye_offset, y * GRID_SIZE + eye_offset), eye_size)
-                elif self.direction == Direction.DOWN:
-                    pygame.draw.circle(self.screen, WHITE, 
-                                     (x * GRID_SIZE + eye_offset, y * GRID_SIZE + GRID_SIZE - eye_offset), eye_size)
-                    pygame.draw.circle(self.screen, WHITE, 
-                                     (x * GRID_SIZE + GRID_SIZE - eye_offset, y * GRID_SIZE + GRID_SIZE - eye_offset), eye_size)
-                elif self.direction == Direction.LEFT:
-                    pygame.draw.circle(self.screen, WHITE, 
-                                     (x * GRID_SIZE + eye_offset, y * GRID_SIZE + eye_offset), eye_size)
-                    pygame.draw.circle(self.screen, WHITE, 
-                                     (x * GRID_SIZE + eye_offset, y * GRID_SIZE + GRID_SIZE - eye_offset), eye_size)
-                else:  # RIGHT
-                    pygame.draw.circle(self.screen, WHITE, 
-                                     (x * GRID_SIZE + GRID_SIZE - eye_offset, y * GRID_SIZE + eye_offset), eye_size)
-                    pygame.draw.circle(self.screen, WHITE, 
-                                     (x * GRID_SIZE + GRID_SIZE - eye_offset, y * GRID_SIZE + GRID_SIZE - eye_offset), eye_size)
-            else:
-                pygame.draw.rect(self.screen, GREEN, rect)
-                pygame.draw.rect(self.screen, DARK_GREEN, rect, 1)
+    def draw_segment(self, x: int, y: int):
+        """Отрисовка сегмента тела"""
+        self.screen.blit(self.segment_sprite, self.cell_pos(x, y))
     
     def draw_food(self):
-        """Отрисовка еды"""
-        x, y = self.food
-        center = (x * GRID_SIZE + GRID_SIZE // 2, y * GRID_SIZE + GRID_SIZE // 2)
-        pygame.draw.circle(self.screen, RED, center, GRID_SIZE // 2 - 2)
-        pygame.draw.circle(self.screen, WHITE, center, GRID_SIZE // 2 - 2, 2)
+        """Отрисовка еды (когда поле заполнено, еды больше нет)"""
+        for x, y in self.engine.foods:
+            self.screen.blit(self.food_sprite, self.cell_pos(x, y))
+    
+    def draw_cell(self, x: int, y: int) -> pygame.Rect:
+        """Перерисовка неподвижного содержимого клетки (голову рисует draw_moving_parts)"""
+        rect = pygame.Rect(self.cell_pos(x, y), (GRID_SIZE, GRID_SIZE))
+        # Область за пределами поля (если поле меньше окна) закрашена серым
+        if not (0 <= x < self.engine.width and 0 <= y < self.engine.height):
+            self.screen.fill(DARK_GRAY, rect)
+            return rect
+        self.screen.fill(BLACK, rect)
+        cell = y * self.engine.width + x
+        value = self.engine.occupancy[cell]
+        if value == OBSTACLE:
+            self.screen.blit(self.obstacle_sprite, rect)
+        elif value == PORTAL:
+            pair = self.engine.tables.portal_pair[cell]
+            self.screen.blit(self.portal_sprites[pair % len(PORTAL_COLORS)], rect)
+        elif value:
+            if (x, y) != self.snake[0]:
+                self.draw_segment(x, y)
+        elif (x, y) in self.engine.foods:
+            self.screen.blit(self.food_sprite, rect)
+        return rect
     
     def draw_grid(self):
         """Отрисовка сетки"""
@@ -224,23 +614,25 @@ class SnakeGame:
     
     def draw_hud(self):
         """Отрисовка интерфейса (счет, скорость)"""
-        score_text = self.font_medium.render(f"Счет: {self.score}", True, WHITE)
-        speed_text = self.font_small.render(f"Скорость: {self.speed}", True, WHITE)
-        high_score_text = self.font_small.render(f"Рекорд: {self.high_score}", True, YELLOW)
+        score_text = render_text(self.font_medium, f"Счет: {self.score}", WHITE)
+        speed_text = render_text(self.font_small, f"Скорость: {self.speed}", WHITE)
+        high_score_text = render_text(self.font_small, f"Рекорд: {self.high_score}", YELLOW)
         
-        self.screen.blit(score_text, (10, 10))
-        self.screen.blit(speed_text, (10, 50))
-        self.screen.blit(high_score_text, (10, 75))
+        area = self.screen.blit(score_text, (10, 10))
+        area.union_ip(self.screen.blit(speed_text, (10, 50)))
+        area.union_ip(self.screen.blit(high_score_text, (10, 75)))
+        self._hud_rect = area
+        self._drawn_hud = (self.score, self.speed, self.high_score)
     
     def draw_menu(self):
         """Отрисовка главного меню"""
         self.screen.fill(BLACK)
         
-        title = self.font_large.render("ЗМЕЙКА", True, GREEN)
+        title = render_text(self.font_large, "ЗМЕЙКА", GREEN)
         title_rect = title.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 - 100))
         self.screen.blit(title, title_rect)
         
-        subtitle = self.font_medium.render("Snake Game", True, WHITE)
+        subtitle = render_text(self.font_medium, "Snake Game", WHITE)
         subtitle_rect = subtitle.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 - 60))
         self.screen.blit(subtitle, subtitle_rect)
         
@@ -248,6 +640,8 @@ class SnakeGame:
             "ПРОБЕЛ - Начать игру",
             "Стрелки - Управление",
             "ПРОБЕЛ (в игре) - Пауза",
+            "A (в игре) - Автопилот",
+            "BACKSPACE (в игре) - Назад",
             "ESC - Выход/Меню",
             "",
             f"Лучший результат: {self.high_score}"
@@ -255,52 +649,58 @@ class SnakeGame:
         
         for i, instruction in enumerate(instructions):
             color = YELLOW if "результат" in instruction else WHITE
-            text = self.font_small.render(instruction, True, color)
+            text = render_text(self.font_small, instruction, color)
             text_rect = text.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 + i * 30))
             self.screen.blit(text, text_rect)
     
     def draw_pause(self):
         """Отрисовка экрана паузы"""
         # Полупрозрачный overlay
-        overlay = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
-        overlay.set_alpha(128)
-        overlay.fill(BLACK)
-        self.screen.blit(overlay, (0, 0))
+        self.screen.blit(self.overlay, (0, 0))
         
-        pause_text = self.font_large.render("ПАУЗА", True, WHITE)
+        pause_text = render_text(self.font_large, "ПАУЗА", WHITE)
         pause_rect = pause_text.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2))
         self.screen.blit(pause_text, pause_rect)
         
-        continue_text = self.font_medium.render("ПРОБЕЛ - Продолжить", True, WHITE)
+        continue_text = render_text(self.font_medium, "ПРОБЕЛ - Продолжить", WHITE)
         continue_rect = continue_text.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 + 50))
         self.screen.blit(continue_text, continue_rect)
+        
+        keys_text = render_text(self.font_small, "S - Сохранить, BACKSPACE - Назад", WHITE)
+        keys_rect = keys_text.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 + 85))
+        self.screen.blit(keys_text, keys_rect)
+        
+        if self.notice:
+            notice_text = render_text(self.font_small, self.notice, YELLOW)
+            notice_rect = notice_text.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 + 110))
+            self.screen.blit(notice_text, notice_rect)
     
     def draw_game_over(self):
         """Отрисовка экрана окончания игры"""
         # Полупрозрачный overlay
-        overlay = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
-        overlay.set_alpha(128)
-        overlay.fill(BLACK)
-        self.screen.blit(overlay, (0, 0))
+        self.screen.blit(self.overlay, (0, 0))
         
-        game_over_text = self.font_large.render("ИГРА ОКОНЧЕНА", True, RED)
+        if self.engine.won:
+            game_over_text = render_text(self.font_large, "ПОБЕДА!", GREEN)
+        else:
+            game_over_text = render_text(self.font_large, "ИГРА ОКОНЧЕНА", RED)
         game_over_rect = game_over_text.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 - 50))
         self.screen.blit(game_over_text, game_over_rect)
         
-        score_text = self.font_medium.render(f"Ваш счет: {self.score}", True, WHITE)
+        score_text = render_text(self.font_medium, f"Ваш счет: {self.score}", WHITE)
         score_rect = score_text.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2))
         self.screen.blit(score_text, score_rect)
         
         if self.score == self.high_score and self.score > 0:
-            new_record = self.font_medium.render("НОВЫЙ РЕКОРД!", True, YELLOW)
+            new_record = render_text(self.font_medium, "НОВЫЙ РЕКОРД!", YELLOW)
             new_record_rect = new_record.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 + 30))
             self.screen.blit(new_record, new_record_rect)
         
-        restart_text = self.font_small.render("ПРОБЕЛ - Играть снова", True, WHITE)
+        restart_text = render_text(self.font_small, "ПРОБЕЛ - Играть снова", WHITE)
         restart_rect = restart_text.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 + 70))
         self.screen.blit(restart_text, restart_rect)
         
-        menu_text = self.font_small.render("ESC - Главное меню", True, WHITE)
+        menu_text = render_text(self.font_small, "BACKSPACE - Назад, ESC - Главное меню", WHITE)
         menu_rect = menu_text.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 + 95))
         self.screen.blit(menu_text, menu_rect)
     
@@ -310,45 +710,253 @@ class SnakeGame:
             self.draw_menu()
             
         elif self.state == GameState.PLAYING:
-            self.screen.fill(BLACK)
+            self.draw_board()
             # self.draw_grid()  # Можно включить для отладки
-            self.draw_food()
-            self.draw_snake()
             self.draw_hud()
             
-        elif self.state == GameState.PAUSED:
+        else:  # PAUSED или GAME_OVER
+            self.draw_static_screen()
+    
+    def draw_board(self):
+        """Видимая часть поля: фон, еда и змейка"""
+        self.update_camera()
+        board = pygame.Rect(self.cell_pos(0, 0), (self.engine.width * GRID_SIZE,
+                                                  self.engine.height * GRID_SIZE))
+        if board.contains(self.screen.get_rect()):
             self.screen.fill(BLACK)
-            self.draw_food()
-            self.draw_snake()
-            self.draw_hud()
+        else:
+            # Поле меньше окна: вокруг него серая область
+            self.screen.fill(DARK_GRAY)
+            self.screen.fill(BLACK, board)
+        if self.engine.tables.blocked:
+            self.draw_obstacles()
+        self.draw_food()
+        self.draw_snake()
+    
+    def draw_static_screen(self):
+        """Кадр паузы или конца игры: собирается один раз, потом копируется"""
+        self.update_camera()
+        key = (self.state, self.engine.seed, self.engine.ticks, self.high_score,
+               self.camera_x, self.camera_y, self.notice)
+        if key == self._static_key:
+            self.screen.blit(self._static_frame, (0, 0))
+            return
+        
+        self.draw_board()
+        self.draw_hud()
+        if self.state == GameState.PAUSED:
             self.draw_pause()
-            
-        elif self.state == GameState.GAME_OVER:
-            self.screen.fill(BLACK)
-            self.draw_food()
-            self.draw_snake()
-            self.draw_hud()
+        else:
             self.draw_game_over()
+        self._static_frame = self.screen.copy()
+        self._static_key = key
+    
+    def render(self):
+        """Вывод кадра на экран: полностью или только изменившиеся области"""
+        self.present(self.compose())
+    
+    def compose(self) -> List[pygame.Rect]:
+        """Отрисовка кадра в self.screen; возвращает изменившиеся области экрана"""
+        # Сдвиг камеры меняет весь вид - нужен полный кадр
+        if self.state == GameState.PLAYING and self.update_camera():
+            self._drawn_state = None
+        if self.state == self._drawn_state and self.state != GameState.PLAYING:
+            return []  # Меню, пауза и конец игры статичны - кадр не меняется
+        if self.incremental and self.state == self._drawn_state:
+            rects = self.draw_changes()
+        else:
+            self.draw()
+            rects = [self.screen.get_rect()]
+            if self.state == GameState.PLAYING:
+                self._dirty_cells = set(self.moving_cells())
+        if self.show_profiler and self.state == GameState.PLAYING:
+            rects.append(self.draw_profiler())
+        self._drawn_state = self.state
+        self._drawn_tick = self.engine.ticks
+        self._drawn_food = tuple(self.engine.foods)
+        self._drawn_alpha = self.interpolation()
+        return rects
+    
+    def present(self, rects: List[pygame.Rect]):
+        """Вывод нарисованного на дисплей"""
+        if not rects or not self.windowed:
+            return
+        if rects[0] == self.screen.get_rect():
+            pygame.display.flip()
+        else:
+            pygame.display.update(rects)
+    
+    def draw_profiler(self) -> pygame.Rect:
+        """Оверлей с перцентилями фаз кадра в правом верхнем углу"""
+        if not self._profiler_lines or self.profiler.frames % PROFILER_REFRESH == 0:
+            lines = ["фаза      p50 / p95 / p99 мс"]
+            for phase in PHASES:
+                p50, p95, p99 = self.profiler.percentiles(phase)
+                lines.append(f"{phase:<8} {p50:6.2f} {p95:6.2f} {p99:6.2f}")
+            self._profiler_lines = [self.font_small.render(line, True, YELLOW) for line in lines]
+        
+        width = max(line.get_width() for line in self._profiler_lines)
+        area = pygame.Rect(WINDOW_WIDTH - width - 10, 10, width,
+                           sum(line.get_height() for line in self._profiler_lines))
+        dirty = area.union(self._profiler_rect)
+        self.redraw_area(self._profiler_rect)
+        self.redraw_area(area)
+        y = area.top
+        for line in self._profiler_lines:
+            self.screen.blit(line, (area.left, y))
+            y += line.get_height()
+        self._profiler_rect = area
+        return dirty
+    
+    def draw_changes(self) -> List[pygame.Rect]:
+        """Перерисовка клеток, изменившихся с прошлого кадра"""
+        ticks = self.engine.ticks
+        alpha = self.interpolation()
+        if ticks == self._drawn_tick and alpha == self._drawn_alpha:
+            return []
+        if ticks > self._drawn_tick + 1:  # Пропущено несколько тиков
+            self.draw()
+            self._dirty_cells = set(self.moving_cells())
+            return [self.screen.get_rect()]
+        
+        # Клетки под головой и хвостом сейчас и в прошлом кадре, плюс новая еда
+        cells = set(self.moving_cells())
+        dirty = cells | self._dirty_cells
+        self._dirty_cells = cells
+        foods = tuple(self.engine.foods)
+        if foods != self._drawn_food:
+            dirty.update(foods)
+        rects = [self.draw_cell(x, y) for x, y in dirty if self.is_visible(x, y)]
+        self.draw_moving_parts()
+        
+        # Интерфейс рисуется поверх поля: обновляем его, если изменился текст
+        # или под ним перерисованы клетки
+        hud_state = (self.score, self.speed, self.high_score)
+        if hud_state != self._drawn_hud or self._hud_rect.collidelist(rects) != -1:
+            area = self._hud_rect
+            self.redraw_area(area)
+            self.draw_hud()
+            rects.append(area.union(self._hud_rect))
+        return rects
+    
+    def redraw_area(self, area: pygame.Rect):
+        """Перерисовка клеток поля, попадающих в область экрана"""
+        self.screen.fill(BLACK, area)
+        if area.width == 0 or area.height == 0:
+            return
+        for y in range(area.top // GRID_SIZE, (area.bottom - 1) // GRID_SIZE + 1):
+            for x in range(area.left // GRID_SIZE, (area.right - 1) // GRID_SIZE + 1):
+                self.draw_cell(x + self.camera_x, y + self.camera_y)
+        self.draw_moving_parts()
     
     def run(self):
         """Главный игровой цикл"""
         running = True
+        accumulator = 0.0
+        previous = time.perf_counter()
+        profiler = self.profiler
+        capture = self.capture
+        next_capture = previous
         
         while running:
+            now = time.perf_counter()
+            accumulator += now - previous
+            previous = now
+            
             running = self.handle_events()
-            self.update_game()
-            self.draw()
+            if profiler is not None:
+                events_done = time.perf_counter()
+            if self.state != GameState.PLAYING:
+                accumulator = 0.0
+            elif self.uncapped:
+                # Тики без ограничения до момента следующего кадра
+                deadline = now + 1.0 / RENDER_FPS
+                while self.state == GameState.PLAYING and time.perf_counter() < deadline:
+                    self.update_game()
+                accumulator = 0.0
+            else:
+                # Фиксированный шаг: столько тиков, сколько накопилось времени
+                ticks = 0
+                while (accumulator * self.speed >= 1.0 and ticks < MAX_TICKS_PER_FRAME
+                       and self.state == GameState.PLAYING):
+                    accumulator -= 1.0 / self.speed
+                    self.update_game()
+                    ticks += 1
+                accumulator = min(accumulator, 1.0 / self.speed)
+            self.alpha = min(accumulator * self.speed, 1.0) if not self.uncapped else 1.0
             
-            pygame.display.flip()
-            self.clock.tick(self.speed)
+            if profiler is None:
+                self.render()
+            else:
+                update_done = time.perf_counter()
+                rects = self.compose()
+                draw_done = time.perf_counter()
+                self.present(rects)
+                profiler.record((events_done - now, update_done - events_done,
+                                 draw_done - update_done, time.perf_counter() - draw_done))
+            if capture is not None and now >= next_capture:
+                capture.capture(self.screen)
+                next_capture = max(next_capture + capture.interval, now)
+            if not self.uncapped:
+                self.clock.tick(RENDER_FPS)
         
+        if profiler is not None:
+            profiler.dump(self.profile_path)
+        if self.leaderboard is not None:
+            self.leaderboard.close()  # Дописать результаты из очереди
+        if capture is not None:
+            capture.close()
+            print(capture.summary())
         pygame.quit()
         sys.exit()
 
 def main():
     """Точка входа в программу"""
+    parser = argparse.ArgumentParser(description="Игра \"Змейка\"")
+    parser.add_argument("--replay", metavar="FILE",
+                        help="проиграть сохраненную партию (файлы повторов - в python leaderboard.py)")
+    parser.add_argument("--uncapped", action="store_true",
+                        help="симуляция без ограничения скорости (для замеров)")
+    parser.add_argument("--width", type=int,
+                        help=f"ширина поля в клетках (до {MAX_BOARD_SIZE}, по умолчанию {GRID_WIDTH})")
+    parser.add_argument("--height", type=int,
+                        help=f"высота поля в клетках (до {MAX_BOARD_SIZE}, по умолчанию {GRID_HEIGHT})")
+    parser.add_argument("--rules", metavar="FILE",
+                        help="правила игры из файла .toml или .json (--width и --height их уточняют)")
+    parser.add_argument("--level", metavar="FILE",
+                        help="уровень: ASCII- или PNG-карта со стенами, порталами и стартами")
+    parser.add_argument("--autopilot", nargs="?", const=DEFAULT_AUTOPILOT, choices=list(AUTOPILOTS),
+                        help="змейкой управляет автопилот: bfs - поиск пути к еде, "
+                             "hamiltonian - обход поля по циклу (A - включить/выключить в игре)")
+    parser.add_argument("--profile", metavar="FILE", nargs="?", const="frame_profile.json",
+                        help="замерять фазы кадра (F3 - оверлей) и сохранить в FILE (.json или .csv)")
+    parser.add_argument("--resume", metavar="FILE", nargs="?", const=QUICKSAVE,
+                        help=f"продолжить сохраненную партию (S на паузе сохраняет в {QUICKSAVE})")
+    parser.add_argument("--record", metavar="PATH",
+                        help="записывать кадры: каталог для PNG или файл .gif/.mp4 (нужен ffmpeg)")
+    args = parser.parse_args()
+    
     try:
-        game = SnakeGame()
+        replay = Replay(args.replay) if args.replay else None
+        config = load_rules(args.rules)._asdict() if args.rules else {}
+        if args.level:
+            # Размер поля берется из нового уровня, если не задан явно
+            config.pop("width", None)
+            config.pop("height", None)
+            config["level"] = args.level
+        if args.width:
+            config["width"] = args.width
+        if args.height:
+            config["height"] = args.height
+        rules = rules_from_dict(config)
+        capture = FrameCapture(args.record, (WINDOW_WIDTH, WINDOW_HEIGHT)) if args.record else None
+        game = SnakeGame(replay, uncapped=args.uncapped, profile_path=args.profile,
+                         autopilot=args.autopilot, rules=rules, capture=capture)
+        if args.autopilot == "hamiltonian" and not cycle_supported(game.engine):
+            print("На поле со стенами, порталами или без гамильтонова цикла (обе стороны "
+                  "нечетные) решатель по циклу заменен поиском пути (bfs)")
+        if args.resume:
+            game.resume_game(args.resume)
         game.run()
     except Exception as e:
         print(f"Произошла ошибка: {e}")
@@ -61,6 +61,14 @@ def test_game_import():
         assert GameState.PLAYING.value == 2
         print("   ✅ Enum GameState работает корректно")
         
+        # pygame загружается лениво: импорт ради логики не трогает SDL
+        import subprocess
+        probe = subprocess.run([sys.executable, "-c",
+                                "import sys, snake_game; print('pygame.base' in sys.modules)"],
+                               capture_output=True, text=True, check=True)
+        assert probe.stdout.split()[-1] == "False"
+        print("   ✅ Импорт игры не загружает pygame")
+        
         return True
         
     except ImportError as e:
@@ -96,26 +104,13 @@ def test_game_logic():
     """Базовая проверка игровой логики"""
     print("\n🧮 Проверка игровой логики...")
     try:
-        import pygame
-        pygame.init()
-        
-        # Создаем минимальную поверхность для теста
-        screen = pygame.Surface((800, 600))
-        
-        from snake_game import SnakeGame
+        from snake_engine import SnakeEngine, Direction
         
-        # Создаем объект игры (без реального окна)
-        game = SnakeGame.__new__(SnakeGame)
-        game.screen = screen
-        game.clock = pygame.time.Clock()
-        
-        # Инициализируем шрифты
-        game.font_large = pygame.font.Font(None, 48)
-        game.font_medium = pygame.font.Font(None, 36)
-        game.font_small = pygame.font.Font(None, 24)
+        # Движок работает без pygame и окна
+        game = SnakeEngine()
         
         # Тестируем сброс игры
-        game.reset_game()
+        game.reset(seed=1)
         print("   ✅ Сброс игры работает")
         
         # Проверяем начальное состояние
@@ -130,12 +125,978 @@ def test_game_logic():
         assert len(food) == 2
         print("   ✅ Генерация еды работает")
         
-        pygame.quit()
+        # Тестируем шаг и разворот на 180 градусов
+        head_x, head_y = game.snake[0]
+        result = game.step(Direction.LEFT)
+        assert game.direction == Direction.RIGHT
+        assert game.snake[0] == (head_x + 1, head_y)
+        assert not result.done
+        assert sum(game.occupancy) == len(game.snake)
+        print("   ✅ Шаг движка работает")
+        
+        # Тестируем столкновение со стеной
+        while not game.step(Direction.UP).done:
+            pass
+        assert game.observe().done
+        print("   ✅ Столкновение со стеной обрабатывается")
+        
+        # Еда появляется только в свободной клетке, на полном поле - победа
+        game = SnakeEngine(width=3, height=1, seed=0)
+        assert game.food == (2, 0)
+        result = game.step()
+        assert result.reward == 10 and game.food == (0, 0)
+        game = SnakeEngine(width=2, height=2, seed=0)
+        cycle = [Direction.UP, Direction.LEFT, Direction.DOWN, Direction.RIGHT]
+        while not game.done:
+            game.step(cycle[game.ticks % 4])
+        assert game.won and game.food is None and len(game.snake) == 4
+        print("   ✅ Заполнение поля засчитывается как победа")
+        
+        # Размер поля задается для каждой партии
+        game = SnakeEngine(width=500, height=300, seed=1)
+        assert game.snake[0] == (250, 150) and len(game.occupancy) == 500 * 300
+        try:
+            SnakeEngine(width=5000, height=10)
+            assert False, "поле больше предела должно отклоняться"
+        except ValueError:
+            pass
+        print("   ✅ Размер поля настраивается")
+        
+        # Сброс перезаписывает буферы прошлой партии на месте, снимок при этом не портится
+        for _ in range(20):
+            game.step(Direction.UP)
+        snapshot = game.snapshot()
+        game.reset(2)
+        game.step(Direction.UP)
+        assert game.occupancy is not snapshot.occupancy
+        assert snapshot.occupancy.count(1) == snapshot.length == 500 * 300 - len(snapshot.free)
+        occupancy, free, free_pos = game.occupancy, game.free, game.free_pos
+        for _ in range(20):
+            game.step(Direction.LEFT)
+        game.reset(3)
+        assert game.occupancy is occupancy and game.free is free and game.free_pos is free_pos
+        head = game.snake[0][1] * 500 + game.snake[0][0]
+        assert game.occupancy.count(1) == 1 and len(game.free) == 500 * 300 - 1
+        assert head not in game.free and all(game.free[game.free_pos[cell]] == cell
+                                             for cell in range(0, 500 * 300, 997) if cell != head)
+        print("   ✅ Сброс партии не выделяет поле заново")
+        
         return True
         
     except Exception as e:
         print(f"   ❌ Ошибка логики игры: {e}")
-        pygame.quit()
+        return False
+
+def test_batch_env():
+    """Проверка пакетного окружения"""
+    print("\n📦 Проверка пакетного окружения...")
+    try:
+        from batch_env import BatchSnakeEnv, BODY, FOOD
+        
+        env = BatchSnakeEnv(16, width=6, height=5, seed=3)
+        assert env.grid.shape == (16, 5, 6)
+        print("   ✅ Окружение создано")
+        
+        finished = 0
+        for _ in range(500):
+            grid, rewards, dones, info = env.step(env.rng.integers(-1, 4, 16))
+            finished += int(dones.sum())
+            bodies = (grid == BODY).sum(axis=(1, 2))
+            assert (bodies == env.length).all()
+            assert ((grid == FOOD).sum(axis=(1, 2)) <= 1).all()
+        assert finished > 0
+        print("   ✅ Шаги и автосброс работают")
+        
+        return True
+        
+    except ImportError:
+        print("   ❌ numpy не установлен")
+        return False
+    except Exception as e:
+        print(f"   ❌ Ошибка пакетного окружения: {e}")
+        return False
+
+def test_snake_env():
+    """Проверка окружения Gymnasium"""
+    print("\n🏋️ Проверка окружения Gymnasium...")
+    try:
+        import gymnasium as gym
+        from snake_engine import Direction
+        from snake_env import BODY, HEAD, WALL, SnakeEnv
+        
+        for mode in ("grid", "local", "features"):
+            env = gym.make("Snake-v0", width=8, height=6, obs_mode=mode, max_ticks=100)
+            obs, _ = env.reset(seed=1)
+            first = obs.copy()
+            for _ in range(200):
+                step_obs, _, terminated, truncated, _ = env.step(env.action_space.sample())
+                # Наблюдение - тот же заранее выделенный массив
+                assert step_obs is obs and env.observation_space.contains(step_obs)
+                if terminated or truncated:
+                    env.reset()
+            assert (env.reset(seed=1)[0] == first).all()
+        print("   ✅ Режимы grid, local и features, повтор по seed")
+        
+        # Окно вокруг головы повернуто так, что змейка смотрит вверх
+        env = SnakeEnv(10, 10, obs_mode="local", view_radius=2)
+        env.reset(seed=0)
+        env.engine.place_snake([(8, 5), (7, 5)], Direction.RIGHT)
+        env.engine.food = (9, 5)
+        obs = env.step(list(Direction).index(Direction.RIGHT))[0]
+        assert obs[2, 2] == HEAD and obs[3, 2] == BODY and obs[0].tolist() == [WALL] * 5
+        print("   ✅ Окно вокруг головы повернуто по направлению движения")
+        
+        env = SnakeEnv(8, 6, render_mode="rgb_array")
+        env.reset(seed=0)
+        frame = env.render()
+        assert frame.ndim == 3 and frame.shape[2] == 3 and env.render() is frame
+        assert env._game.engine is env.engine  # Второй движок для отрисовки не создается
+        import pygame
+        pygame.font.init()
+        env.close()
+        assert pygame.font.get_init()  # close() не выключает pygame для всего процесса
+        print(f"   ✅ Кадр rgb_array {frame.shape} без окна")
+        
+        return True
+        
+    except ImportError:
+        print("   ❌ gymnasium не установлен")
+        return False
+    except Exception as e:
+        print(f"   ❌ Ошибка окружения Gymnasium: {e}")
+        return False
+
+def test_rollout():
+    """Проверка параллельного прогона партий"""
+    print("\n🏃 Проверка параллельного прогона...")
+    try:
+        from rollout import run_rollouts
+        
+        first = run_rollouts(20, workers=2, seed=5)
+        second = run_rollouts(20, workers=2, seed=5)
+        assert len(first.score) == 20
+        assert first.score == second.score and first.ticks == second.ticks
+        assert all(length >= 1 for length in first.length)
+        print("   ✅ Прогон воспроизводим при одинаковом seed")
+
+        empty = run_rollouts(0, workers=1)
+        assert empty.score == [] and empty.summary() == "0 партий"
+        print("   ✅ Сводка пустого прогона без деления на ноль")
+
+        return True
+        
+    except Exception as e:
+        print(f"   ❌ Ошибка прогона: {e}")
+        return False
+
+def test_replay():
+    """Проверка записи и воспроизведения партии"""
+    print("\n📼 Проверка повторов...")
+    try:
+        import random
+        import tempfile
+        from replay import Replay, ReplayRecorder
+        from snake_engine import Direction, SnakeEngine
+        
+        engine = SnakeEngine(width=10, height=8, seed=42)
+        recorder = ReplayRecorder()
+        recorder.start(engine)
+        rng = random.Random(0)
+        while not engine.done:
+            engine.step(rng.choice(list(Direction)))
+            recorder.record(engine.direction)
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'game.snkr')
+            recorder.save(path)
+            assert os.path.getsize(path) <= 32 + (engine.ticks + 3) // 4
+            with Replay(path) as replay:
+                copy = replay.simulate()
+        assert copy.ticks == engine.ticks and copy.score == engine.score
+        assert list(copy.snake) == list(engine.snake) and copy.done
+        print("   ✅ Партия воспроизводится бит в бит")
+        
+        return True
+        
+    except Exception as e:
+        print(f"   ❌ Ошибка повторов: {e}")
+        return False
+
+def test_snapshot():
+    """Проверка снимков партии, перемотки и сохранения"""
+    print("\n⏪ Проверка снимков и сохранения...")
+    try:
+        import random
+        import tempfile
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+        import pygame
+        from replay import ReplayRecorder
+        from rules import rules_from_dict
+        from savegame import load_game, save_game
+        from snake_engine import Direction, SnakeEngine
+        from snake_game import REWIND_STEP, GameState, SnakeGame
+        
+        def state(engine):
+            return (list(engine.snake), list(engine.foods), engine.score, engine.ticks,
+                    engine.done, bytes(engine.occupancy), engine.free.tobytes(),
+                    engine.rng.getstate())
+        
+        rng = random.Random(0)
+        directions = list(Direction)
+        for seed in range(20):
+            engine = SnakeEngine(width=10, height=8, seed=seed)
+            while not engine.done:
+                snapshot = engine.snapshot()
+                before = state(engine)
+                moves = [rng.choice(directions) for _ in range(rng.randint(1, 20))]
+                for move in moves:
+                    engine.step(move)
+                after = state(engine)
+                engine.restore(snapshot)
+                assert state(engine) == before
+                # После отката партия идет точно так же: и тело, и новая еда
+                for move in moves:
+                    engine.step(move)
+                assert state(engine) == after
+                clone = engine.clone()
+                clone.step(rng.choice(directions))
+                assert state(engine) == after
+                engine.step(rng.choice(directions))
+        print("   ✅ Снимок - шаги - откат возвращают партию бит в бит, клон независим")
+        
+        for seed in range(20):
+            engine = SnakeEngine(width=6, height=5, seed=seed)
+            states, undos = [], []
+            while not engine.done:
+                states.append(state(engine))
+                undos.append(engine.step_with_undo(rng.choice(directions))[1])
+            while undos:
+                engine.undo(undos.pop())
+                assert state(engine) == states.pop()
+        print("   ✅ Журнал отката возвращает партию по тикам до начала")
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = SnakeEngine(width=12, height=10, seed=5)
+            recorder = ReplayRecorder()
+            recorder.start(engine)
+            for _ in range(30):
+                engine.step(rng.choice(directions))
+                recorder.record(engine.direction)
+                if engine.done:
+                    break
+            path = os.path.join(tmp, 'game.snks')
+            save_game(path, engine, recorder)
+            loaded, loaded_recorder = load_game(path)
+            assert state(loaded) == state(engine)
+            assert loaded_recorder.data == recorder.data and loaded_recorder.ticks == engine.ticks
+            
+            # Партия на уровне: размер поля из карты, путь к карте - относительный
+            level_path = os.path.join(tmp, 'maze.txt')
+            with open(level_path, 'w') as f:
+                f.write("#######\n"
+                        "#....v#\n"
+                        "#.#.#.#\n"
+                        "#.....#\n"
+                        "#######\n")
+            engine = SnakeEngine(rules=rules_from_dict({"level": os.path.relpath(level_path)}),
+                                 seed=2)
+            for direction in (Direction.DOWN, Direction.DOWN, Direction.LEFT):
+                engine.step(direction)
+            save_game(path, engine)
+            loaded, _ = load_game(path)
+            assert (loaded.width, loaded.height) == (7, 5)
+            assert loaded.rules.level == os.path.abspath(level_path)
+            assert state(loaded) == state(engine)
+        print("   ✅ Сохраненная партия продолжается с того же места, в том числе на уровне")
+        
+        class Board:
+            def __init__(self):
+                self.entries = []
+            
+            def best(self):
+                return 0
+            
+            def submit(self, entry, recorder):
+                self.entries.append(entry)
+        
+        board = Board()
+        game = SnakeGame(screen=pygame.Surface((800, 600)), leaderboard=board)
+        game.reset_game()
+        game.state = GameState.PLAYING
+        for _ in range(5):
+            game.update_game()
+        ticks = game.engine.ticks
+        snake = list(game.snake)
+        while game.state == GameState.PLAYING:
+            game.update_game()
+        assert len(board.entries) == 1
+        game.rewind(game.engine.ticks - ticks)
+        assert game.state == GameState.PAUSED and game.engine.ticks == ticks
+        assert list(game.snake) == snake and game.recorder.ticks == ticks
+        game.state = GameState.PLAYING
+        while game.state == GameState.PLAYING:
+            game.update_game()
+        assert len(board.entries) == 1  # Перемотанная партия в таблицу не попадает
+        print("   ✅ Перемотка в игре возвращает партию назад")
+        
+        # Журнал перемотки не зависит от размера поля: ни тик, ни снимок не копируют
+        # буферы поля (время тика на разных полях сравнивает python bench.py rewind)
+        from rules import Rules
+        from snake_engine import Undo
+        
+        game = SnakeGame(screen=pygame.Surface((800, 600)), leaderboard=Board(),
+                         rules=Rules(2048, 2048))
+        game.reset_game()
+        game.state = GameState.PLAYING
+        engine = game.engine
+        buffers = (engine.occupancy, engine.free, engine.free_pos, engine.body)
+        for _ in range(40):
+            game.update_game()
+        assert game.state == GameState.PLAYING and len(game.history) == 40
+        assert all(isinstance(record, Undo) for record in game.history)
+        assert all(a is b for a, b in zip((engine.occupancy, engine.free, engine.free_pos,
+                                           engine.body), buffers))
+        game.rewind(REWIND_STEP)
+        assert engine.ticks == 40 - REWIND_STEP and not engine._shared
+        assert all(a is b for a, b in zip((engine.occupancy, engine.free, engine.free_pos,
+                                           engine.body), buffers))
+        snapshot = engine.snapshot()
+        assert engine._shared and snapshot.occupancy is engine.occupancy
+        assert snapshot.body is engine.body and snapshot.free is engine.free
+        engine.restore(snapshot)
+        assert engine.occupancy is snapshot.occupancy and engine.body is snapshot.body
+        print("   ✅ Тик с журналом перемотки, откат и снимок не копируют поле")
+        
+        return True
+        
+    except Exception as e:
+        print(f"   ❌ Ошибка снимков: {e}")
+        return False
+
+def test_incremental_render():
+    """Проверка инкрементальной отрисовки"""
+    print("\n🖼️ Проверка инкрементальной отрисовки...")
+    try:
+        import random
+        import tempfile
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+        import pygame
+        from leaderboard import Leaderboard
+        from snake_game import SnakeGame, GameState, Direction
+        
+        # Игра в окне, но таблица рекордов и повторы - во временном каталоге
+        with tempfile.TemporaryDirectory() as tmp:
+            board = Leaderboard(os.path.join(tmp, 'scores.db'), legacy_path=None)
+            try:
+                game = SnakeGame(leaderboard=board)
+                rng = random.Random(1)
+                frames = 0
+                for _ in range(5):
+                    game.reset_game()
+                    game.state = GameState.PLAYING
+                    while game.state == GameState.PLAYING:
+                        game.queue_direction(rng.choice(list(Direction)))
+                        game.update_game()
+                        # Несколько кадров на тик с интерполяцией между клетками
+                        for alpha in (0.25, 0.5, 1.0):
+                            game.alpha = alpha
+                            game.render()
+                            frame = pygame.image.tobytes(game.screen, 'RGB')
+                            game.draw()
+                            assert frame == pygame.image.tobytes(game.screen, 'RGB')
+                            frames += 1
+                print(f"   ✅ {frames} кадров совпали с полной перерисовкой")
+                
+                # Два поворота за один тик не теряются
+                game.reset_game()
+                game.state = GameState.PLAYING
+                game.queue_direction(Direction.UP)
+                game.queue_direction(Direction.LEFT)
+                game.update_game()
+                assert game.direction == Direction.UP
+                game.update_game()
+                assert game.direction == Direction.LEFT
+                print("   ✅ Очередь нажатий работает")
+            finally:
+                board.close()
+                pygame.quit()
+        return True
+        
+    except Exception as e:
+        print(f"   ❌ Ошибка отрисовки: {e}")
+        return False
+
+def test_leaderboard():
+    """Проверка таблицы рекордов"""
+    print("\n🏆 Проверка таблицы рекордов...")
+    try:
+        import tempfile
+        from leaderboard import Entry, Leaderboard
+        from replay import Replay, ReplayRecorder
+        from snake_engine import SnakeEngine
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            legacy = os.path.join(tmp, 'high_score.txt')
+            with open(legacy, 'w') as f:
+                f.write('150')
+            path = os.path.join(tmp, 'scores.db')
+            with Leaderboard(path, capacity=5, legacy_path=legacy) as board:
+                assert board.best() == 150
+                print("   ✅ Старый рекорд перенесен")
+                
+                # Пачка из прогона и партия с повтором
+                board.submit_many(Entry(score) for score in range(0, 1000, 10))
+                engine = SnakeEngine(width=10, height=10, seed=4)
+                recorder = ReplayRecorder()
+                recorder.start(engine)
+                for _ in range(3):
+                    engine.step()
+                    recorder.record(engine.direction)
+                record = board.submit(Entry(2000, seed=engine.seed), recorder)
+                lost = board.submit(Entry(5, seed=1), recorder)
+                assert board.best() == 2000 and record.replay and lost.replay is None
+                board.flush()
+                top = board.top()
+                assert [entry.score for entry in top] == [2000, 990, 980, 970, 960]
+                with Replay(top[0].replay) as replay:
+                    assert replay.seed == 4 and len(replay) == 3
+                
+                # Повтор не сохранился (seed вне 64 бит): результат пишется без него,
+                # поток записи продолжает работать
+                recorder.seed = -1
+                board.submit(Entry(3000, seed=-1), recorder)
+                board.flush()
+                assert isinstance(board.last_error, ValueError)
+                board.submit(Entry(2500))
+                board.flush()
+                top = board.top()
+                assert [entry.score for entry in top[:2]] == [3000, 2500] and top[0].replay is None
+            
+            # После перезапуска таблица на месте, старый рекорд второй раз не переносится
+            with Leaderboard(path, capacity=5, legacy_path=legacy) as board:
+                assert board.best() == 3000 and len(board.top()) == 5
+            print("   ✅ Лучшие результаты и повторы сохраняются пачками в фоне")
+        
+        return True
+        
+    except Exception as e:
+        print(f"   ❌ Ошибка таблицы рекордов: {e}")
+        return False
+
+def test_arena():
+    """Проверка сетевой игры через localhost"""
+    print("\n🌐 Проверка сетевой игры...")
+    try:
+        import asyncio
+        import random
+        from arena import DIRECTIONS, Arena, ArenaMirror, encode_join, encode_turn
+        from arena_server import ArenaServer, read_message
+        from snake_engine import Direction
+        
+        # Две головы в одной клетке гибнут обе, тела убираются с поля
+        arena = Arena(5, 1, seed=0, foods=0)
+        left, right = arena.add_player(), arena.add_player()
+        arena.place_snake(left, [(1, 0), (0, 0)], Direction.RIGHT)
+        arena.place_snake(right, [(3, 0), (4, 0)], Direction.LEFT)
+        arena.tick()
+        assert not arena.snakes[left].alive and not arena.snakes[right].alive
+        assert not any(arena.occupancy)
+        print("   ✅ Столкновение голов")
+        
+        async def client(port: int, rng: random.Random) -> ArenaMirror:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(encode_join("test"))
+            mirror = ArenaMirror()
+            try:
+                while True:
+                    mirror.apply(await read_message(reader))
+                    writer.write(encode_turn(rng.choice(DIRECTIONS)))
+            except (asyncio.IncompleteReadError, ConnectionError):
+                return mirror
+        
+        async def scenario():
+            server = ArenaServer(port=0, tick_rate=200, width=16, height=12, seed=1)
+            await server.start()
+            rng = random.Random(0)
+            clients = [asyncio.create_task(client(server.port, rng)) for _ in range(2)]
+            await asyncio.sleep(0.3)
+            # Игрок, вошедший в идущую партию
+            clients.append(asyncio.create_task(client(server.port, rng)))
+            await asyncio.sleep(0.3)
+            arena = server.rooms["test"].arena
+            expected = ({p: list(s.body) for p, s in arena.snakes.items()},
+                        set(arena.foods), {p: s.score for p, s in arena.snakes.items()})
+            ticks = arena.ticks
+            await server.close()
+            return ticks, expected, await asyncio.gather(*clients)
+        
+        ticks, expected, mirrors = asyncio.run(scenario())
+        assert ticks > 10
+        for mirror in mirrors:
+            assert mirror.ticks == ticks
+            assert ({p: list(b) for p, b in mirror.snakes.items()},
+                    mirror.foods, mirror.scores) == expected
+        print(f"   ✅ Клиенты собрали из изменений то же состояние, что на сервере ({ticks} тиков)")
+        
+        return True
+        
+    except Exception as e:
+        print(f"   ❌ Ошибка сетевой игры: {e}")
+        return False
+
+def test_bench():
+    """Проверка набора замеров (короткий прогон)"""
+    print("\n⏱️ Проверка замеров...")
+    try:
+        import json
+        from bench import run_benchmarks
+        
+        report = run_benchmarks(["engine", "food", "hamiltonian", "rewind"], quick=True)
+        assert report["results"]["engine"]["length_10000"]["ticks_per_sec"] > 0
+        assert report["results"]["food"]["fill_99"]["latency_us"] > 0
+        assert report["results"]["hamiltonian"]["board_20x15"]["ticks_to_clear"] > 0
+        assert report["results"]["rewind"]["board_2048x2048"]["undo_us"] > 0
+        json.dumps(report)
+        print("   ✅ Замеры выполняются и сериализуются в JSON")
+        
+        return True
+        
+    except Exception as e:
+        print(f"   ❌ Ошибка замеров: {e}")
+        return False
+
+def test_frame_profiler():
+    """Проверка профилировщика кадра"""
+    print("\n📈 Проверка профилировщика...")
+    try:
+        import json
+        import tempfile
+        from frame_profiler import FrameProfiler
+        
+        profiler = FrameProfiler(size=100)
+        for i in range(250):
+            profiler.record((0.001, 0.002, i / 1000, 0.0))
+        assert profiler.count == 100 and profiler.frames == 250
+        p50, p95, p99 = profiler.percentiles("draw")
+        assert 150 <= p50 <= p95 <= p99 <= 250
+        print("   ✅ Перцентили считаются по последним кадрам")
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'profile.json')
+            profiler.dump(path)
+            with open(path) as f:
+                data = json.load(f)
+        assert len(data["samples_ms"]["draw"]) == 100
+        assert data["samples_ms"]["draw"][-1] == 249
+        print("   ✅ Замеры сохраняются в JSON")
+        
+        return True
+        
+    except Exception as e:
+        print(f"   ❌ Ошибка профилировщика: {e}")
+        return False
+
+def test_autopilot():
+    """Проверка автопилота"""
+    print("\n🤖 Проверка автопилота...")
+    try:
+        from autopilot import Autopilot
+        from snake_engine import SnakeEngine
+        
+        engine = SnakeEngine(width=20, height=15, seed=0)
+        autopilot = Autopilot(engine)
+        while not engine.done and engine.ticks < 20000:
+            engine.step(autopilot.decide())
+        assert engine.score >= 300
+        assert autopilot.recomputes < engine.ticks // 3
+        print(f"   ✅ Автопилот набрал {engine.score} очков за {engine.ticks} тиков")
+        
+        # Без пути к еде оценка места не обходит все поле: поиск ограничен длиной змейки
+        from autopilot import SPACE_MARGIN
+        engine = SnakeEngine(width=1000, height=1000, seed=0)
+        autopilot = Autopilot(engine)
+        limits = []
+        area = autopilot._area
+        autopilot._area = lambda start, limit: limits.append(limit) or area(start, limit)
+        engine.foods = []
+        for _ in range(10):
+            engine.step(autopilot.decide())
+        assert not engine.done and limits
+        assert max(limits) <= engine.length + SPACE_MARGIN
+        print("   ✅ Запасная стратегия не обходит все поле")
+        
+        # Новая партия в игре начинается без пути, построенного в прошлой
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+        import pygame
+        from snake_game import SnakeGame
+        game = SnakeGame(screen=pygame.Surface((800, 600)), autopilot="bfs")
+        game.reset_game()
+        game.autopilot.decide()
+        assert game.autopilot.path
+        game.reset_game()
+        assert not game.autopilot.path and game.autopilot.engine is game.engine
+        print("   ✅ Путь автопилота сбрасывается вместе с партией")
+        
+        return True
+        
+    except Exception as e:
+        print(f"   ❌ Ошибка автопилота: {e}")
+        return False
+
+def test_hamiltonian():
+    """Проверка решателя по гамильтонову циклу"""
+    print("\n🔁 Проверка гамильтонова цикла...")
+    try:
+        from hamiltonian import HamiltonianSolver, hamiltonian_cycle
+        from snake_engine import SnakeEngine
+        
+        # Цикл проходит все клетки, соседние по циклу клетки смежны
+        for width, height in ((2, 2), (6, 5), (5, 6), (10, 10)):
+            order, following = hamiltonian_cycle(width, height)
+            assert sorted(order) == list(range(width * height))
+            for cell, nxt in enumerate(following):
+                assert abs(nxt - cell) == width or (abs(nxt - cell) == 1 and nxt // width == cell // width)
+        try:
+            hamiltonian_cycle(5, 5)
+            assert False, "на поле 5x5 цикла нет"
+        except ValueError:
+            pass
+        print("   ✅ Цикл строится для полей с четной стороной")
+        
+        for seed in range(5):
+            engine = SnakeEngine(width=12, height=9, seed=seed)
+            solver = HamiltonianSolver(engine)
+            while not engine.done:
+                engine.step(solver.decide())
+            assert engine.won and engine.length == 12 * 9
+        print(f"   ✅ Поле 12x9 заполняется целиком (последняя партия - {engine.ticks} тиков)")
+        
+        # На уровне со стенами и порталами цикл не годится: игра ведет змейку поиском пути
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+        import pygame
+        from autopilot import Autopilot
+        from rules import rules_from_dict
+        from snake_engine import OBSTACLE
+        from snake_game import GameState, SnakeGame
+        
+        rules = rules_from_dict({"level": os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                       'levels', 'arena.txt')})
+        try:
+            HamiltonianSolver(SnakeEngine(rules=rules))
+            assert False, "на уровне со стенами решатель по циклу не создается"
+        except ValueError:
+            pass
+        game = SnakeGame(screen=pygame.Surface((800, 600)), rules=rules, autopilot="hamiltonian")
+        assert isinstance(game.autopilot, Autopilot)
+        game.toggle_autopilot()
+        game.toggle_autopilot()
+        assert isinstance(game.autopilot, Autopilot)
+        game.reset_game()
+        game.state = GameState.PLAYING
+        while game.state == GameState.PLAYING and game.engine.ticks < 500:
+            game.update_game()
+        engine = game.engine
+        if engine.done:
+            # Партия могла закончиться только столкновением с собой
+            (x, y), (dx, dy) = engine.snake[0], engine.direction.value
+            assert engine.occupancy[(y + dy) * engine.width + x + dx] != OBSTACLE
+        print("   ✅ На уровне со стенами вместо цикла работает поиск пути")
+        
+        # Поле с обеими нечетными сторонами: цикла нет, тоже поиск пути
+        from evaluate import HamiltonianAgent
+        from rules import Rules
+        game = SnakeGame(screen=pygame.Surface((800, 600)), rules=Rules(41, 31),
+                         autopilot="hamiltonian")
+        assert isinstance(game.autopilot, Autopilot)
+        agent = HamiltonianAgent()
+        agent.reset(SnakeEngine(width=9, height=7, seed=0))
+        assert isinstance(agent.bot, Autopilot) and agent.decide(agent.observe()) is not None
+        print("   ✅ На поле без гамильтонова цикла вместо него работает поиск пути")
+        
+        return True
+        
+    except Exception as e:
+        print(f"   ❌ Ошибка гамильтонова цикла: {e}")
+        return False
+
+def test_rules():
+    """Проверка правил из файла и их таблиц"""
+    print("\n📜 Проверка правил игры...")
+    try:
+        import json
+        import tempfile
+        from rules import Rules, compile_rules, load_rules
+        from snake_engine import Direction, OBSTACLE, SnakeEngine
+        
+        # Стандартные правила: скорость растет на 1 каждые 50 очков до 20
+        speeds = compile_rules(Rules()).speeds
+        assert speeds[0] == 10 and speeds[5] == 11 and speeds[-1] == 20
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            config = {"width": 6, "height": 4, "wrap": True, "foods": 2, "food_score": 3,
+                      "speed_curve": [[0, 4], [6, 8]], "obstacles": [[0, 0]]}
+            for name, text in (("rules.json", json.dumps(config)),
+                               ("rules.toml", 'width = 6\nheight = 4\nwrap = true\nfoods = 2\n'
+                                              'food_score = 3\nspeed_curve = [[0, 4], [6, 8]]\n'
+                                              'obstacles = [[0, 0]]\n')):
+                path = os.path.join(tmp, name)
+                with open(path, 'w') as f:
+                    f.write(text)
+                assert load_rules(path) == load_rules(os.path.join(tmp, "rules.json"))
+            rules = load_rules(path)
+            with open(path, 'a') as f:
+                f.write('sped = 3\n')
+            try:
+                load_rules(path)
+                assert False, "опечатка в ключе должна быть ошибкой"
+            except ValueError:
+                pass
+        print("   ✅ Правила читаются из JSON и TOML, неизвестные ключи отвергаются")
+        
+        engine = SnakeEngine(rules=rules, seed=0)
+        assert engine.width == 6 and len(engine.foods) == 2 and engine.speed == 4
+        assert engine.occupancy[0] == OBSTACLE and 0 not in engine.free
+        # Край заворачивается: голова из (5, 2) вправо попадает в (0, 2)
+        engine.place_snake([(5, 2)], Direction.RIGHT)
+        engine.foods = [(1, 2), (2, 2)]
+        assert engine.step().reward == 0 and engine.snake[0] == (0, 2)
+        assert engine.step().reward == 3 and engine.step().reward == 3
+        assert engine.score == 6 and engine.speed == 8 and len(engine.foods) == 2
+        # Препятствие смертельно
+        engine.place_snake([(0, 1)], Direction.UP)
+        assert engine.step().done
+        print("   ✅ Заворачивание краев, несколько яблок, препятствия и кривая скорости")
+        
+        # Без заворачивания край - стена; стандартные правила не изменились
+        engine = SnakeEngine(width=3, height=1, seed=0)
+        engine.place_snake([(2, 0)], Direction.RIGHT)
+        assert engine.step().done
+        
+        # Автопилот по циклу на поле с препятствиями заменяется поиском пути
+        # и не врезается в препятствия
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+        import pygame
+        from autopilot import Autopilot
+        from hamiltonian import HamiltonianSolver
+        from snake_game import GameState, SnakeGame
+        
+        rules = Rules(12, 10, obstacles=((3, 3), (8, 2), (5, 7)))
+        try:
+            HamiltonianSolver(SnakeEngine(rules=rules))
+            assert False, "на поле с препятствиями решатель по циклу не создается"
+        except ValueError:
+            pass
+        for seed in range(5):
+            game = SnakeGame(screen=pygame.Surface((800, 600)), rules=rules,
+                             autopilot="hamiltonian")
+            assert isinstance(game.autopilot, Autopilot)
+            game.reset_game()
+            game.engine.reset(seed)
+            game.state = GameState.PLAYING
+            while game.state == GameState.PLAYING and game.engine.ticks < 3000:
+                game.update_game()
+            engine = game.engine
+            (x, y), (dx, dy) = engine.snake[0], engine.direction.value
+            if 0 <= x + dx < 12 and 0 <= y + dy < 10:
+                assert engine.occupancy[(y + dy) * 12 + x + dx] != OBSTACLE
+        print("   ✅ Автопилот на поле с препятствиями обходит их")
+        return True
+        
+    except Exception as e:
+        print(f"   ❌ Ошибка правил: {e}")
+        return False
+
+def test_levels():
+    """Проверка уровней: разбор карты, кэш и порталы"""
+    print("\n🧱 Проверка уровней...")
+    try:
+        import tempfile
+        from levels import CACHE_SUFFIX, OBSTACLE, PORTAL, load_level
+        from rules import Rules, rules_from_dict
+        from snake_engine import Direction, SnakeEngine
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "maze.txt")
+            with open(path, 'w') as f:
+                f.write("#######\n"
+                        "#A...v#\n"
+                        "#.###.#\n"
+                        "#....A#\n"
+                        "#######\n")
+            level = load_level(path)
+            assert (level.width, level.height) == (7, 5)
+            assert os.path.exists(path + CACHE_SUFFIX)
+            assert level.mask[0] == OBSTACLE and level.mask[8] == PORTAL
+            assert level.portals == ((8, 26),) and level.spawns == ((12, (0, 1)),)
+            assert len(level.free) == 35 - 23 - 2 and level.free_pos[9] >= 0 and level.free_pos[0] == -1
+            # Повторная загрузка идет из скомпилированного файла через mmap
+            level = load_level(path + CACHE_SUFFIX)
+            assert list(level.free) == list(load_level(path).free)
+            print("   ✅ Карта компилируется в маску и индекс свободных клеток, кэш открывается через mmap")
+            
+            # Размер поля с уровнем берется из карты; несовпадающий размер - ошибка
+            rules = rules_from_dict({"level": path})
+            assert (rules.width, rules.height) == (7, 5)
+            try:
+                SnakeEngine(rules=Rules(level=path))
+                assert False, "размер правил должен совпадать с уровнем"
+            except ValueError:
+                pass
+            engine = SnakeEngine(rules=rules, seed=0)
+            assert engine.snake[0] == (5, 1) and engine.direction == Direction.DOWN
+            assert engine.food is not None and engine.occupancy[engine.food[1] * 7 + engine.food[0]] == 0
+            # Вход в портал (5, 3) сверху - выход под парным порталом (1, 1)
+            engine.foods = [(1, 3)]
+            engine.step()
+            assert engine.snake[0] == (5, 2)
+            engine.step()
+            assert engine.snake[0] == (1, 2) and not engine.done
+            # Стена смертельна
+            engine.step(Direction.RIGHT)
+            assert engine.done
+            print("   ✅ Старт из карты, порталы и стены на тике")
+            
+            with open(path, 'w') as f:
+                f.write("#B#\n#..\n")
+            try:
+                load_level(path)
+                assert False, "непарный портал должен быть ошибкой"
+            except ValueError:
+                pass
+        return True
+        
+    except Exception as e:
+        print(f"   ❌ Ошибка уровней: {e}")
+        return False
+
+def test_capture():
+    """Проверка записи кадров и рендера повтора"""
+    print("\n🎬 Проверка записи кадров...")
+    try:
+        import tempfile
+        import threading
+        import time
+        import pygame
+        from capture import FrameCapture, render_replay
+        from replay import ReplayRecorder
+        from snake_engine import Direction, SnakeEngine
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            surface = pygame.Surface((40, 30))
+            surface.fill((10, 200, 30))
+            frames = os.path.join(tmp, "frames")
+            with FrameCapture(frames, surface.get_size()) as capture:
+                for _ in range(3):
+                    assert capture.capture(surface)
+            assert capture.encoded == 3 and capture.dropped == 0
+            saved = pygame.image.load(os.path.join(frames, "frame_000002.png"))
+            assert saved.get_at((5, 5))[:3] == (10, 200, 30)
+            print("   ✅ Кадры записываются в PNG с верными цветами")
+            
+            # Кодировщик занят: очередь заполняется, лишние кадры отбрасываются без ожидания
+            release = threading.Event()
+            
+            class SlowEncoder:
+                def write(self, rgb):
+                    release.wait()
+                
+                def close(self):
+                    pass
+            
+            capture = FrameCapture(os.path.join(tmp, "slow"), surface.get_size(), queue_frames=1)
+            capture.encoder = SlowEncoder()
+            assert capture.capture(surface)
+            while not capture._queue.empty():
+                time.sleep(0.001)
+            assert capture.capture(surface)
+            assert not capture.capture(surface) and capture.dropped == 1
+            release.set()
+            capture.close()
+            assert capture.encoded == 2
+            print("   ✅ При отставании кодировщика кадры отбрасываются, игра не ждет")
+            
+            # Любая ошибка кодировщика сохраняется, запись с ожиданием и закрытие не зависают
+            class BrokenEncoder:
+                def write(self, rgb):
+                    raise pygame.error("кодировщик сломан")
+                
+                def close(self):
+                    pass
+            
+            capture = FrameCapture(os.path.join(tmp, "broken"), surface.get_size(), queue_frames=1)
+            capture.encoder = BrokenEncoder()
+            finished = threading.Event()
+            
+            def write_frames():
+                for _ in range(10):
+                    capture.capture(surface, block=True)
+                capture.close()
+                finished.set()
+            
+            threading.Thread(target=write_frames, daemon=True).start()
+            assert finished.wait(10), "запись зависла после ошибки кодировщика"
+            assert isinstance(capture.error, pygame.error) and capture.encoded == 0
+            print("   ✅ Ошибка кодировщика останавливает запись без зависания")
+            
+            engine = SnakeEngine(width=10, height=8, seed=1)
+            recorder = ReplayRecorder()
+            recorder.start(engine)
+            for direction in [Direction.RIGHT] * 3 + [Direction.DOWN] * 10:
+                engine.step(direction)
+                recorder.record(engine.direction)
+                if engine.done:
+                    break
+            recorder.save(os.path.join(tmp, "game.snkr"))
+            capture = render_replay(os.path.join(tmp, "game.snkr"), os.path.join(tmp, "video"),
+                                    fps=10, speedup=4)
+            assert capture.dropped == 0 and capture.error is None and capture.encoded > 10
+            print(f"   ✅ Повтор отрендерен без окна: {capture.encoded} кадров")
+        return True
+        
+    except Exception as e:
+        print(f"   ❌ Ошибка записи кадров: {e}")
+        return False
+
+def test_evaluate():
+    """Проверка сравнения агентов на одинаковых партиях"""
+    print("\n🏁 Проверка сравнения агентов...")
+    try:
+        import tempfile
+        from evaluate import describe, evaluate, format_report, paired_difference, read_results
+        from rules import Rules
+        
+        # Агент без decide() не создается: ошибка видна до запуска партий
+        try:
+            evaluate(["evaluate:Agent"], episodes=1, workers=1)
+        except TypeError:
+            pass
+        else:
+            raise AssertionError("абстрактный Agent создался")
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            out = os.path.join(tmp, "evaluation.csv")
+            results = evaluate(["random", "greedy"], episodes=6, workers=2, seed=3,
+                               rules=Rules(width=12, height=10), max_ticks=2000, out_path=out)
+            assert len(results) == 12
+            seeds = {agent: [r.seed for r in results if r.agent == agent]
+                     for agent in ("random", "greedy")}
+            assert seeds["random"] == seeds["greedy"] and len(set(seeds["random"])) == 6
+            assert read_results(out) and sorted(read_results(out)) == sorted(results)
+            print("   ✅ Агенты играют одни и те же партии, результаты пишутся в CSV")
+            
+            diff = paired_difference(results, "greedy", "random")
+            assert diff.n == 6 and diff.mean > 0
+            report = format_report(results)
+            assert "greedy - random" in report
+            # Интервалы у счета, длины, тиков и скорости решений
+            assert all(line.count("±") == 4 for line in report.splitlines()[1:3])
+        stat = describe([1, 2, 3, 4])
+        assert stat.mean == 2.5 and stat.p5 <= stat.p50 <= stat.p95 and stat.ci > 0
+        print(f"   ✅ Сводка: жадный агент лучше случайного на {diff.mean:.0f} ± {diff.ci:.0f} очков")
+        return True
+        
+    except Exception as e:
+        print(f"   ❌ Ошибка сравнения агентов: {e}")
         return False
 
 def main():
@@ -148,7 +1109,23 @@ def main():
         test_pygame,
         test_files,
         test_game_import,
-        test_game_logic
+        test_game_logic,
+        test_rules,
+        test_levels,
+        test_batch_env,
+        test_snake_env,
+        test_rollout,
+        test_replay,
+        test_snapshot,
+        test_leaderboard,
+        test_arena,
+        test_incremental_render,
+        test_capture,
+        test_evaluate,
+        test_bench,
+        test_frame_profiler,
+        test_autopilot,
+        test_hamiltonian
     ]
     
     passed = 0